@@ -0,0 +1,93 @@
+# accounts.py
+"""
+Perfiles de las cuentas de Klaviyo (una por región). Cada cuenta tiene su propia clave de
+API, su limitador de rate limit, su catálogo de métricas y su espacio en la caché local.
+
+La cuenta con la que trabaja cada hilo se guarda en un ContextVar: klaviyo_request toma de
+ahí los encabezados y el limitador, por lo que las funciones de la API no necesitan recibirla.
+"""
+import contextvars
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from config import KLAVIYO_ACCOUNTS, KLAVIYO_ACTIVE_ACCOUNTS, HEADERS_KLAVIYO, CACHE_DIR
+from metric_catalog import CatalogoMetricas, catalogo_metricas
+from rate_limit import LimitadorAdaptativo, limitador
+from circuit_breaker import Disyuntor, disyuntor
+
+
+class CuentaKlaviyo:
+    """Una cuenta de Klaviyo con su clave, su limitador, su disyuntor y su catálogo de métricas."""
+
+    def __init__(self, nombre, api_key, principal=False):
+        self.nombre = nombre
+        self.headers = {**HEADERS_KLAVIYO, "Authorization": f"Klaviyo-API-Key {api_key}"}
+        if principal:
+            # La cuenta principal conserva el limitador, el catálogo y las rutas de siempre
+            self.cache_dir = CACHE_DIR
+            self.limitador = limitador
+            self.disyuntor = disyuntor
+            self.catalogo = catalogo_metricas
+        else:
+            self.cache_dir = os.path.join(CACHE_DIR, "cuentas", re.sub(r"[^\w-]", "_", nombre))
+            self.limitador = LimitadorAdaptativo()
+            self.disyuntor = Disyuntor()
+            self.catalogo = CatalogoMetricas(ruta=os.path.join(self.cache_dir, "metricas.json"))
+
+    def __repr__(self):
+        return f"CuentaKlaviyo({self.nombre!r})"
+
+
+# Cuentas configuradas, en el orden de KLAVIYO_ACCOUNTS (la primera es la principal)
+CUENTAS = {
+    nombre: CuentaKlaviyo(nombre, api_key, principal=(i == 0))
+    for i, (nombre, api_key) in enumerate(KLAVIYO_ACCOUNTS.items())
+}
+CUENTA_PRINCIPAL = next(iter(CUENTAS.values()))
+
+_cuenta_activa = contextvars.ContextVar("cuenta_activa", default=None)
+
+# Cuenta a la que pertenece cada ID de Klaviyo ya cargado (campañas, audiencias)
+_propietarios = {}
+_lock = threading.Lock()
+
+
+def cuentas_activas():
+    """Devuelve las cuentas a cargar: las de KLAVIYO_ACTIVE_ACCOUNTS o, si está vacío, todas."""
+    if not KLAVIYO_ACTIVE_ACCOUNTS:
+        return list(CUENTAS.values())
+    return [CUENTAS[nombre] for nombre in KLAVIYO_ACTIVE_ACCOUNTS if nombre in CUENTAS]
+
+
+def obtener_cuenta(nombre=None):
+    """Devuelve la cuenta por nombre; la principal si no se indica o no existe."""
+    return CUENTAS.get(nombre, CUENTA_PRINCIPAL)
+
+
+def cuenta_actual():
+    """Devuelve la cuenta activa del hilo actual (la principal por defecto)."""
+    return _cuenta_activa.get() or CUENTA_PRINCIPAL
+
+
+@contextmanager
+def usar_cuenta(cuenta):
+    """Activa una cuenta para las solicitudes hechas dentro del bloque en este hilo."""
+    marca = _cuenta_activa.set(cuenta)
+    try:
+        yield cuenta
+    finally:
+        _cuenta_activa.reset(marca)
+
+
+def registrar_ids(cuenta, ids):
+    """Recuerda a qué cuenta pertenecen los IDs de Klaviyo (campañas, audiencias) de una carga."""
+    with _lock:
+        for klaviyo_id in ids:
+            _propietarios[klaviyo_id] = cuenta.nombre
+
+
+def cuenta_de(klaviyo_id):
+    """Devuelve la cuenta a la que pertenece un ID ya cargado (la principal si no se conoce)."""
+    return obtener_cuenta(_propietarios.get(klaviyo_id))
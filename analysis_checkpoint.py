@@ -0,0 +1,142 @@
+# analysis_checkpoint.py
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from config import ANALYSIS_CHECKPOINT_FILE, ANALYSIS_CHECKPOINT_MAX_AGE_DAYS, ANALYSIS_CHECKPOINT_OPEN_TTL_MINUTES
+
+FORMATO_GUARDADO = "%Y-%m-%d %H:%M:%S"
+
+
+class CheckpointAnalisis:
+    """
+    Guarda en disco el resultado del análisis de clics de cada campaña apenas termina,
+    para que un análisis interrumpido (error de red, tiempo límite, ventana cerrada)
+    pueda reanudarse consultando solo las campañas que faltan.
+
+    Cada resultado se identifica por campaign_id, ventana de análisis (fecha de inicio y de
+    fin) e intervalo de los buckets (los clics únicos son sumas por bucket). Un resultado
+    cuya ventana ya había cerrado al guardarse es definitivo y se conserva dias_maximos días;
+    el de una ventana abierta (incluida "Hasta hoy") es provisional: sirve para reanudar un
+    análisis interrumpido durante minutos_abierta minutos y después se vuelve a consultar.
+
+    El archivo es JSONL de solo anexado: una línea por campaña analizada, con la serie diaria
+    de clics cuando se pidió y la hora en que se guardó. Se lee la primera vez que se usa, y
+    al compactarlo se descartan los resultados vencidos.
+    """
+
+    def __init__(self, ruta=ANALYSIS_CHECKPOINT_FILE, dias_maximos=ANALYSIS_CHECKPOINT_MAX_AGE_DAYS,
+                 minutos_abierta=ANALYSIS_CHECKPOINT_OPEN_TTL_MINUTES):
+        self.ruta = ruta
+        self.dias_maximos = dias_maximos
+        self.minutos_abierta = minutos_abierta
+        self._lock = threading.Lock()
+        self._resultados = None  # {clave: (total_clicks, totales, serie, guardado_en)}; None hasta leer el archivo
+
+    @staticmethod
+    def _clave(campaign_id, inicio, fin, intervalo):
+        return (campaign_id, inicio, fin, intervalo)
+
+    def _vigente(self, fin, guardado_en, ahora):
+        """
+        Un resultado definitivo (la ventana cerró antes del día en que se guardó) sirve durante
+        dias_maximos días; uno provisional, durante minutos_abierta minutos.
+        """
+        try:
+            guardado = datetime.strptime(guardado_en, FORMATO_GUARDADO)
+        except (TypeError, ValueError):
+            return False
+        if fin < guardado.strftime("%Y-%m-%d"):
+            return ahora - guardado <= timedelta(days=self.dias_maximos)
+        return ahora - guardado <= timedelta(minutes=self.minutos_abierta)
+
+    def _cargar(self):
+        """Lee el archivo existente (con el lock tomado); ignora líneas dañadas (e.g. una escritura interrumpida)."""
+        if self._resultados is not None:
+            return self._resultados
+        self._resultados = {}
+        if not os.path.exists(self.ruta):
+            return self._resultados
+        ahora = datetime.now()
+        lineas = 0
+        descartadas = 0
+        incompleta = False
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                for linea in f:
+                    lineas += 1
+                    incompleta = not linea.endswith("\n")
+                    try:
+                        registro = json.loads(linea)
+                        clave = self._clave(registro["campaign_id"], registro["inicio"], registro["fin"],
+                                            registro["intervalo"])
+                        if not self._vigente(registro["fin"], registro.get("guardado_en"), ahora):
+                            descartadas += 1
+                            continue
+                        self._resultados[clave] = (registro["total_clicks"], registro["totales"], registro.get("serie"),
+                                                   registro["guardado_en"])
+                    except (ValueError, KeyError, TypeError):
+                        descartadas += 1
+                        continue
+        except OSError as e:
+            print(f"No se pudo leer el checkpoint de análisis {self.ruta}: {e}")
+            return self._resultados
+        # Compactar si hubo resultados vencidos o dañados, si el archivo acumuló muchas líneas
+        # repetidas, o si la última quedó a medias (el siguiente registro anexado se pegaría a ella)
+        if descartadas or incompleta or lineas > 2 * len(self._resultados) + 100:
+            self._reescribir()
+        return self._resultados
+
+    def _reescribir(self):
+        """Reescribe el archivo solo con los resultados vigentes (con el lock tomado)."""
+        ahora = datetime.now()
+        self._resultados = {clave: resultado for clave, resultado in self._resultados.items()
+                            if self._vigente(clave[2], resultado[3], ahora)}
+        temporal = f"{self.ruta}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                for (campaign_id, inicio, fin, intervalo), (total_clicks, totales, serie, guardado_en) in self._resultados.items():
+                    f.write(json.dumps({"campaign_id": campaign_id, "inicio": inicio, "fin": fin, "intervalo": intervalo,
+                                        "total_clicks": total_clicks, "totales": totales, "serie": serie,
+                                        "guardado_en": guardado_en}, ensure_ascii=False) + "\n")
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            print(f"No se pudo compactar el checkpoint de análisis {self.ruta}: {e}")
+
+    def obtener(self, campaign_id, inicio, fin, intervalo):
+        """
+        Devuelve el resultado guardado para la campaña, ventana e intervalo indicados.
+
+        Returns:
+            tuple: (total_clicks, totales, serie) o None si la campaña no se ha analizado así o el
+                resultado venció; serie es la lista de clics diarios o None si no se guardó.
+        """
+        with self._lock:
+            resultado = self._cargar().get(self._clave(campaign_id, inicio, fin, intervalo))
+        if resultado is None or not self._vigente(fin, resultado[3], datetime.now()):
+            return None
+        return resultado[:3]
+
+    def guardar(self, campaign_id, inicio, fin, intervalo, total_clicks, totales, serie=None):
+        """
+        Registra el resultado de una campaña (y su serie diaria opcional) y lo escribe de inmediato
+        en disco; si la ventana sigue abierta, queda como resultado provisional.
+        """
+        guardado_en = datetime.now().strftime(FORMATO_GUARDADO)
+        serie = list(serie) if serie is not None else None
+        registro = {"campaign_id": campaign_id, "inicio": inicio, "fin": fin, "intervalo": intervalo,
+                    "total_clicks": total_clicks, "totales": totales, "serie": serie, "guardado_en": guardado_en}
+        with self._lock:
+            self._cargar()[self._clave(campaign_id, inicio, fin, intervalo)] = (total_clicks, totales, serie, guardado_en)
+            try:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                    f.flush()
+            except OSError as e:
+                print(f"No se pudo escribir el checkpoint de análisis {self.ruta}: {e}")
+
+
+# Instancia compartida por todos los análisis: el archivo se lee una sola vez por sesión
+checkpoint_analisis = CheckpointAnalisis()
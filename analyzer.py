@@ -1,15 +1,51 @@
 import tkinter as tk
 from tkinter import messagebox
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from campaign_logic import seleccionar_campanas, query_metric_aggregates_post
+from cancellation import TokenCancelacion, OperacionCancelada
+from config import ANALYSIS_DEADLINE_SECONDS, CLICK_WINDOW_OPTIONS, ANALYSIS_PROGRESS_FPS
+from analysis_checkpoint import checkpoint_analisis
+from url_classifier import clasificar_url, clasificador
+from click_index import IndiceClics
+from click_decay import serie_diaria, resumen_decaimiento
+from klaviyo_api import elegir_intervalo
+from accounts import obtener_cuenta, usar_cuenta
+from progress import ProgresoAnalisis, formatear_duracion
+from selection_model import ModeloSeleccion
+from history_store import historial
+from phase_profiler import perfilar
+from template_links import inventario_enlaces, unir_enlaces, FUERA_DEL_TEMPLATE
+from array import array
 import threading
 
+def fin_ventana_clics(send_date, dias_ventana):
+    """
+    Calcula el último día de la ventana de clics de una campaña, sin pasar de hoy.
+
+    Args:
+        send_date (str): Fecha de envío (YYYY-MM-DD).
+        dias_ventana (int): Días después del envío que se consultan; None para hasta hoy.
+
+    Returns:
+        str: Último día incluido en la consulta (YYYY-MM-DD).
+    """
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    if not dias_ventana:
+        return hoy
+    try:
+        fin = (datetime.strptime(send_date, "%Y-%m-%d") + timedelta(days=dias_ventana)).strftime("%Y-%m-%d")
+    except ValueError:
+        return hoy
+    return min(fin, hoy)
+
+
 class Analyzer:
     def __init__(self, campanas, last_results, resultados_tabla, resultados_label, entry, 
                  btn_analizar, btn_exportar, btn_nuevo_rango, root, email_preview, 
                  is_analysis_mode, setup_analysis_view_callback, filter_var, 
-                 analyze_all_campaigns, campanas_tabla):
+                 analyze_all_campaigns, campanas_tabla, btn_detener=None, serie_diaria_var=None, ventana_var=None,
+                 modelo_seleccion=None, btn_exportar_excel=None):
         self.campanas = campanas
         self.last_results = last_results
         self.resultados_tabla = resultados_tabla
@@ -24,39 +60,57 @@ class Analyzer:
         self.setup_analysis_view_callback = setup_analysis_view_callback
         self.filter_var = filter_var  # Variable para rastrear la selección del filtro
         self.all_click_data = {}  # Almacenar todos los datos de clics para filtrar
+        self.indice_filtros = {}  # Filas ya clasificadas y ordenadas por filtro: [fecha][campaña][filtro]
+        self.indice_clics = IndiceClics()  # Índice de clics entre campañas; se acumula durante la sesión
         self.analyze_all_campaigns = analyze_all_campaigns  # Checkbox para analizar todas las campañas
         self.campanas_tabla = campanas_tabla  # Tabla de campañas para obtener las visibles
+        self.modelo_seleccion = modelo_seleccion or ModeloSeleccion()  # Campaña de cada fila de campanas_tabla
         self.animation_id = None  # Para almacenar el ID del after y poder cancelarlo
         self.dots = 0  # Contador para los puntos suspensivos
+        self.btn_detener = btn_detener  # Botón opcional para cancelar el análisis en curso
+        self.btn_exportar_excel = btn_exportar_excel  # Botón opcional de exportación a Excel
+        self.token = None  # Token de cancelación del análisis en curso
+        self.serie_diaria_var = serie_diaria_var  # Checkbox opcional: pedir clics diarios (decaimiento)
+        self.series_clics = {}  # Clics diarios por (campaña, fecha de envío), como array('q')
+        self.ventana_var = ventana_var  # Combobox opcional: ventana de clics (clave de CLICK_WINDOW_OPTIONS)
+        self.checkpoint = checkpoint_analisis  # Resultados ya analizados por campaña y ventana cerrada
+        self.progreso_label = None  # Etiqueta de estado del análisis (la crea la vista de análisis)
+        self.progreso = None  # ProgresoAnalisis del análisis en curso
+        self.progreso_id = None  # ID del after que refresca la etiqueta de estado
+        self.campanas_analizadas = {}  # Campaña de cada (fecha de envío, nombre) con clics, para el filtro "Enlaces"
+        self.inventario_enlaces = {}  # (fecha de envío, nombre) -> (filas de unir_enlaces, error)
+        self.token_enlaces = None  # Token de la carga de enlaces de los templates en curso
+
+    def cancelar(self, motivo="Cancelado por el usuario"):
+        """Solicita detener el análisis en curso; se conservan las campañas ya analizadas."""
+        if self.token is not None:
+            self.token.cancelar(motivo)
+        if self.token_enlaces is not None:
+            self.token_enlaces.cancelar(motivo)
+        if self.btn_detener:
+            self.btn_detener.config(state=tk.DISABLED, bg="#A9A9A9")
 
     def update_progress(self, message):
-        """Actualiza el progreso en la tabla de resultados"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        
+        """Muestra un mensaje de estado del análisis en la etiqueta de progreso."""
         if message.startswith("ACTUALIZAR:"):
-            # Actualizar la última línea (incremental)
-            actual_message = message[11:]
-            children = self.resultados_tabla.get_children()
-            
-            if children:
-                # Buscar la última fila que no sea de finalización
-                for item in reversed(children):
-                    values = self.resultados_tabla.item(item, "values")
-                    if values and len(values) > 2:
-                        url_text = values[2]
-                        if not ("✅" in url_text or "❌" in url_text or "Análisis completado" in url_text):
-                            self.resultados_tabla.item(item, values=("", "", f"[{timestamp}] {actual_message}", "", ""))
-                            break
-            else:
-                self.resultados_tabla.insert("", "end", values=("", "", f"[{timestamp}] {actual_message}", "", ""), tags=("bold",))
-        else:
-            # Agregar nueva línea
-            self.resultados_tabla.insert("", "end", values=("", "", f"[{timestamp}] {message}", "", ""), tags=("bold",))
-        
-        # Auto-scroll y actualizar
-        if self.resultados_tabla.get_children():
-            self.resultados_tabla.see(self.resultados_tabla.get_children()[-1])
-        self.root.update()
+            message = message[len("ACTUALIZAR:"):]
+        if self.progreso_label:
+            self.progreso_label.config(text=f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+
+    def _mostrar_progreso(self):
+        """Refresca la etiqueta con el progreso del análisis en curso, a ANALYSIS_PROGRESS_FPS."""
+        if self.progreso is None:
+            return
+        if self.progreso_label:
+            self.progreso_label.config(text=self.progreso.texto())
+        self.progreso_id = self.root.after(max(1, int(1000 / ANALYSIS_PROGRESS_FPS)), self._mostrar_progreso)
+
+    def _detener_progreso(self):
+        """Deja de refrescar la etiqueta de progreso."""
+        if self.progreso_id is not None:
+            self.root.after_cancel(self.progreso_id)
+            self.progreso_id = None
+        self.progreso = None
 
     def show_real_results(self):
         """Limpia el progreso y muestra los resultados reales"""
@@ -109,19 +163,31 @@ class Analyzer:
 
         # MOSTRAR CUÁNTAS CAMPAÑAS SE VAN A ANALIZAR
         self.update_progress(f"🎯 Obteniendo clics de {len(seleccionados)} campañas...")
+        dias_ventana = CLICK_WINDOW_OPTIONS.get(self.ventana_var.get()) if self.ventana_var else None
+        if dias_ventana:
+            self.update_progress(f"🪟 Ventana de clics: {dias_ventana} días después del envío")
 
         # Deshabilitar widgets para evitar interacciones durante el análisis
         self.entry.config(state=tk.DISABLED)
         self.btn_analizar.config(state=tk.DISABLED, bg="#A9A9A9")
         self.btn_exportar.config(state=tk.DISABLED, bg="#A9A9A9")
+        if self.btn_exportar_excel:
+            self.btn_exportar_excel.config(state=tk.DISABLED, bg="#A9A9A9")
         self.btn_nuevo_rango.config(state=tk.DISABLED, bg="#A9A9A9")
+        if self.btn_detener:
+            self.btn_detener.config(state=tk.NORMAL, bg="#23376D")
 
         self.email_preview.resultados_label = self.resultados_label
         self.root.update()
 
         # Ejecutar el análisis en un hilo separado
-        analysis_thread = threading.Thread(target=self._run_analysis, args=(seleccionados,))
+        self.token = TokenCancelacion(ANALYSIS_DEADLINE_SECONDS)
+        diario = bool(self.serie_diaria_var and self.serie_diaria_var.get())
+        self._detener_progreso()
+        self.progreso = ProgresoAnalisis(len(seleccionados))
+        analysis_thread = threading.Thread(target=self._run_analysis, args=(seleccionados, self.token, diario, dias_ventana, self.progreso), daemon=True)
         analysis_thread.start()
+        self._mostrar_progreso()
 
     def start_animation(self):
         """Inicia la animación de los puntos suspensivos en el mensaje 'Buscando información'."""
@@ -150,64 +216,38 @@ class Analyzer:
         self.dots = 0
 
     def get_all_visible_campaigns(self):
-        """Obtiene todas las campañas visibles en campanas_tabla."""
-        visible_campaigns = []
-        for item in self.campanas_tabla.get_children():
-            tags = self.campanas_tabla.item(item, "tags")
-            # Ignorar filas de subtotales, totales, encabezados de país/fecha, y filas de audiencias
-            if ("subtotal" in tags or "grand_total" in tags or "bold" in tags or 
-                "audience_detail" in tags or "audience_header" in tags):
-                continue
-                
-            values = self.campanas_tabla.item(item, "values")
-            
-            # Verificar que la fila tiene valores y que es una campaña real
-            if not values or len(values) < 2:
-                continue
-                
-            # El ID de la campaña está en la primera columna, pero puede tener el formato "▶ #" o "▼ #"
-            campaign_display_id = str(values[0]).strip()
-            
-            # Extraer el número real del ID (quitar ▶ o ▼ si están presentes)
-            if campaign_display_id.startswith("▶ ") or campaign_display_id.startswith("▼ "):
-                campaign_number = campaign_display_id[2:].strip()
-            else:
-                campaign_number = campaign_display_id
-                
-            # Verificar que es un número válido
-            try:
-                campaign_idx = int(campaign_number)
-            except ValueError:
-                # Si no es un número, no es una fila de campaña válida
-                continue
-            
-            # Buscar la campaña correspondiente en self.campanas usando el índice
-            for camp in self.campanas:
-                if camp[0] == campaign_idx:  # camp[0] es el idx que coincide con campaign_idx
-                    visible_campaigns.append(camp)
-                    break
-                    
-        print(f"Debug: Encontradas {len(visible_campaigns)} campañas visibles")  # Para debug
-        return visible_campaigns
+        """Obtiene todas las campañas visibles en campanas_tabla, en el orden de la tabla."""
+        return self.modelo_seleccion.visibles(self.campanas_tabla)
 
-    def _run_analysis(self, seleccionados):
+    @perfilar("analisis")
+    def _run_analysis(self, seleccionados, token, diario=False, dias_ventana=None, progreso=None):
         # Realizar el análisis en un hilo separado
         self.last_results.clear()
         self.all_click_data.clear()
+        self.indice_filtros.clear()
+        self.series_clics.clear()
+        self.campanas_analizadas.clear()
+        self.inventario_enlaces.clear()
         resultados_por_fecha_pais = defaultdict(lambda: defaultdict(list))
         
         total_campaigns = len(seleccionados)
+        analizadas = 0
+        recuperadas = 0
+        clics_historial = []  # (campaign_id, send_date, total_clicks, urls) para el historial local
+        intervalo = elegir_intervalo(diario)  # Parte de la clave del checkpoint: los únicos son sumas por bucket
         
         for i, camp in enumerate(seleccionados, 1):
-            idx, campaign_id, campaign_name, send_time, open_rate, click_rate, delivered, opens_unicos, subject, preview, template_id, audiences, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient = camp
+            if token.cancelado:
+                break
+            idx, campaign_id, campaign_name, send_time, open_rate, click_rate, delivered, opens_unicos, subject, preview, template_id, audiences, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient = camp[:17]
+            cuenta = obtener_cuenta(camp[17])
             
             # Truncar nombre si es muy largo para mostrar en progreso
             display_name = campaign_name[:25] + "..." if len(campaign_name) > 25 else campaign_name
             
-            # ACTUALIZAR PROGRESO INCREMENTAL
-            def update_progress_ui():
-                self.update_progress(f"ACTUALIZAR:Procesando {i}/{total_campaigns}: {display_name}")
-            self.root.after(0, update_progress_ui)
+            # El progreso se muestra desde la UI a frecuencia fija; aquí solo se actualizan contadores
+            if progreso:
+                progreso.avanzar(display_name)
             
             try:
                 send_date = datetime.strptime(send_time, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d")
@@ -215,15 +255,40 @@ class Analyzer:
                 send_date = send_time
             partes = campaign_name.split("_")
             pais = partes[-1].strip().lower() if len(partes) > 1 else "desconocido"
-            analysis_end_date = datetime.now().strftime("%Y-%m-%d")
+            analysis_end_date = fin_ventana_clics(send_date, dias_ventana)
             
             total_clicks = 0
-            aggregated_data, error = query_metric_aggregates_post(campaign_id, send_date, analysis_end_date)
+            # Reutilizar el resultado guardado si la campaña ya se analizó en esta ventana e intervalo
+            # (en una ventana abierta, solo si se guardó hace menos de KLAVIYO_CHECKPOINT_OPEN_TTL_MINUTES)
+            guardado = self.checkpoint.obtener(campaign_id, send_date, analysis_end_date, intervalo)
+            if guardado is not None and diario and guardado[2] is None:
+                guardado = None  # Se guardó sin serie diaria: volver a consultar
+            serie = None
+            if guardado is not None:
+                aggregated_data, error = None, None
+                recuperadas += 1
+            else:
+                try:
+                    # "Hasta hoy" consulta hasta el momento actual (en UTC), no hasta el día local
+                    fin_consulta = analysis_end_date if dias_ventana else None
+                    # Consultar con la clave y el limitador de la cuenta de la campaña
+                    with usar_cuenta(cuenta):
+                        aggregated_data, error = query_metric_aggregates_post(campaign_id, send_date, fin_consulta, token,
+                                                                              interval=intervalo)
+                except OperacionCancelada:
+                    break
+            analizadas += 1
+            if progreso:
+                progreso.completar()
             if error:
                 resultados_por_fecha_pais[send_date][campaign_name].append((error, None, total_clicks))
             else:
                 totales = {}
-                if aggregated_data and "data" in aggregated_data:
+                if guardado is not None:
+                    total_clicks, totales, serie_guardada = guardado
+                    if diario:
+                        serie = array("q", serie_guardada)
+                elif aggregated_data and "data" in aggregated_data:
                     attributes = aggregated_data["data"].get("attributes", {})
                     results = attributes.get("data", [])
                     for entry in results:
@@ -234,21 +299,36 @@ class Analyzer:
                             url_clicked = dims[0]
                             unique = sum(entry.get("measurements", {}).get("unique", [0]))
                             totales[url_clicked] = {"count": count, "unique": unique}
+                    if diario:
+                        serie = serie_diaria(aggregated_data)
+                if guardado is None:
+                    self.checkpoint.guardar(campaign_id, send_date, analysis_end_date, intervalo, total_clicks, totales, serie)
+                if serie:
+                    self.series_clics[(campaign_name, send_date)] = serie
                 if totales:
                     self.last_results[(campaign_name, send_date)] = totales
                     resultados_por_fecha_pais[send_date][campaign_name].append((None, totales, total_clicks))
                     # Almacenar datos para el filtro
-                    if send_date not in self.all_click_data:
-                        self.all_click_data[send_date] = {}
-                    self.all_click_data[send_date][campaign_name] = (total_clicks, totales)
+                    self.registrar_clics(send_date, campaign_name, total_clicks, totales, campaign_id)
+                    self.campanas_analizadas[(send_date, campaign_name)] = camp
                 else:
                     resultados_por_fecha_pais[send_date][campaign_name].append(("No se encontraron clics para esta campaña.", None, total_clicks))
+                clics_historial.append((campaign_id, send_date, total_clicks, len(totales)))
+
+        historial.registrar_clics(clics_historial, dias_ventana)
 
         # FINALIZAR ANÁLISIS
         def finalize_analysis():
-            self.update_progress("✅ Análisis completado - Mostrando resultados...")
-            # Esperar un momento y luego mostrar resultados reales
-            self.root.after(1000, self.show_real_results)
+            duracion = formatear_duracion(progreso.transcurrido()) if progreso else ""
+            if progreso is self.progreso:
+                self._detener_progreso()
+            recuperadas_texto = f" - ♻️ {recuperadas} recuperadas del checkpoint (sin consultar la API)" if recuperadas else ""
+            if token.cancelado:
+                self.update_progress(f"⏹️ Análisis cancelado ({token.motivo}) - {analizadas}/{total_campaigns} campañas analizadas en {duracion}{recuperadas_texto} - Mostrando resultados parciales...")
+            else:
+                self.update_progress(f"✅ Análisis completado - {analizadas} campañas en {duracion}{recuperadas_texto} - Mostrando resultados...")
+            # El estado queda en la etiqueta de progreso: mostrar los resultados de inmediato
+            self.show_real_results()
             self._finalize_ui()
         
         self.root.after(0, finalize_analysis)
@@ -266,6 +346,33 @@ class Analyzer:
             self.apply_filter()
         self.root.after(0, update)
 
+    def registrar_clics(self, send_date, campaign_name, total_clicks, totales, campaign_id=None):
+        """
+        Guarda los clics de una campaña y precalcula, una sola vez, las filas de cada filtro:
+        cada URL se clasifica con las reglas configuradas y las filas quedan ordenadas por clics.
+
+        Args:
+            send_date (str): Fecha de envío (YYYY-MM-DD).
+            campaign_name (str): Nombre de la campaña.
+            total_clicks (int): Total de clics de la campaña.
+            totales (dict): {url: {"count": int, "unique": int}}.
+            campaign_id (str, optional): ID de la campaña; si se indica, se agrega al índice de clics.
+        """
+        self.all_click_data.setdefault(send_date, {})[campaign_name] = (total_clicks, totales)
+        if campaign_id is not None:
+            self.indice_clics.agregar(campaign_id, campaign_name, send_date, totales)
+
+        filas = {"Todos": []}
+        for tipo in clasificador.tipos:
+            filas[tipo] = []
+        for url, data in totales.items():
+            filas["Todos"].append((url, data["count"], data["unique"], ""))
+            for tipo, identificador in clasificar_url(url).items():
+                filas[tipo].append((url, data["count"], data["unique"], identificador))
+        for lista in filas.values():
+            lista.sort(key=lambda x: x[1], reverse=True)
+        self.indice_filtros.setdefault(send_date, {})[campaign_name] = filas
+
     def extract_sku_or_category_id(self, url, filter_type):
         """
         Extrae el SKU o ID Categoría de la URL según el filtro seleccionado, deteniéndose antes del '?' y preservando mayúsculas.
@@ -277,41 +384,9 @@ class Analyzer:
         Returns:
             str: El SKU o ID Categoría extraído, o "" si no se encuentra.
         """
-        # Usar una versión en minúsculas para las comparaciones, pero la original para extraer el valor
-        url_lower = url.lower()
-        url_original = url  # Mantener la URL original para preservar mayúsculas
-
-        # Dividir la URL antes del '?' para ignorar parámetros de consulta
-        url_lower = url_lower.split("?")[0]
-        url_original = url_original.split("?")[0]
-
-        if filter_type == "Producto":
-            # Buscar /producto/descripcion-del-producto/SKU
-            if "/producto/" in url_lower:
-                parts = url_lower.split("/producto/")[1].split("/")
-                if len(parts) >= 2:  # Asegurarse de que hay al menos descripción y SKU
-                    # Usar la URL original para extraer el SKU con mayúsculas preservadas
-                    original_parts = url_original.split("/producto/")[1].split("/")
-                    return original_parts[-1]  # El último elemento es el SKU
-            elif "/product/" in url_lower:
-                parts = url_lower.split("/product/")[1].split("/")
-                if len(parts) >= 2:
-                    original_parts = url_original.split("/product/")[1].split("/")
-                    return original_parts[-1]
-        elif filter_type == "Categoría":
-            # Buscar /categoria/descripcion-del-producto/ID Categoria
-            if "/categoria/" in url_lower:
-                parts = url_lower.split("/categoria/")[1].split("/")
-                if len(parts) >= 2:
-                    original_parts = url_original.split("/categoria/")[1].split("/")
-                    return original_parts[-1]  # El último elemento es el ID Categoría
-            elif "/category/" in url_lower:
-                parts = url_lower.split("/category/")[1].split("/")
-                if len(parts) >= 2:
-                    original_parts = url_original.split("/category/")[1].split("/")
-                    return original_parts[-1]
-        return ""
+        return clasificar_url(url).get(filter_type, "")
 
+    @perfilar("filtro")
     def apply_filter(self, event=None):
         """Filtra los datos de clics según la selección del filtro y actualiza la tabla de resultados."""
         if not self.resultados_tabla:
@@ -320,6 +395,12 @@ class Analyzer:
         self.resultados_tabla.delete(*self.resultados_tabla.get_children())
         filter_type = self.filter_var.get()
 
+        if filter_type == "Enlaces" and any(clave not in self.inventario_enlaces for clave in self.campanas_analizadas):
+            # Los enlaces de los templates se obtienen en segundo plano; al terminar se vuelve a filtrar
+            self.cargar_enlaces()
+            self.resultados_tabla.insert("", "end", values=("", "", "🔄 Obteniendo los enlaces de los templates...", "", ""))
+            return
+
         filtered_urls_count = 0
 
         for fecha in sorted(self.all_click_data.keys()):
@@ -330,26 +411,26 @@ class Analyzer:
 
             for campaign_name in sorted(campañas_ordenadas, key=lambda x: campañas_ordenadas[x], reverse=True):
                 total_clicks, totales = self.all_click_data[fecha][campaign_name]
-                todas_las_urls = []
-                for url, data in totales.items():
-                    url_lower = url.lower()
-                    # Aplicar el filtro
-                    if filter_type == "Todos":
-                        todas_las_urls.append((url, data["count"], data["unique"]))
-                    elif filter_type == "Producto":
-                        if "/producto/" in url_lower or "/product/" in url_lower:
-                            todas_las_urls.append((url, data["count"], data["unique"]))
-                    elif filter_type == "Categoría":
-                        if "/categoria/" in url_lower or "/category/" in url_lower:
-                            todas_las_urls.append((url, data["count"], data["unique"]))
+                # Las filas de cada filtro ya están clasificadas y ordenadas desde la ingesta
+                todas_las_urls = self.indice_filtros[fecha][campaign_name].get(filter_type, [])
 
                 # Mostrar la campaña incluso si no tiene URLs que cumplan con el filtro
                 self.resultados_tabla.insert("", "end", values=(campaign_name, total_clicks, "", "", ""))
-                if todas_las_urls:
-                    todas_las_urls.sort(key=lambda x: x[1], reverse=True)
-                    for url, clics_totales, clics_unicos in todas_las_urls:
-                        # Extraer SKU o ID Categoría si aplica
-                        extra_value = self.extract_sku_or_category_id(url, filter_type) if filter_type in ["Producto", "Categoría"] else ""
+                serie = self.series_clics.get((campaign_name, fecha))
+                if serie:
+                    # Decaimiento de clics de la campaña (solo si se pidió la serie diaria)
+                    self.resultados_tabla.insert("", "end", values=("", "", resumen_decaimiento(serie), "", ""), tags=("decay",))
+                if filter_type == "Enlaces":
+                    filas, error = self.inventario_enlaces.get((fecha, campaign_name), ([], None))
+                    if error:
+                        self.resultados_tabla.insert("", "end", values=("", "", f"No se obtuvieron los enlaces del template: {error}", "", ""))
+                    for url, clics_totales, clics_unicos, porcentaje, origen in filas:
+                        tags = ("sin_clics",) if not clics_totales else ("fuera_template",) if origen == FUERA_DEL_TEMPLATE else ()
+                        self.resultados_tabla.insert("", "end", values=("", "", url, clics_totales, clics_unicos,
+                                                                        f"{porcentaje:.1f}%", origen), tags=tags)
+                        filtered_urls_count += 1
+                elif todas_las_urls:
+                    for url, clics_totales, clics_unicos, extra_value in todas_las_urls:
                         if filter_type in ["Producto", "Categoría"]:
                             self.resultados_tabla.insert("", "end", values=("", "", url, clics_totales, clics_unicos, extra_value))
                         else:
@@ -367,6 +448,39 @@ class Analyzer:
         self.resultados_tabla.insert("", "end", values=("", "", "Análisis completado.", "", ""))
         self.resultados_label.config(text=f"Resultados del análisis: {filtered_urls_count} enlaces analizados")
 
+    def cargar_enlaces(self):
+        """
+        Obtiene en segundo plano los enlaces de los templates de las campañas analizadas que
+        aún no están en el inventario, los une con sus clics y vuelve a aplicar el filtro.
+        """
+        if self.token_enlaces is not None:
+            return  # Ya hay una carga en curso
+        pendientes = {clave: camp for clave, camp in self.campanas_analizadas.items() if clave not in self.inventario_enlaces}
+        if not pendientes:
+            return
+        token = self.token_enlaces = TokenCancelacion()
+
+        def cargar():
+            try:
+                enlaces = inventario_enlaces(list(pendientes.values()), token)
+            except Exception as e:
+                enlaces = {camp[1]: (None, f"Error inesperado: {str(e)}") for camp in pendientes.values()}
+
+            def terminar():
+                self.token_enlaces = None
+                for (fecha, campaign_name), camp in pendientes.items():
+                    # Un análisis nuevo pudo reemplazar las campañas mientras se cargaban los enlaces
+                    if self.campanas_analizadas.get((fecha, campaign_name)) is not camp:
+                        continue
+                    lista, error = enlaces.get(camp[1], (None, "Sin resultado"))
+                    total_clicks, totales = self.all_click_data[fecha][campaign_name]
+                    self.inventario_enlaces[(fecha, campaign_name)] = (unir_enlaces(lista or [], total_clicks, totales), error)
+                if not token.cancelado and self.filter_var.get() == "Enlaces" and self.resultados_tabla:
+                    self.apply_filter()
+            self.root.after(0, terminar)
+
+        threading.Thread(target=cargar, daemon=True).start()
+
     def _finalize_ui(self):
         # Rehabilitar widgets y limpiar el campo de entrada
         # Ajustar el estado del campo de entrada según el estado del checkbox
@@ -377,5 +491,9 @@ class Analyzer:
             self.entry.focus_set()
         self.btn_analizar.config(state=tk.NORMAL, bg="#23376D")
         self.btn_exportar.config(state=tk.NORMAL, bg="#23376D")
+        if self.btn_exportar_excel:
+            self.btn_exportar_excel.config(state=tk.NORMAL, bg="#23376D")
         self.btn_nuevo_rango.config(state=tk.NORMAL, bg="#23376D")
+        if self.btn_detener:
+            self.btn_detener.config(state=tk.DISABLED, bg="#A9A9A9")
         self.entry.delete(0, tk.END)
\ No newline at end of file
@@ -0,0 +1,318 @@
+# benchmark.py
+"""
+Benchmarks de CPU para las rutas críticas: agregación de subtotales, agrupación,
+selección de campañas, índice de clics, renderizado de la tabla, filtrado de clics y exportación.
+
+Los datos se generan sintéticamente (sin llamadas a Klaviyo). Los benchmarks de Tk
+necesitan una pantalla; en Linux sin DISPLAY se usa pyvirtualdisplay (Xvfb) si está instalado.
+
+Uso:
+    python benchmark.py                      # ejecuta y compara contra la línea base
+    python benchmark.py --guardar            # ejecuta y guarda la línea base
+    python benchmark.py --completo           # incluye Tk con 100k campañas y 1M clics
+    python benchmark.py --campanas 100 1000 --sin-tk
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from config import ALLOWED_CODES
+from click_index import IndiceClics
+from campaign_index import IndiceCampanas
+from selection_model import ModeloSeleccion
+from campaign_logic import (agrupar_por_pais, agrupar_por_fecha_y_prefijo, calculate_subtotals,
+                            seleccionar_campanas, mostrar_campanas_en_tabla)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+TAMANOS_CAMPANAS = [100, 1000, 10000, 100000]
+TAMANOS_CLICS = [10000, 100000, 1000000]
+
+# Límites por defecto para los benchmarks de Tk (insertar 1M filas en un Treeview tarda minutos)
+MAX_CAMPANAS_TK = 10000
+MAX_CLICS_TK = 100000
+
+# Variación relativa a partir de la cual un resultado se marca como regresión
+UMBRAL_REGRESION = 0.20
+
+PREFIJOS = ["promo", "newsletter", "flash", "black", "lanzamiento", "outlet", "vip", "recordatorio"]
+DESCRIPCIONES = ["ofertas", "semana", "descuentos", "nuevos", "temporada", "envio", "gratis", "regalos"]
+
+
+def generar_campanas(n, semilla=42, fecha_inicio="2025-01-01", dias=180):
+    """
+    Genera n campañas sintéticas con la misma forma de tupla que devuelve obtener_campanas.
+
+    Returns:
+        list: Lista de tuplas de 18 elementos ordenadas por índice.
+    """
+    rnd = random.Random(semilla)
+    codigos = sorted(ALLOWED_CODES)
+    inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d")
+    campanas = []
+    for idx in range(1, n + 1):
+        pais = rnd.choice(codigos)
+        nombre = f"{rnd.choice(PREFIJOS)}_{rnd.choice(DESCRIPCIONES)}_{idx}_{pais}"
+        send_time = (inicio + timedelta(days=rnd.randrange(dias), seconds=rnd.randrange(86400))).strftime("%Y-%m-%d %H:%M:%S")
+        open_rate = round(rnd.uniform(5, 60), 2)
+        click_rate = round(rnd.uniform(0.1, 8), 2)
+        delivered = rnd.randrange(500, 200000)
+        opens_unicos = int(delivered * open_rate / 100)
+        audiences = "N/A" if rnd.random() < 0.3 else f"Inc: Lista {pais.upper()}, Compradores; Exc: Bajas"
+        order_unique = rnd.randrange(0, 300)
+        order_count = order_unique + rnd.randrange(0, 20)
+        order_sum_value_local = round(order_count * rnd.uniform(10, 150), 2)
+        order_sum_value = round(order_sum_value_local / rnd.uniform(1, 30), 2)
+        per_recipient = order_sum_value / delivered
+        campanas.append((
+            idx, f"C{idx:08d}", nombre, send_time, open_rate, click_rate, delivered, opens_unicos,
+            f"Asunto {idx}", f"Preview {idx}", f"T{idx:06d}", audiences, order_unique,
+            order_sum_value, order_sum_value_local, order_count, per_recipient, "Principal"
+        ))
+    return campanas
+
+
+def generar_clics(campanas, n_filas, semilla=42):
+    """
+    Reparte n_filas URLs clicadas entre las campañas, con la estructura de Analyzer.
+
+    Returns:
+        tuple: (all_click_data, last_results)
+    """
+    rnd = random.Random(semilla)
+    all_click_data = {}
+    last_results = {}
+    por_campana = max(1, n_filas // len(campanas))
+    restantes = n_filas
+    for camp in campanas:
+        if restantes <= 0:
+            break
+        _, _, name, send_time, *_ = camp
+        send_date = send_time[:10]
+        totales = {}
+        for j in range(min(por_campana, restantes)):
+            tipo = rnd.random()
+            if tipo < 0.4:
+                url = f"https://tienda.example.com/producto/articulo-{j}/SKU{rnd.randrange(100000):05d}?utm_source=klaviyo"
+            elif tipo < 0.7:
+                url = f"https://tienda.example.com/categoria/seccion-{j}/{rnd.randrange(500)}?utm_source=klaviyo"
+            else:
+                url = f"https://tienda.example.com/pagina/{j}?utm_source=klaviyo"
+            count = rnd.randrange(1, 500)
+            totales[url] = {"count": count, "unique": rnd.randrange(1, count + 1)}
+        restantes -= len(totales)
+        total_clicks = sum(d["count"] for d in totales.values())
+        all_click_data.setdefault(send_date, {})[name] = (total_clicks, totales)
+        last_results[(name, send_date)] = totales
+    return all_click_data, last_results
+
+
+def medir(funcion, repeticiones=3):
+    """Ejecuta la función varias veces y devuelve el mejor tiempo en segundos."""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+        # Las corridas largas no necesitan repetirse para ser estables
+        if duracion > 2:
+            break
+    return mejor
+
+
+def benchmarks_cpu(tamanos):
+    """Benchmarks que no necesitan Tk."""
+    resultados = {}
+    for n in tamanos:
+        campanas = generar_campanas(n)
+        resultados[f"calculate_subtotals[n={n}]"] = medir(lambda: calculate_subtotals(campanas, True))
+        resultados[f"agrupar_por_pais[n={n}]"] = medir(lambda: agrupar_por_pais(campanas))
+        resultados[f"agrupar_por_fecha_y_prefijo[n={n}]"] = medir(lambda: agrupar_por_fecha_y_prefijo(campanas))
+        resultados[f"IndiceCampanas[n={n}]"] = medir(lambda: IndiceCampanas(campanas))
+        consulta = "hn, gt, promo, flash, 1, 5, 50, 500"
+        resultados[f"seleccionar_campanas[n={n}]"] = medir(lambda: seleccionar_campanas(campanas, consulta))
+        consulta_compuesta = "hn & !promo, 1-50, 2025-03-01..2025-03-07 & nombre:ofertas"
+        resultados[f"seleccionar_campanas_compuesta[n={n}]"] = medir(lambda: seleccionar_campanas(campanas, consulta_compuesta))
+        print(f"  CPU n={n} listo")
+    return resultados
+
+
+def benchmarks_indice_clics(tamanos_clics):
+    """Benchmarks del índice de clics entre campañas (construcción y resumen agrupado)."""
+    resultados = {}
+    campanas = generar_campanas(1000)
+    seleccion = {camp[1] for camp in campanas[::2]}
+    for filas in tamanos_clics:
+        all_click_data, _ = generar_clics(campanas, filas)
+        por_nombre = {camp[2]: camp[1] for camp in campanas}
+
+        def construir():
+            indice = IndiceClics()
+            for send_date, campanas_fecha in all_click_data.items():
+                for name, (_, totales) in campanas_fecha.items():
+                    indice.agregar(por_nombre[name], name, send_date, totales)
+            return indice
+
+        resultados[f"IndiceClics.agregar[filas={filas}]"] = medir(construir, repeticiones=2)
+        indice = construir()
+        for dimension in ("Producto", "URL"):
+            resultados[f"IndiceClics.resumen[{dimension},filas={filas}]"] = medir(lambda: indice.resumen(dimension, seleccion))
+        print(f"  Índice clics={filas} listo")
+    return resultados
+
+
+def _crear_root_tk():
+    """Crea una raíz de Tk oculta, iniciando una pantalla virtual si hace falta."""
+    import tkinter as tk
+    pantalla = None
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        try:
+            from pyvirtualdisplay import Display
+            pantalla = Display(visible=False, size=(1920, 1080))
+            pantalla.start()
+        except Exception as e:
+            print(f"Sin pantalla disponible ({e}). Instala Xvfb y pyvirtualdisplay para los benchmarks de Tk.")
+            return None, None
+    try:
+        root = tk.Tk()
+        root.withdraw()
+    except tk.TclError as e:
+        print(f"No se pudo iniciar Tk: {e}")
+        if pantalla:
+            pantalla.stop()
+        return None, None
+    return root, pantalla
+
+
+def benchmarks_tk(tamanos_campanas, tamanos_clics):
+    """Benchmarks del renderizado de tablas, el filtro de clics y la exportación."""
+    root, pantalla = _crear_root_tk()
+    if root is None:
+        return {}
+
+    import tkinter as tk
+    from tkinter import ttk
+    from analyzer import Analyzer
+    from exporter import Exporter
+
+    resultados = {}
+    try:
+        tree = ttk.Treeview(root, show="headings")
+        modelo = ModeloSeleccion()
+        for n in tamanos_campanas:
+            campanas = generar_campanas(n)
+            for grouping in ("País", "Fecha"):
+                resultados[f"mostrar_campanas_en_tabla[{grouping},n={n}]"] = medir(
+                    lambda: mostrar_campanas_en_tabla(campanas, tree, grouping, True, modelo=modelo), repeticiones=2)
+
+            # La exportación lee la tabla renderizada, igual que en la aplicación
+            mostrar_campanas_en_tabla(campanas, tree, "Fecha", True, modelo=modelo)
+            log_tabla = ttk.Treeview(root, columns=("a", "b", "c", "d", "e"), show="headings")
+            exporter = Exporter(campanas, tree, tk.StringVar(value="Fecha"), {}, True, log_tabla, modelo_seleccion=modelo)
+            with tempfile.TemporaryDirectory() as tmp:
+                ruta = os.path.join(tmp, "bench.zip")
+                resultados[f"Exporter.exportar[n={n}]"] = medir(lambda: exporter.exportar_a_zip(ruta), repeticiones=2)
+            log_tabla.destroy()
+            print(f"  Tk n={n} listo")
+
+        campanas = generar_campanas(min(max(tamanos_campanas), 1000))
+        resultados_tabla = ttk.Treeview(root, columns=("Campaign", "Clics Totales", "URL", "Clics Totales URL", "Clics Únicos", "SKU"), show="headings")
+        resultados_label = tk.Label(root)
+        filter_var = tk.StringVar(value="Todos")
+        for filas in tamanos_clics:
+            all_click_data, last_results = generar_clics(campanas, filas)
+            analyzer = Analyzer(campanas, last_results, resultados_tabla, resultados_label, None, None, None, None,
+                                root, None, None, None, filter_var, None, tree)
+            for send_date, campanas_fecha in all_click_data.items():
+                for name, (total_clicks, totales) in campanas_fecha.items():
+                    analyzer.registrar_clics(send_date, name, total_clicks, totales)
+            for filtro in ("Todos", "Producto", "Categoría"):
+                filter_var.set(filtro)
+                resultados[f"Analyzer.apply_filter[{filtro},filas={filas}]"] = medir(analyzer.apply_filter, repeticiones=2)
+
+            exporter = Exporter([], tree, tk.StringVar(value="Fecha"), last_results, True, resultados_tabla, modelo_seleccion=modelo)
+            with tempfile.TemporaryDirectory() as tmp:
+                ruta = os.path.join(tmp, "bench.zip")
+                resultados[f"Exporter.exportar[clics,filas={filas}]"] = medir(lambda: exporter.exportar_a_zip(ruta), repeticiones=1)
+            print(f"  Tk clics={filas} listo")
+    finally:
+        root.destroy()
+        if pantalla:
+            pantalla.stop()
+    return resultados
+
+
+def cargar_linea_base():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        return json.load(f).get("resultados", {})
+
+
+def guardar_linea_base(resultados):
+    contenido = {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+    with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+        json.dump(contenido, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def comparar(resultados, linea_base):
+    """Imprime los tiempos junto a la línea base y devuelve la lista de regresiones."""
+    regresiones = []
+    ancho = max(len(nombre) for nombre in resultados)
+    for nombre, segundos in resultados.items():
+        base = linea_base.get(nombre)
+        if base:
+            delta = (segundos - base) / base
+            marca = "  ⚠️ REGRESIÓN" if delta > UMBRAL_REGRESION else ""
+            if marca:
+                regresiones.append(nombre)
+            print(f"{nombre:<{ancho}}  {segundos * 1000:10.2f} ms  (base {base * 1000:10.2f} ms, {delta:+.0%}){marca}")
+        else:
+            print(f"{nombre:<{ancho}}  {segundos * 1000:10.2f} ms  (sin línea base)")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de CPU de Klaviyo Analyzer")
+    parser.add_argument("--campanas", type=int, nargs="+", default=TAMANOS_CAMPANAS, help="Tamaños de campañas a medir")
+    parser.add_argument("--clics", type=int, nargs="+", default=TAMANOS_CLICS, help="Cantidades de filas de clics a medir")
+    parser.add_argument("--sin-tk", action="store_true", help="Omitir los benchmarks que necesitan Tk")
+    parser.add_argument("--completo", action="store_true", help="No limitar los tamaños de los benchmarks de Tk")
+    parser.add_argument("--guardar", action="store_true", help="Guardar los resultados como nueva línea base")
+    args = parser.parse_args()
+
+    print("Benchmarks de CPU...")
+    resultados = benchmarks_cpu(args.campanas)
+    resultados.update(benchmarks_indice_clics(args.clics))
+
+    if not args.sin_tk:
+        tamanos_tk = args.campanas if args.completo else [n for n in args.campanas if n <= MAX_CAMPANAS_TK]
+        clics_tk = args.clics if args.completo else [n for n in args.clics if n <= MAX_CLICS_TK]
+        print("Benchmarks de Tk...")
+        resultados.update(benchmarks_tk(tamanos_tk, clics_tk))
+
+    regresiones = comparar(resultados, cargar_linea_base())
+
+    if args.guardar:
+        guardar_linea_base(resultados)
+        print(f"Línea base guardada en {BASELINE_FILE}")
+    elif regresiones:
+        print(f"{len(regresiones)} regresiones superan el {UMBRAL_REGRESION:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+# campaign_index.py
+"""
+Índice invertido de campañas para seleccionar las que se analizan.
+
+Se construye una sola vez por lista de campañas: para cada país, prefijo, palabra del
+nombre, fecha de envío e índice guarda una máscara de bits (un int de Python) con la
+posición de cada campaña. Las consultas combinan máscaras con &, | y ~, así que el costo
+no depende de cuántas campañas haya sino de cuántos términos tenga la consulta.
+"""
+import re
+import threading
+from bisect import bisect_left, bisect_right
+
+from config import ALLOWED_CODES
+
+_RE_FECHA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_RE_RANGO_INDICES = re.compile(r"^(\d+)\s*-\s*(\d+)$")
+_RE_SEPARADORES = re.compile(r"[\W_]+")
+
+
+def posiciones(mascara):
+    """Devuelve, en orden, las posiciones de los bits encendidos de una máscara."""
+    bits = format(mascara, "b")[::-1]
+    resultado = []
+    posicion = bits.find("1")
+    while posicion != -1:
+        resultado.append(posicion)
+        posicion = bits.find("1", posicion + 1)
+    return resultado
+
+
+def _mascara_rango(claves, orden, consecutivo, desde, hasta):
+    """
+    Máscara de las campañas cuya clave está en [desde, hasta].
+
+    Args:
+        claves (list): Claves ordenadas (números de campaña).
+        orden (list): Posición de la campaña de cada clave.
+        consecutivo (bool): True si orden es 0, 1, 2, ... (el rango son bits contiguos).
+        desde, hasta (int): Límites incluidos.
+    """
+    inicio = bisect_left(claves, desde)
+    fin = bisect_right(claves, hasta)
+    if inicio >= fin:
+        return 0
+    if consecutivo:
+        return ((1 << (fin - inicio)) - 1) << inicio
+    mascara = 0
+    for posicion in orden[inicio:fin]:
+        mascara |= 1 << posicion
+    return mascara
+
+
+class IndiceCampanas:
+    """
+    Índice de búsqueda sobre una lista de campañas (tuplas de obtener_campanas).
+
+    Sintaxis de consulta:
+        - "," separa alternativas (O): "hn, gt".
+        - "&" exige todas las condiciones (Y): "hn & promo".
+        - "!" niega una condición: "hn & !promo".
+        - "12" es el número de campaña y "1-50" un rango de números.
+        - "2025-06-01" es una fecha de envío; "2025-06-01..2025-06-07" un rango de fechas
+          (se puede omitir un extremo: "2025-06-01..", "..2025-06-07").
+        - Un código de país ("hn") selecciona las campañas de ese país.
+        - "nombre:texto" busca el texto en las palabras del nombre.
+        - Cualquier otro texto se busca en el prefijo del nombre (lo anterior al primer "_").
+    """
+
+    def __init__(self, campanas):
+        self.campanas = campanas
+        self.todas = (1 << len(campanas)) - 1
+        self.paises = {}
+        self.prefijos = {}
+        self.palabras = {}
+        self.fechas = {}
+        self._lock = threading.Lock()
+        self._terminos = {}  # Máscaras ya resueltas por término (e.g. subcadenas de prefijo)
+
+        por_indice = []
+        for posicion, camp in enumerate(campanas):
+            bit = 1 << posicion
+            idx, _, name, send_time = camp[:4]
+            por_indice.append((idx, posicion))
+            partes = name.split("_")
+            if len(partes) > 1:
+                pais = partes[-1].strip().lower()
+                self.paises[pais] = self.paises.get(pais, 0) | bit
+            prefijo = partes[0].lower()
+            self.prefijos[prefijo] = self.prefijos.get(prefijo, 0) | bit
+            for palabra in set(_RE_SEPARADORES.split(name.lower())):
+                if palabra:
+                    self.palabras[palabra] = self.palabras.get(palabra, 0) | bit
+            fecha = send_time[:10]
+            self.fechas[fecha] = self.fechas.get(fecha, 0) | bit
+
+        por_indice.sort()
+        self._indices = [idx for idx, _ in por_indice]
+        self._orden_indices = [posicion for _, posicion in por_indice]
+        self._indices_consecutivos = self._orden_indices == list(range(len(campanas)))
+        self._fechas = sorted(self.fechas)
+
+    def __len__(self):
+        return len(self.campanas)
+
+    def consultar(self, consulta):
+        """
+        Resuelve una consulta a una máscara de bits de posiciones de campañas.
+
+        Args:
+            consulta (str): Consulta con la sintaxis descrita en la clase.
+
+        Returns:
+            int: Máscara con un bit encendido por campaña seleccionada.
+        """
+        resultado = 0
+        for alternativa in consulta.lower().split(","):
+            condiciones = [c.strip() for c in alternativa.split("&") if c.strip()]
+            if not condiciones:
+                continue
+            mascara = self.todas
+            for condicion in condiciones:
+                negada = False
+                while condicion.startswith("!"):
+                    negada = not negada
+                    condicion = condicion[1:].strip()
+                valor = self._termino(condicion) if condicion else 0
+                mascara &= (self.todas & ~valor) if negada else valor
+                if not mascara:
+                    break
+            resultado |= mascara
+        return resultado
+
+    def seleccionar(self, consulta):
+        """Devuelve las campañas que cumplen la consulta, ordenadas por índice."""
+        seleccionados = [self.campanas[posicion] for posicion in posiciones(self.consultar(consulta))]
+        return sorted(seleccionados, key=lambda x: x[0])
+
+    def _termino(self, termino):
+        """Máscara de un término simple (sin &, ! ni ,), memorizada."""
+        with self._lock:
+            mascara = self._terminos.get(termino)
+        if mascara is None:
+            mascara = self._resolver(termino)
+            with self._lock:
+                self._terminos[termino] = mascara
+        return mascara
+
+    def _resolver(self, termino):
+        if termino.isdigit():
+            return self._rango_indices(int(termino), int(termino))
+        rango = _RE_RANGO_INDICES.match(termino)
+        if rango:
+            return self._rango_indices(int(rango.group(1)), int(rango.group(2)))
+        if _RE_FECHA.match(termino):
+            return self.fechas.get(termino, 0)
+        if ".." in termino:
+            desde, _, hasta = (parte.strip() for parte in termino.partition(".."))
+            if (desde or hasta) and all(not parte or _RE_FECHA.match(parte) for parte in (desde, hasta)):
+                inicio = bisect_left(self._fechas, desde) if desde else 0
+                fin = bisect_right(self._fechas, hasta) if hasta else len(self._fechas)
+                return self._union(self.fechas, self._fechas[inicio:fin])
+        if termino.startswith("nombre:"):
+            mascara = self.todas
+            for palabra in _RE_SEPARADORES.split(termino[len("nombre:"):]):
+                if palabra:
+                    mascara &= self._union(self.palabras, [p for p in self.palabras if palabra in p])
+            return mascara
+        if len(termino) == 2 and termino in ALLOWED_CODES:
+            return self.paises.get(termino, 0)
+        return self._union(self.prefijos, [p for p in self.prefijos if termino in p])
+
+    def _rango_indices(self, desde, hasta):
+        return _mascara_rango(self._indices, self._orden_indices, self._indices_consecutivos, desde, hasta)
+
+    @staticmethod
+    def _union(postings, claves):
+        mascara = 0
+        for clave in claves:
+            mascara |= postings[clave]
+        return mascara
+
+
+_ultimo_indice = None
+_lock_indice = threading.Lock()
+
+
+def indice_de(campanas):
+    """
+    Devuelve el índice de una lista de campañas, construyéndolo solo la primera vez.
+
+    Se conserva el índice de la última lista usada: las consultas repetidas sobre las
+    campañas cargadas (análisis, resumen SKU/URL) no vuelven a recorrerlas.
+    """
+    global _ultimo_indice
+    with _lock_indice:
+        if _ultimo_indice is None or _ultimo_indice.campanas is not campanas or len(_ultimo_indice) != len(campanas):
+            _ultimo_indice = IndiceCampanas(campanas)
+        return _ultimo_indice
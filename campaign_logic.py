@@ -1,25 +1,32 @@
 # campaign_logic.py
 import requests
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from config import ALLOWED_CODES, COUNTRY_TO_CURRENCY, CURRENCY_SYMBOLS, HEADERS_KLAVIYO, CURRENCIES, KLAVIYO_URLS
-from klaviyo_api import get_campaign_metrics, get_campaign_details, preload_campaign_details, query_metric_aggregates_post, get_campaign_message_subject
+from config import ALLOWED_CODES, COUNTRY_TO_CURRENCY, CURRENCY_SYMBOLS, CURRENCIES, KLAVIYO_URLS
+from klaviyo_api import get_campaign_metrics, get_campaign_details, preload_campaign_details, query_metric_aggregates_post, get_message_details, klaviyo_request, elegir_intervalo
+from ingest import decodificar_json, extraer_detalle
+from instrumentation import instrumentacion
+from circuit_breaker import esperar_reintento
+from cancellation import OperacionCancelada
+from campaign_index import indice_de
+from accounts import cuenta_actual, cuentas_activas, obtener_cuenta, usar_cuenta, registrar_ids
 from exchange_rates import obtener_tasas_de_cambio
 from utils import format_number, format_percentage
-import time
+from phase_profiler import perfilar
 
-def get_campaign_audiences_with_cache(campaign_data, audience_cache, update_callback=None):
+# Motivos por los que una carga quedó incompleta (ver obtener_campanas)
+CUENTA_FALLIDA = "cuenta fallida"
+SIN_ORDENES = "sin métricas de órdenes"
+SIN_TASAS = "sin tasas de cambio"
+
+def get_campaign_audiences_with_cache(detalle, audience_cache, update_callback=None):
     """
-    Extrae información de audiencias usando un cache de nombres precargado.
+    Extrae información de audiencias de un DetalleCampana usando un cache de nombres precargado.
     """
     try:
-        audiences = campaign_data['data']['attributes'].get('audiences', {})
-        
-        if not audiences:
-            return "N/A"
-            
-        included = audiences.get('included', [])
-        excluded = audiences.get('excluded', [])
+        included = detalle.included
+        excluded = detalle.excluded
         
         result_parts = []
         
@@ -52,16 +59,11 @@ def get_campaign_audiences_with_cache(campaign_data, audience_cache, update_call
             update_callback(f"Error al obtener audiencias con cache: {str(e)}")
         return "N/A"
 
-def extract_full_audience_data(campaign_data, audience_cache):
-    """Extrae los datos completos de audiencias con nombres completos."""
+def extract_full_audience_data(detalle, audience_cache):
+    """Extrae los datos completos de audiencias de un DetalleCampana con nombres completos."""
     try:
-        audiences = campaign_data['data']['attributes'].get('audiences', {})
-        
-        if not audiences:
-            return None
-            
-        included = audiences.get('included', [])
-        excluded = audiences.get('excluded', [])
+        included = detalle.included
+        excluded = detalle.excluded
         
         result = {}
         
@@ -76,9 +78,12 @@ def extract_full_audience_data(campaign_data, audience_cache):
     except (KeyError, TypeError):
         return None
 
-def preload_campaign_details_with_audiences(campaign_ids, cache, audience_cache, temp_data, update_callback=None, view_manager=None):
+def preload_campaign_details_with_audiences(campaign_ids, cache, audience_cache, detalles, update_callback=None, view_manager=None, token=None):
     """
-    Precarga los detalles de múltiples campañas usando el cache de audiencias.
+    Precarga los detalles de múltiples campañas usando el cache de audiencias y los
+    registros DetalleCampana de la primera pasada (las que faltan se descargan aquí).
+    Si el token se cancela, las campañas ya descargadas se completan sin subject ni preview
+    y las demás se omiten.
     """
     count = 0
     total_campaigns = len(campaign_ids)
@@ -93,43 +98,54 @@ def preload_campaign_details_with_audiences(campaign_ids, cache, audience_cache,
                 update_callback(f"ACTUALIZAR:Procesando detalles de campañas ({count}/{total_campaigns})")
             
             try:
-                if campaign_id in temp_data:
-                    campaign_data = temp_data[campaign_id]
+                if campaign_id in detalles:
+                    detalle = detalles[campaign_id]
+                elif token is not None and token.cancelado:
+                    continue
                 else:
                     url = f"{KLAVIYO_URLS['CAMPAIGN_DETAILS']}{campaign_id}/"
-                    response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+                    response = klaviyo_request("GET", url, token=token)
                     if response.status_code == 200:
-                        campaign_data = response.json()
+                        detalle = extraer_detalle(campaign_id, decodificar_json(response))
                     elif response.status_code == 429:
-                        retry_after = int(response.headers.get('Retry-After', 17))
+                        retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
                         if update_callback:
                             update_callback(f"ACTUALIZAR:Rate limit - esperando {retry_after}s (campaña {count}/{total_campaigns})")
-                        time.sleep(retry_after)
-                        response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+                        esperar_reintento(url, retry_after, token)
+                        response = klaviyo_request("GET", url, token=token)
                         if response.status_code == 200:
-                            campaign_data = response.json()
+                            detalle = extraer_detalle(campaign_id, decodificar_json(response))
                         else:
                             continue
                     else:
                         continue
                 
-                campaign_name = campaign_data['data']['attributes'].get('name', f"Campaign {campaign_id}")
-                send_time = campaign_data['data']['attributes'].get('send_time', 'N/A')
+                campaign_name = detalle.name
+                send_time = detalle.send_time
                 
                 if send_time != 'N/A':
                     send_time = datetime.fromisoformat(send_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
 
-                subject_line, preview_text, template_id = get_campaign_message_subject(campaign_data, None)
-                audiences_info = get_campaign_audiences_with_cache(campaign_data, audience_cache, None)
+                subject_line, preview_text, template_id = "No Subject Line", "No Preview Text", None
+                if detalle.message_id:
+                    try:
+                        if token is not None:
+                            token.verificar()
+                        subject_line, preview_text, template_id = get_message_details(detalle.message_id, None, token)
+                    except OperacionCancelada:
+                        pass
+                audiences_info = get_campaign_audiences_with_cache(detalle, audience_cache, None)
 
                 if view_manager:
-                    full_audiences = extract_full_audience_data(campaign_data, audience_cache)
+                    full_audiences = extract_full_audience_data(detalle, audience_cache)
                     if full_audiences:
                         view_manager.audience_data[f"temp_{campaign_id}"] = full_audiences
 
                 result = (campaign_name, send_time, subject_line, preview_text, template_id, audiences_info)
                 cache[campaign_id] = result
                 
+            except OperacionCancelada:
+                continue
             except Exception as e:
                 if update_callback:
                     update_callback(f"ACTUALIZAR:Error procesando campaña {count}/{total_campaigns}: {str(e)}")
@@ -138,38 +154,235 @@ def preload_campaign_details_with_audiences(campaign_ids, cache, audience_cache,
     if update_callback:
         update_callback(f"ACTUALIZAR:✅ Completado: detalles de {total_campaigns} campañas procesadas")
 
-def obtener_campanas(list_start_date, list_end_date, update_callback, view_manager=None, include_audience_sizes=False):
+def obtener_datos_campanas(campaign_ids, update_callback=None, token=None):
     """
-    Obtiene y procesa las campañas en el rango de fechas especificado.
-    Incluye cálculo de Opens únicos y manejo inteligente de fechas.
+    Primera pasada: obtiene los datos básicos de cada campaña y los IDs de sus audiencias.
+    Cada respuesta se reduce de inmediato a un DetalleCampana y se descarta.
+    Si el token se cancela, devuelve las campañas obtenidas hasta ese momento.
+
+    Returns:
+        tuple: (detalles, all_audience_ids), con detalles {campaign_id: DetalleCampana}
     """
-    # Obtener el ID de la métrica de conversión
-    conversion_metric_id = None
-    try:
-        response = requests.get("https://a.klaviyo.com/api/metrics/", headers=HEADERS_KLAVIYO, timeout=30)
-        response.raise_for_status()
-        metrics_data = response.json()
-        if 'data' in metrics_data:
-            conversion_metric_id = metrics_data['data'][0]['id']
-    except requests.exceptions.RequestException as e:
+    all_audience_ids = []
+    detalles = {}
+    
+    for i, campaign_id in enumerate(campaign_ids):
+        if token is not None and token.cancelado:
+            break
+        if update_callback and i % 10 == 0:
+            update_callback(f"ACTUALIZAR:Extrayendo audiencias de campañas ({i+1}/{len(campaign_ids)})")
+        
+        try:
+            url = f"{KLAVIYO_URLS['CAMPAIGN_DETAILS']}{campaign_id}/"
+            response = klaviyo_request("GET", url, token=token)
+            if response.status_code == 200:
+                detalle = extraer_detalle(campaign_id, decodificar_json(response))
+                detalles[campaign_id] = detalle
+                all_audience_ids.extend(detalle.included + detalle.excluded)
+                
+            elif response.status_code == 429:
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+                if update_callback:
+                    update_callback(f"ACTUALIZAR:Rate limit - esperando {retry_after}s (campaña {i+1}/{len(campaign_ids)})")
+                esperar_reintento(url, retry_after, token)
+                response = klaviyo_request("GET", url, token=token)
+                if response.status_code == 200:
+                    detalle = extraer_detalle(campaign_id, decodificar_json(response))
+                    detalles[campaign_id] = detalle
+                    all_audience_ids.extend(detalle.included + detalle.excluded)
+        except OperacionCancelada:
+            break
+        except Exception as e:
+            if update_callback:
+                update_callback(f"ACTUALIZAR:Error obteniendo campaña {i+1}/{len(campaign_ids)}: {str(e)}")
+
+    return detalles, all_audience_ids
+
+def obtener_nombres_audiencias(unique_audience_ids, update_callback=None, token=None):
+    """
+    Obtiene los nombres de las audiencias únicas, probando primero como lista y luego como segmento.
+    Si el token se cancela, las audiencias restantes quedan con su ID abreviado.
+    """
+    audience_names_cache = {}
+    
+    if update_callback:
+        update_callback(f"Obteniendo nombres de {len(unique_audience_ids)} audiencias únicas...")
+    
+    for i, audience_id in enumerate(unique_audience_ids):
+        if token is not None and token.cancelado:
+            audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
+            continue
         if update_callback:
-            update_callback(f"Error al obtener métricas: {str(e)}")
-        return None, f"Error al obtener métricas: {str(e)}"
+            update_callback(f"ACTUALIZAR:Procesando audiencia {i+1}/{len(unique_audience_ids)}")
+        
+        try:
+            # Intentar como lista primero
+            url = f"{KLAVIYO_URLS['LISTS']}{audience_id}/"
+            response = klaviyo_request("GET", url, token=token)
+            
+            if response.status_code == 200:
+                data = response.json()
+                name = data['data']['attributes'].get('name', f"List-{audience_id[:8]}")
+                audience_names_cache[audience_id] = name
+                continue
+            elif response.status_code == 429:
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+                if update_callback:
+                    update_callback(f"ACTUALIZAR:Rate limit en audiencias - esperando {retry_after}s (audiencia {i+1}/{len(unique_audience_ids)})")
+                esperar_reintento(url, retry_after, token)
+                response = klaviyo_request("GET", url, token=token)
+                if response.status_code == 200:
+                    data = response.json()
+                    name = data['data']['attributes'].get('name', f"List-{audience_id[:8]}")
+                    audience_names_cache[audience_id] = name
+                    continue
+            
+            # Intentar como segmento
+            url = f"{KLAVIYO_URLS['SEGMENTS']}{audience_id}/"
+            response = klaviyo_request("GET", url, token=token)
+            
+            if response.status_code == 200:
+                data = response.json()
+                name = data['data']['attributes'].get('name', f"Segment-{audience_id[:8]}")
+                audience_names_cache[audience_id] = name
+            elif response.status_code == 429:
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+                if update_callback:
+                    update_callback(f"ACTUALIZAR:Rate limit en segmentos - esperando {retry_after}s (audiencia {i+1}/{len(unique_audience_ids)})")
+                esperar_reintento(url, retry_after, token)
+                response = klaviyo_request("GET", url, token=token)
+                if response.status_code == 200:
+                    data = response.json()
+                    name = data['data']['attributes'].get('name', f"Segment-{audience_id[:8]}")
+                    audience_names_cache[audience_id] = name
+                else:
+                    audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
+            else:
+                audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
+                    
+        except OperacionCancelada:
+            audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
+            continue
+        except Exception as e:
+            if update_callback:
+                update_callback(f"ACTUALIZAR:Error obteniendo audiencia {i+1}/{len(unique_audience_ids)}: {str(e)}")
+            audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
+    
+    if update_callback:
+        update_callback(f"ACTUALIZAR:✅ Completado: {len(unique_audience_ids)} audiencias procesadas")
+
+    return audience_names_cache
+
+@perfilar("carga")
+def obtener_campanas(list_start_date, list_end_date, update_callback, view_manager=None, include_audience_sizes=False, token=None, cuentas=None,
+                     degradaciones=None):
+    """
+    Obtiene y procesa las campañas en el rango de fechas especificado, de una o varias
+    cuentas de Klaviyo. Las cuentas se cargan en paralelo (cada una con su limitador) y
+    sus campañas se combinan en una sola lista, ordenada por fecha de envío.
+
+    Args:
+        cuentas (list, optional): Cuentas a cargar; por defecto accounts.cuentas_activas().
+        degradaciones (list, optional): Si se indica, se le agregan tuplas (cuenta, motivo)
+            por cada parte que no se pudo cargar: CUENTA_FALLIDA (sus campañas no están),
+            SIN_ORDENES (órdenes y valores en 0) o SIN_TASAS (valores sin convertir a USD).
+            Una carga con degradaciones no debe tomarse como completa para su rango.
+
+    Returns:
+        tuple: (campanas, error). Cada campaña es una tupla de 18 elementos; el último es
+            el nombre de su cuenta.
+    """
+    cuentas = cuentas or cuentas_activas()
+    if len(cuentas) == 1:
+        with usar_cuenta(cuentas[0]):
+            return _obtener_campanas_cuenta(list_start_date, list_end_date, update_callback, view_manager,
+                                            include_audience_sizes, token, degradaciones)
+
+    if update_callback:
+        update_callback(f"Cargando {len(cuentas)} cuentas en paralelo: {', '.join(c.nombre for c in cuentas)}")
+
+    def cargar(cuenta):
+        with usar_cuenta(cuenta):
+            try:
+                return _obtener_campanas_cuenta(list_start_date, list_end_date, _callback_de_cuenta(update_callback, cuenta),
+                                                view_manager, include_audience_sizes, token, degradaciones)
+            except Exception as e:
+                return None, f"Error inesperado: {str(e)}"
+
+    with ThreadPoolExecutor(max_workers=len(cuentas)) as executor:
+        resultados = list(executor.map(cargar, cuentas))
 
-    if not conversion_metric_id:
+    campanas, errores = [], []
+    for cuenta, (campanas_cuenta, error) in zip(cuentas, resultados):
+        if campanas_cuenta:
+            campanas.extend(campanas_cuenta)
+        elif error:
+            errores.append(f"{cuenta.nombre}: {error}")
+            if degradaciones is not None:
+                degradaciones.append((cuenta.nombre, CUENTA_FALLIDA))
+    if not campanas:
+        return None, "; ".join(errores) or "No se encontraron campañas en ninguna cuenta."
+    if update_callback:
+        for error in errores:
+            update_callback(f"⚠️ {error}")
+        update_callback(f"✅ {len(campanas)} campañas combinadas de {len(cuentas) - len(errores)} cuentas")
+
+    # Renumerar las campañas combinadas por fecha de envío
+    campanas.sort(key=lambda camp: camp[3])
+    return [(idx,) + camp[1:] for idx, camp in enumerate(campanas, start=1)], None
+
+
+def _callback_de_cuenta(update_callback, cuenta):
+    """Antepone el nombre de la cuenta a los mensajes de progreso de su carga."""
+    if not update_callback:
+        return None
+
+    def callback(mensaje):
+        if mensaje.startswith("ACTUALIZAR:"):
+            update_callback(f"ACTUALIZAR:[{cuenta.nombre}] {mensaje[len('ACTUALIZAR:'):]}")
+        else:
+            update_callback(f"[{cuenta.nombre}] {mensaje}")
+    return callback
+
+
+def _obtener_campanas_cuenta(list_start_date, list_end_date, update_callback, view_manager=None, include_audience_sizes=False, token=None,
+                             degradaciones=None):
+    """
+    Obtiene y procesa las campañas de la cuenta activa en el rango de fechas especificado.
+    Incluye cálculo de Opens únicos y manejo inteligente de fechas.
+
+    Si faltan las tasas de cambio o las métricas de órdenes, las campañas se devuelven igual
+    (con valores sin convertir o en 0) y el motivo se agrega a degradaciones.
+
+    Si el token se cancela (o alcanza su tiempo límite), se omiten las fases de red restantes
+    y se devuelven las campañas cuyos detalles alcanzaron a descargarse.
+    """
+    cuenta = cuenta_actual()
+    cancelado = lambda: token is not None and token.cancelado
+
+    # Resolver por nombre las métricas de órdenes (también usada como conversión del reporte)
+    # desde el catálogo de métricas, que se guarda en disco entre cargas
+    try:
+        with instrumentacion.fase("Catálogo de métricas"):
+            order_metric_id, error = cuenta_actual().catalogo.resolver("ordenes", update_callback, token)
+    except OperacionCancelada as e:
+        return None, f"Carga cancelada: {e}"
+    if error:
         if update_callback:
-            update_callback("No se pudo obtener el ID de la métrica de conversión")
-        return None, "No se pudo obtener el ID de la métrica de conversión."
+            update_callback(error)
+        return None, error
+    conversion_metric_id = order_metric_id
 
     if update_callback:
         update_callback("Obteniendo rango de fechas y detalles de métricas...")
     
     # Intentar con el rango original primero
-    metrics = get_campaign_metrics(list_start_date, list_end_date, conversion_metric_id, update_callback)
+    with instrumentacion.fase("Reporte de métricas"):
+        metrics = get_campaign_metrics(list_start_date, list_end_date, conversion_metric_id, update_callback, token)
     
     # Si no hay campañas, extender el rango automáticamente
     extended_search = False
-    if not metrics:
+    if not metrics and not cancelado():
         if update_callback:
             update_callback("⚠️ No se encontraron campañas en el rango original. Extendiendo búsqueda a los últimos 7 días...")
         
@@ -180,13 +393,17 @@ def obtener_campanas(list_start_date, list_end_date, update_callback, view_manag
             if update_callback:
                 update_callback(f"🔄 Buscando campañas del {extended_start_date} al {list_end_date} (rango extendido)")
             
-            metrics = get_campaign_metrics(extended_start_date, list_end_date, conversion_metric_id, update_callback)
+            with instrumentacion.fase("Reporte de métricas"):
+                metrics = get_campaign_metrics(extended_start_date, list_end_date, conversion_metric_id, update_callback, token)
             extended_search = True
             
         except Exception as e:
             if update_callback:
                 update_callback(f"Error al extender el rango de fechas: {str(e)}")
 
+    if not metrics and cancelado():
+        return None, f"Carga cancelada: {token.motivo}"
+
     if not metrics:
         if update_callback:
             update_callback("No se encontraron campañas incluso con el rango extendido.")
@@ -198,49 +415,16 @@ def obtener_campanas(list_start_date, list_end_date, update_callback, view_manag
     if update_callback:
         update_callback("Obteniendo detalles de las campañas...")
     
-    campaign_ids = [result['groupings']['campaign_id'] for result in metrics]
+    campaign_ids = [metrica.campaign_id for metrica in metrics]
     campaign_details_cache = {}
     
     # Preparar cache de audiencias
     if update_callback:
         update_callback("Precargando información de audiencias...")
     
-    all_audience_ids = []
-    temp_campaign_data = {}
-    
     # Primera pasada: obtener datos básicos de campañas y extraer IDs de audiencias
-    for i, campaign_id in enumerate(campaign_ids):
-        if update_callback and i % 10 == 0:
-            update_callback(f"ACTUALIZAR:Extrayendo audiencias de campañas ({i+1}/{len(campaign_ids)})")
-        
-        try:
-            url = f"{KLAVIYO_URLS['CAMPAIGN_DETAILS']}{campaign_id}/"
-            response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
-            if response.status_code == 200:
-                campaign_data = response.json()
-                temp_campaign_data[campaign_id] = campaign_data
-                
-                audiences = campaign_data['data']['attributes'].get('audiences', {})
-                included = audiences.get('included', [])
-                excluded = audiences.get('excluded', [])
-                all_audience_ids.extend(included + excluded)
-                
-            elif response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 17))
-                if update_callback:
-                    update_callback(f"ACTUALIZAR:Rate limit - esperando {retry_after}s (campaña {i+1}/{len(campaign_ids)})")
-                time.sleep(retry_after)
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
-                if response.status_code == 200:
-                    campaign_data = response.json()
-                    temp_campaign_data[campaign_id] = campaign_data
-                    audiences = campaign_data['data']['attributes'].get('audiences', {})
-                    included = audiences.get('included', [])
-                    excluded = audiences.get('excluded', [])
-                    all_audience_ids.extend(included + excluded)
-        except Exception as e:
-            if update_callback:
-                update_callback(f"ACTUALIZAR:Error obteniendo campaña {i+1}/{len(campaign_ids)}: {str(e)}")
+    with instrumentacion.fase("Detalles de campañas"):
+        detalles, all_audience_ids = obtener_datos_campanas(campaign_ids, update_callback, token)
     
     if update_callback:
         update_callback(f"ACTUALIZAR:✅ Completado: audiencias extraídas de {len(campaign_ids)} campañas")
@@ -248,82 +432,26 @@ def obtener_campanas(list_start_date, list_end_date, update_callback, view_manag
     # Precargar nombres de audiencias únicas
     unique_audience_ids = list(set(all_audience_ids))
     audience_names_cache = {}
+    registrar_ids(cuenta, campaign_ids + unique_audience_ids)
     
     if unique_audience_ids:
-        if update_callback:
-            update_callback(f"Obteniendo nombres de {len(unique_audience_ids)} audiencias únicas...")
-        
-        for i, audience_id in enumerate(unique_audience_ids):
-            if update_callback:
-                update_callback(f"ACTUALIZAR:Procesando audiencia {i+1}/{len(unique_audience_ids)}")
-            
-            try:
-                # Intentar como lista primero
-                url = f"{KLAVIYO_URLS['LISTS']}{audience_id}/"
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    name = data['data']['attributes'].get('name', f"List-{audience_id[:8]}")
-                    audience_names_cache[audience_id] = name
-                    continue
-                elif response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', 10))
-                    if update_callback:
-                        update_callback(f"ACTUALIZAR:Rate limit en audiencias - esperando {retry_after}s (audiencia {i+1}/{len(unique_audience_ids)})")
-                    time.sleep(retry_after)
-                    response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
-                    if response.status_code == 200:
-                        data = response.json()
-                        name = data['data']['attributes'].get('name', f"List-{audience_id[:8]}")
-                        audience_names_cache[audience_id] = name
-                        continue
-                
-                # Intentar como segmento
-                url = f"{KLAVIYO_URLS['SEGMENTS']}{audience_id}/"
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    name = data['data']['attributes'].get('name', f"Segment-{audience_id[:8]}")
-                    audience_names_cache[audience_id] = name
-                elif response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', 10))
-                    if update_callback:
-                        update_callback(f"ACTUALIZAR:Rate limit en segmentos - esperando {retry_after}s (audiencia {i+1}/{len(unique_audience_ids)})")
-                    time.sleep(retry_after)
-                    response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
-                    if response.status_code == 200:
-                        data = response.json()
-                        name = data['data']['attributes'].get('name', f"Segment-{audience_id[:8]}")
-                        audience_names_cache[audience_id] = name
-                    else:
-                        audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
-                else:
-                    audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
-                        
-            except Exception as e:
-                if update_callback:
-                    update_callback(f"ACTUALIZAR:Error obteniendo audiencia {i+1}/{len(unique_audience_ids)}: {str(e)}")
-                audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
-            
-            time.sleep(0.1)  # Pausa para evitar rate limiting
-        
-        if update_callback:
-            update_callback(f"ACTUALIZAR:✅ Completado: {len(unique_audience_ids)} audiencias procesadas")
+        with instrumentacion.fase("Nombres de audiencias"):
+            audience_names_cache = obtener_nombres_audiencias(unique_audience_ids, update_callback, token)
     
     if view_manager:
-        view_manager.set_audience_names_cache(audience_names_cache)
+        view_manager.agregar_nombres_audiencias(audience_names_cache)
     
     # Precargar detalles de campañas
-    preload_campaign_details_with_audiences(
-        campaign_ids, 
-        campaign_details_cache, 
-        audience_names_cache, 
-        temp_campaign_data, 
-        update_callback,
-        view_manager
-    )
+    with instrumentacion.fase("Mensajes de campañas"):
+        preload_campaign_details_with_audiences(
+            campaign_ids, 
+            campaign_details_cache, 
+            audience_names_cache, 
+            detalles, 
+            update_callback,
+            view_manager,
+            token
+        )
 
     if update_callback:
         update_callback("Procesando datos de campañas, métricas de órdenes completadas y tasas de cambio...")
@@ -333,73 +461,54 @@ def obtener_campanas(list_start_date, list_end_date, update_callback, view_manag
     end_dt = datetime.strptime(f"{list_end_date}T23:59:59Z", "%Y-%m-%dT%H:%M:%SZ")
 
     # Determinar las monedas necesarias
-    country_codes = set()
-    for result in metrics:
-        campaign_id = result['groupings']['campaign_id']
-        name, _, _, _, _, _ = campaign_details_cache.get(campaign_id, (f"Campaign {campaign_id}", 'N/A', "No Subject Line", "No Preview Text", None, "N/A"))
-        partes = name.split("_")
-        country_code = partes[-1].strip().lower() if len(partes) > 1 and partes[-1].strip().lower() in ALLOWED_CODES else "us"
-        country_codes.add(country_code)
-    required_currencies = [COUNTRY_TO_CURRENCY.get(code, "USD") for code in country_codes]
+    required_currencies = monedas_requeridas(
+        campaign_details_cache.get(metrica.campaign_id, (f"Campaign {metrica.campaign_id}",))[0] for metrica in metrics
+    )
 
     # Obtener tasas de cambio
-    tasas = obtener_tasas_de_cambio(base="USD", symbols=required_currencies)
+    tasas = None
+    if not cancelado():
+        with instrumentacion.fase("Tasas de cambio"):
+            tasas = obtener_tasas_de_cambio(base="USD", symbols=required_currencies)
     if not tasas:
         if update_callback:
             update_callback("No se pudieron obtener las tasas de cambio. Usando valores originales.")
         tasas = {currency: 1.0 for currency in CURRENCIES}
+        if degradaciones is not None:
+            degradaciones.append((cuenta.nombre, SIN_TASAS))
+    elif degradaciones is not None and set(required_currencies) - set(tasas) - {"USD"}:
+        # valor_en_usd usa 1.0 para las monedas que no vinieron en la respuesta
+        degradaciones.append((cuenta.nombre, SIN_TASAS))
 
     # Obtener métricas de órdenes completadas
-    fecha_inicio = start_dt.strftime('%Y-%m-%dT%H:%M:%SZ')
-    fecha_fin_ordenes = datetime.now(timezone.utc).replace(hour=23, minute=59, second=59).strftime('%Y-%m-%dT%H:%M:%SZ')
-    
-    order_completed_data = {
-        "data": {
-            "type": "metric-aggregate",
-            "attributes": {
-                "interval": "day",
-                "page_size": 500,
-                "timezone": "UTC",
-                "measurements": ["unique", "sum_value", "count"],
-                "by": ["$attributed_message"],
-                "filter": [
-                    f"greater-or-equal(datetime,{fecha_inicio})",
-                    f"less-than(datetime,{fecha_fin_ordenes})"
-                ],
-                "metric_id": "QXw4AK"
-            }
-        }
-    }
-
     order_completed_metrics = defaultdict(lambda: {"unique": 0, "sum_value": 0, "count": 0})
     try:
-        response = requests.post(KLAVIYO_URLS["METRIC_AGGREGATES"], json=order_completed_data, headers=HEADERS_KLAVIYO, timeout=30)
-        response.raise_for_status()
-        data = response.json()["data"]["attributes"]
-        measurements_data = data.get("data", [])
-        for entry in measurements_data:
-            campaign_id = entry["dimensions"][0] if len(entry["dimensions"]) > 0 else "N/A"
-            unique = sum(entry.get("measurements", {}).get("unique", []))
-            sum_value = sum(entry.get("measurements", {}).get("sum_value", []))
-            count = sum(entry.get("measurements", {}).get("count", []))
-            order_completed_metrics[campaign_id]["unique"] += unique
-            order_completed_metrics[campaign_id]["sum_value"] += sum_value
-            order_completed_metrics[campaign_id]["count"] += count
+        if cancelado():
+            raise OperacionCancelada(token.motivo)
+        with instrumentacion.fase("Agregados de órdenes"):
+            order_completed_metrics = obtener_metricas_ordenes(order_metric_id, start_dt, token)
+    except OperacionCancelada:
+        if update_callback:
+            update_callback("⏹️ Carga cancelada: se omiten las métricas de órdenes")
+        if degradaciones is not None:
+            degradaciones.append((cuenta.nombre, SIN_ORDENES))
     except requests.exceptions.RequestException as e:
         if update_callback:
             update_callback(f"Error al obtener métricas de órdenes completadas: {str(e)}")
+        if degradaciones is not None:
+            degradaciones.append((cuenta.nombre, SIN_ORDENES))
 
     # Procesar campañas
-    for result in metrics:
-        campaign_id = result['groupings']['campaign_id']
+    for metrica in metrics:
+        campaign_id = metrica.campaign_id
         name, send_time, subject, preview, template_id, audiences_info = campaign_details_cache.get(
             campaign_id, 
             (f"Campaign {campaign_id}", 'N/A', "No Subject Line", "No Preview Text", None, "N/A")
         )
    
-        open_rate = round(result['statistics']['open_rate'] * 100, 2)
-        click_rate = round(result['statistics']['click_rate'] * 100, 2)
-        delivered = int(result['statistics']['delivered'])
+        open_rate = round(metrica.open_rate * 100, 2)
+        click_rate = round(metrica.click_rate * 100, 2)
+        delivered = int(metrica.delivered)
         
         # Calcular Opens únicos
         opens_unicos = int(delivered * (open_rate / 100))
@@ -409,17 +518,8 @@ def obtener_campanas(list_start_date, list_end_date, update_callback, view_manag
             if send_dt and start_dt <= send_dt <= end_dt:
                 order_metrics = order_completed_metrics[campaign_id]
                 
-                partes = name.split("_")
-                country_code = partes[-1].strip().lower() if len(partes) > 1 and partes[-1].strip().lower() in ALLOWED_CODES else "us"
-                currency = COUNTRY_TO_CURRENCY.get(country_code, "USD")
-                
                 local_value = order_metrics["sum_value"]
-                
-                # Convertir a USD si es necesario
-                usd_value = local_value
-                if country_code not in {"pa", "sv", "vi"}:
-                    usd_rate = tasas.get(currency, 1.0)
-                    usd_value = local_value / usd_rate if usd_rate != 0 else local_value
+                usd_value = valor_en_usd(name, local_value, tasas)
                 
                 per_recipient = usd_value / delivered if delivered > 0 else 0.0
                 
@@ -447,19 +547,158 @@ def obtener_campanas(list_start_date, list_end_date, update_callback, view_manag
                 update_callback(f"Error en formato de send_time para {name}: {send_time} - Error: {ve}")
             return None, f"Formato de send_time inválido para {name}: {send_time}"
 
-    if update_callback:
+    if cancelado():
+        if not filtered_campaigns:
+            return None, f"Carga cancelada: {token.motivo}"
+        if update_callback:
+            update_callback(f"⏹️ Carga cancelada ({token.motivo}) - Resultados parciales: {len(filtered_campaigns)} campañas")
+    elif update_callback:
         update_callback(f"ACTUALIZAR:✅ Carga completada - Total: {len(filtered_campaigns)} campañas")
 
     # Formatear las campañas para la salida
     campaigns_list = [
         (idx, camp['campaign_id'], camp['campaign_name'], camp['send_time'], camp['open_rate'], camp['click_rate'], 
          camp['delivered'], camp['opens_unicos'], camp['subject_line'], camp['preview_text'], camp['template_id'],
-         camp['audiences'], camp['order_unique'], camp['order_sum_value'], camp['order_sum_value_local'], camp['order_count'], camp['per_recipient'])
+         camp['audiences'], camp['order_unique'], camp['order_sum_value'], camp['order_sum_value_local'], camp['order_count'], camp['per_recipient'],
+         cuenta.nombre)
         for idx, camp in enumerate(filtered_campaigns, start=1)
     ]
     
     return campaigns_list, None
 
+def _codigo_pais(name):
+    """Código de país de una campaña según el sufijo de su nombre ("us" si no lo tiene)."""
+    partes = name.split("_")
+    return partes[-1].strip().lower() if len(partes) > 1 and partes[-1].strip().lower() in ALLOWED_CODES else "us"
+
+def monedas_requeridas(nombres):
+    """Monedas locales de las campañas con los nombres indicados."""
+    return sorted({COUNTRY_TO_CURRENCY.get(_codigo_pais(name), "USD") for name in nombres})
+
+def valor_en_usd(name, local_value, tasas):
+    """Convierte a USD el valor de órdenes en moneda local de una campaña."""
+    country_code = _codigo_pais(name)
+    if country_code in {"pa", "sv", "vi"}:
+        return local_value
+    usd_rate = tasas.get(COUNTRY_TO_CURRENCY.get(country_code, "USD"), 1.0)
+    return local_value / usd_rate if usd_rate != 0 else local_value
+
+def obtener_metricas_ordenes(order_metric_id, desde, token=None):
+    """
+    Consulta los agregados de órdenes (únicas, valor y cantidad) atribuidos a cada campaña,
+    desde la fecha indicada hasta el final del día actual (UTC).
+
+    Args:
+        order_metric_id (str): ID de la métrica de órdenes.
+        desde (datetime): Inicio de la consulta.
+        token (TokenCancelacion, optional): Token de cancelación.
+
+    Returns:
+        defaultdict: {campaign_id: {"unique", "sum_value", "count"}}.
+
+    Raises:
+        requests.exceptions.RequestException: Si la consulta falla.
+    """
+    fecha_inicio = desde.strftime('%Y-%m-%dT%H:%M:%SZ')
+    fecha_fin_ordenes = datetime.now(timezone.utc).replace(hour=23, minute=59, second=59).strftime('%Y-%m-%dT%H:%M:%SZ')
+    
+    order_completed_data = {
+        "data": {
+            "type": "metric-aggregate",
+            "attributes": {
+                "interval": elegir_intervalo(),  # Mide únicos: buckets diarios (ver elegir_intervalo)
+                "page_size": 500,
+                "timezone": "UTC",
+                "measurements": ["unique", "sum_value", "count"],
+                "by": ["$attributed_message"],
+                "filter": [
+                    f"greater-or-equal(datetime,{fecha_inicio})",
+                    f"less-than(datetime,{fecha_fin_ordenes})"
+                ],
+                "metric_id": order_metric_id
+            }
+        }
+    }
+
+    order_completed_metrics = defaultdict(lambda: {"unique": 0, "sum_value": 0, "count": 0})
+    response = klaviyo_request("POST", KLAVIYO_URLS["METRIC_AGGREGATES"], json=order_completed_data, token=token)
+    response.raise_for_status()
+    data = response.json()["data"]["attributes"]
+    measurements_data = data.get("data", [])
+    for entry in measurements_data:
+        campaign_id = entry["dimensions"][0] if len(entry["dimensions"]) > 0 else "N/A"
+        unique = sum(entry.get("measurements", {}).get("unique", []))
+        sum_value = sum(entry.get("measurements", {}).get("sum_value", []))
+        count = sum(entry.get("measurements", {}).get("count", []))
+        order_completed_metrics[campaign_id]["unique"] += unique
+        order_completed_metrics[campaign_id]["sum_value"] += sum_value
+        order_completed_metrics[campaign_id]["count"] += count
+    return order_completed_metrics
+
+def refrescar_campanas(campanas, update_callback=None, token=None, degradaciones=None):
+    """
+    Vuelve a consultar las métricas (aperturas, clics, entregas) y los agregados de órdenes
+    de las campañas indicadas, sin recargar sus detalles ni audiencias. Se usa para mantener
+    al día las campañas recientes, cuyas métricas siguen cambiando.
+
+    Args:
+        campanas (list): Tuplas de las campañas a refrescar (de una o varias cuentas).
+        update_callback (callable, optional): Función para informar errores.
+        token (TokenCancelacion, optional): Token de cancelación.
+        degradaciones (list, optional): Como en obtener_campanas; las cuentas cuyas órdenes
+            fallan no se refrescan, así que solo pueden faltar tasas (SIN_TASAS).
+
+    Returns:
+        tuple: (actualizadas, error), con actualizadas como {campaign_id: tupla de campaña
+            con las métricas nuevas} para las campañas que se pudieron refrescar.
+    """
+    tasas = obtener_tasas_de_cambio(base="USD", symbols=monedas_requeridas(camp[2] for camp in campanas))
+    if not tasas:
+        return {}, "No se pudieron obtener las tasas de cambio."
+
+    por_cuenta = defaultdict(list)
+    for camp in campanas:
+        por_cuenta[camp[17]].append(camp)
+
+    actualizadas, errores = {}, []
+    for nombre_cuenta, camps in por_cuenta.items():
+        with usar_cuenta(obtener_cuenta(nombre_cuenta)):
+            try:
+                order_metric_id, error = cuenta_actual().catalogo.resolver("ordenes", update_callback, token)
+                if error:
+                    errores.append(f"{nombre_cuenta}: {error}")
+                    continue
+                desde = min(datetime.strptime(camp[3][:10], "%Y-%m-%d") for camp in camps)
+                hasta = datetime.now().strftime("%Y-%m-%d")
+                metricas = {}
+                for metrica in get_campaign_metrics(desde.strftime("%Y-%m-%d"), hasta, order_metric_id, None, token):
+                    previa = metricas.get(metrica.campaign_id)
+                    if previa is None or metrica.delivered > previa.delivered:
+                        metricas[metrica.campaign_id] = metrica
+                ordenes = obtener_metricas_ordenes(order_metric_id, desde, token)
+            except requests.exceptions.RequestException as e:
+                errores.append(f"{nombre_cuenta}: {str(e)}")
+                continue
+
+        if degradaciones is not None and set(monedas_requeridas(camp[2] for camp in camps)) - set(tasas) - {"USD"}:
+            degradaciones.append((nombre_cuenta, SIN_TASAS))
+        for camp in camps:
+            metrica = metricas.get(camp[1])
+            if metrica is None:
+                continue
+            open_rate = round(metrica.open_rate * 100, 2)
+            click_rate = round(metrica.click_rate * 100, 2)
+            delivered = int(metrica.delivered)
+            orden = ordenes[camp[1]]
+            usd_value = valor_en_usd(camp[2], orden["sum_value"], tasas)
+            per_recipient = usd_value / delivered if delivered > 0 else 0.0
+            actualizadas[camp[1]] = (
+                camp[:4] + (open_rate, click_rate, delivered, int(delivered * (open_rate / 100))) + camp[8:12]
+                + (orden["unique"], usd_value, orden["sum_value"], orden["count"], per_recipient) + camp[17:]
+            )
+
+    return actualizadas, "; ".join(errores) or None
+
 def agrupar_por_pais(campanas):
     """Agrupa campañas por país basándose en el sufijo del nombre."""
     grupos = defaultdict(list)
@@ -470,6 +709,13 @@ def agrupar_por_pais(campanas):
         grupos[pais].append(camp)
     return grupos
 
+def agrupar_por_cuenta(campanas):
+    """Agrupa campañas por la cuenta de Klaviyo de la que se cargaron."""
+    grupos = defaultdict(list)
+    for camp in campanas:
+        grupos[camp[17]].append(camp)
+    return grupos
+
 def agrupar_por_fecha(campanas):
     """Agrupa campañas por fecha de envío."""
     grupos = defaultdict(list)
@@ -498,7 +744,7 @@ def agrupar_por_fecha_y_prefijo(campanas):
 
 def add_campaign_row(camp, show_local_value=True, view_manager=None):
     """Prepara una fila de campaña para mostrar en la tabla."""
-    idx, campaign_id, name, send_time, open_rate, click_rate, delivered, opens_unicos, subject, preview, template_id, audiences, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient = camp
+    idx, campaign_id, name, send_time, open_rate, click_rate, delivered, opens_unicos, subject, preview, template_id, audiences, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient = camp[:17]
     
     partes = name.split("_")
     country_code = partes[-1].strip().lower() if len(partes) > 1 and partes[-1].strip().lower() in ALLOWED_CODES else "us"
@@ -533,171 +779,179 @@ def add_campaign_row(camp, show_local_value=True, view_manager=None):
     
     return values, audiences
 
-def mostrar_campanas_en_tabla(campanas, tree, grouping="País", show_local_value=True, template_ids_dict=None, view_manager=None):
+def calculate_subtotals(camps, show_local_value=True):
+    """Calcula subtotales para un grupo de campañas."""
+    total_delivered = 0
+    total_opens_unicos = 0
+    weighted_open = 0
+    weighted_click = 0
+    total_weight = 0
+    total_unique = 0
+    total_sum_value = 0
+    total_sum_value_local = 0
+    total_count = 0
+    total_per_recipient_weighted = 0
+    total_delivered_for_weight = 0
+
+    for camp in camps:
+        _, _, _, _, open_rate, click_rate, delivered, opens_unicos, _, _, _, _, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient = camp[:17]
+        total_delivered += delivered
+        total_opens_unicos += opens_unicos
+        weighted_open += (open_rate * delivered) / 100
+        weighted_click += (click_rate * delivered) / 100
+        total_weight += delivered
+        total_unique += order_unique
+        total_sum_value += order_sum_value
+        total_sum_value_local += order_sum_value_local
+        total_count += order_count
+        total_per_recipient_weighted += per_recipient * delivered
+        total_delivered_for_weight += delivered
+
+    if total_weight > 0:
+        avg_open_rate = round((weighted_open / total_weight) * 100, 2)
+        avg_click_rate = round((weighted_click / total_weight) * 100, 2)
+        per_recipient_weighted_avg = total_per_recipient_weighted / total_delivered_for_weight if total_delivered_for_weight > 0 else 0.0
+        values = [
+            "",
+            "Subtotal",
+            "",
+            format_percentage(avg_open_rate),
+            format_percentage(avg_click_rate),
+            format_number(total_delivered),
+            format_number(total_opens_unicos),
+            format_number(int(total_unique)),
+            format_number(total_sum_value, is_currency=True),
+        ]
+        if show_local_value:
+            values.append(format_number(total_sum_value_local, is_currency=True))
+        else:
+            values.append("")
+        values.append(format_number(per_recipient_weighted_avg, is_currency=True))
+        values.extend([
+            format_number(int(total_count)),
+            "",
+            "",
+        ])
+        return values, {
+            "delivered": total_delivered,
+            "opens_unicos": total_opens_unicos,
+            "weighted_open": weighted_open,
+            "weighted_click": weighted_click,
+            "total_weight": total_weight,
+            "unique": total_unique,
+            "sum_value": total_sum_value,
+            "sum_value_local": total_sum_value_local,
+            "count": total_count,
+            "per_recipient_weighted": total_per_recipient_weighted,
+            "delivered_for_weight": total_delivered_for_weight
+        }
+    return None, None
+
+@perfilar("tabla")
+def mostrar_campanas_en_tabla(campanas, tree, grouping="País", show_local_value=True, template_ids_dict=None, view_manager=None, modelo=None):
     """
     Muestra las campañas en la tabla principal y actualiza el gran total.
+    Si se pasa un ModeloSeleccion, registra en él la campaña de cada fila.
     """
-    tree.delete(*tree.get_children())
+    with instrumentacion.fase("Renderizado de tabla"):
+        tree.delete(*tree.get_children())
 
-    columns = ("Numero", "Nombre", "FechaEnvio", "OpenRate", "ClickRate", "Recibios", "OpensUnicos", "OrderUnique",
-               "OrderSumValue", "OrderSumValueLocal", "PerRecipient", "OrderCount", "Subject", "Preview")
-    tree["columns"] = columns
+        columns = ("Numero", "Nombre", "FechaEnvio", "OpenRate", "ClickRate", "Recibios", "OpensUnicos", "OrderUnique",
+                   "OrderSumValue", "OrderSumValueLocal", "PerRecipient", "OrderCount", "Subject", "Preview")
+        tree["columns"] = columns
 
-    if view_manager:
-        view_manager.audience_data.clear()
-        view_manager.expanded_rows.clear()
-
-    # Configurar encabezados
-    for col, text in zip(columns, ("# / Audiencias", "Nombre", "Fecha de Envío", "Open Rate", "Click Rate", "Recibidos", "Opens Únicos",
-                                   "Unique Orders", "Total Value (USD)", "Total Value (Local)", "Per Recipient", "Order Count", "Subject Line", "Preview Text")):
-        tree.heading(col, text=text)
-
-    # Configurar anchos de columnas
-    tree.column("Numero", width=80, anchor="center")
-    tree.column("Nombre", width=120)
-    tree.column("FechaEnvio", width=100)
-    tree.column("OpenRate", width=80, anchor="center")
-    tree.column("ClickRate", width=80, anchor="center")
-    tree.column("Recibios", width=100, anchor="center")
-    tree.column("OpensUnicos", width=100, anchor="center")
-    tree.column("OrderUnique", width=80, anchor="center")
-    tree.column("OrderSumValue", width=120, anchor="e")
-    tree.column("OrderSumValueLocal", width=120 if show_local_value else 0, anchor="e", stretch=show_local_value)
-    tree.column("PerRecipient", width=120, anchor="e")
-    tree.column("OrderCount", width=80, anchor="center")
-    tree.column("Subject", width=180)
-    tree.column("Preview", width=180)
-
-    def process_campaign_for_table(camp, show_local_value=True):
-        """Procesa una campaña para mostrarla en la tabla."""
-        values, audiences = add_campaign_row(camp, show_local_value, view_manager)
-        idx = camp[0]
-        campaign_id = camp[1]
-        template_id = camp[10]
+        if view_manager:
+            view_manager.audience_data.clear()
+            view_manager.expanded_rows.clear()
+        if modelo is not None:
+            modelo.limpiar()
+
+        # Configurar encabezados
+        for col, text in zip(columns, ("# / Audiencias", "Nombre", "Fecha de Envío", "Open Rate", "Click Rate", "Recibidos", "Opens Únicos",
+                                       "Unique Orders", "Total Value (USD)", "Total Value (Local)", "Per Recipient", "Order Count", "Subject Line", "Preview Text")):
+            tree.heading(col, text=text)
+
+        # Configurar anchos de columnas
+        tree.column("Numero", width=80, anchor="center")
+        tree.column("Nombre", width=120)
+        tree.column("FechaEnvio", width=100)
+        tree.column("OpenRate", width=80, anchor="center")
+        tree.column("ClickRate", width=80, anchor="center")
+        tree.column("Recibios", width=100, anchor="center")
+        tree.column("OpensUnicos", width=100, anchor="center")
+        tree.column("OrderUnique", width=80, anchor="center")
+        tree.column("OrderSumValue", width=120, anchor="e")
+        tree.column("OrderSumValueLocal", width=120 if show_local_value else 0, anchor="e", stretch=show_local_value)
+        tree.column("PerRecipient", width=120, anchor="e")
+        tree.column("OrderCount", width=80, anchor="center")
+        tree.column("Subject", width=180)
+        tree.column("Preview", width=180)
+
+        def process_campaign_for_table(camp, show_local_value=True):
+            """Procesa una campaña para mostrarla en la tabla."""
+            values, audiences = add_campaign_row(camp, show_local_value, view_manager)
+            idx = camp[0]
+            campaign_id = camp[1]
+            template_id = camp[10]
         
-        item_id = tree.insert("", "end", values=values, tags=(f"campaign_{campaign_id}", "campaign_row"))
+            item_id = tree.insert("", "end", values=values, tags=(f"campaign_{campaign_id}", "campaign_row"))
+            if modelo is not None:
+                modelo.registrar(item_id, camp)
         
-        if template_ids_dict is not None and template_id is not None:
-            template_ids_dict[item_id] = template_id
+            if template_ids_dict is not None and template_id is not None:
+                template_ids_dict[item_id] = template_id
         
-        if view_manager and audiences != "N/A":
-            view_manager.store_audience_data(item_id, audiences)
+            if view_manager and audiences != "N/A":
+                view_manager.store_audience_data(item_id, audiences)
         
-        return item_id
-
-    def calculate_subtotals(camps, show_local_value=True):
-        """Calcula subtotales para un grupo de campañas."""
-        total_delivered = 0
-        total_opens_unicos = 0
-        weighted_open = 0
-        weighted_click = 0
-        total_weight = 0
-        total_unique = 0
-        total_sum_value = 0
-        total_sum_value_local = 0
-        total_count = 0
-        total_per_recipient_weighted = 0
-        total_delivered_for_weight = 0
+            return item_id
 
-        for camp in camps:
-            _, _, _, _, open_rate, click_rate, delivered, opens_unicos, _, _, _, _, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient = camp
-            total_delivered += delivered
-            total_opens_unicos += opens_unicos
-            weighted_open += (open_rate * delivered) / 100
-            weighted_click += (click_rate * delivered) / 100
-            total_weight += delivered
-            total_unique += order_unique
-            total_sum_value += order_sum_value
-            total_sum_value_local += order_sum_value_local
-            total_count += order_count
-            total_per_recipient_weighted += per_recipient * delivered
-            total_delivered_for_weight += delivered
-
-        if total_weight > 0:
-            avg_open_rate = round((weighted_open / total_weight) * 100, 2)
-            avg_click_rate = round((weighted_click / total_weight) * 100, 2)
-            per_recipient_weighted_avg = total_per_recipient_weighted / total_delivered_for_weight if total_delivered_for_weight > 0 else 0.0
-            values = [
-                "",
-                "Subtotal",
-                "",
-                format_percentage(avg_open_rate),
-                format_percentage(avg_click_rate),
-                format_number(total_delivered),
-                format_number(total_opens_unicos),
-                format_number(int(total_unique)),
-                format_number(total_sum_value, is_currency=True),
-            ]
-            if show_local_value:
-                values.append(format_number(total_sum_value_local, is_currency=True))
-            else:
-                values.append("")
-            values.append(format_number(per_recipient_weighted_avg, is_currency=True))
-            values.extend([
-                format_number(int(total_count)),
-                "",
-                "",
-            ])
-            return values, {
-                "delivered": total_delivered,
-                "opens_unicos": total_opens_unicos,
-                "weighted_open": weighted_open,
-                "weighted_click": weighted_click,
-                "total_weight": total_weight,
-                "unique": total_unique,
-                "sum_value": total_sum_value,
-                "sum_value_local": total_sum_value_local,
-                "count": total_count,
-                "per_recipient_weighted": total_per_recipient_weighted,
-                "delivered_for_weight": total_delivered_for_weight
-            }
-        return None, None
-
-    all_subtotals = []
-
-    # Agrupar y mostrar campañas según el tipo de agrupación
-    if grouping == "País":
-        grupos = agrupar_por_pais(campanas)
-        for pais in sorted(grupos.keys()):
-            tree.insert("", "end", values=(f"{pais.upper()}", "", "", "", "", "", "", "", "", "", "", "", "", ""), tags=("bold",))
-            for camp in sorted(grupos[pais], key=lambda x: x[0]):
-                process_campaign_for_table(camp, show_local_value)
-
-            subtotal_values, subtotal_data = calculate_subtotals(grupos[pais], show_local_value)
-            if subtotal_values:
-                tree.insert("", "end", values=subtotal_values, tags=("bold",))
-                all_subtotals.append(subtotal_data)
-            tree.insert("", "end", values=("",) * 14)
-    else:
-        grupos_fecha = defaultdict(lambda: defaultdict(list))
-        for camp in campanas:
-            _, _, name, send_time, *_ = camp
-            try:
-                fecha = datetime.strptime(send_time, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d")
-            except ValueError:
-                fecha = send_time
-            prefijo = name.split("_")[0].lower() if "_" in name else "otro"
-            grupos_fecha[fecha][prefijo].append(camp)
-
-        for fecha in sorted(grupos_fecha.keys()):
-            tree.insert("", "end", values=(fecha, "", "", "", "", "", "", "", "", "", "", "", "", ""), tags=("bold",))
-            for prefijo in sorted(grupos_fecha[fecha].keys()):               
-                tree.insert("", "end", values=(prefijo, "", "", "", "", "", "", "", "", "", "", "", "", ""), tags=("bold",))
-
-                for camp in sorted(grupos_fecha[fecha][prefijo], key=lambda x: x[0]):
+        all_subtotals = []
+
+        # Agrupar y mostrar campañas según el tipo de agrupación
+        if grouping in ("País", "Cuenta"):
+            grupos = agrupar_por_pais(campanas) if grouping == "País" else agrupar_por_cuenta(campanas)
+            for clave in sorted(grupos.keys()):
+                encabezado = clave.upper() if grouping == "País" else clave
+                tree.insert("", "end", values=(encabezado, "", "", "", "", "", "", "", "", "", "", "", "", ""), tags=("bold",))
+                for camp in sorted(grupos[clave], key=lambda x: x[0]):
                     process_campaign_for_table(camp, show_local_value)
 
-                subtotal_values, subtotal_data = calculate_subtotals(grupos_fecha[fecha][prefijo], show_local_value)
+                subtotal_values, subtotal_data = calculate_subtotals(grupos[clave], show_local_value)
                 if subtotal_values:
                     tree.insert("", "end", values=subtotal_values, tags=("bold",))
                     all_subtotals.append(subtotal_data)
                 tree.insert("", "end", values=("",) * 14)
+        else:
+            grupos_fecha = defaultdict(lambda: defaultdict(list))
+            for camp in campanas:
+                _, _, name, send_time, *_ = camp
+                try:
+                    fecha = datetime.strptime(send_time, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d")
+                except ValueError:
+                    fecha = send_time
+                prefijo = name.split("_")[0].lower() if "_" in name else "otro"
+                grupos_fecha[fecha][prefijo].append(camp)
+
+            for fecha in sorted(grupos_fecha.keys()):
+                tree.insert("", "end", values=(fecha, "", "", "", "", "", "", "", "", "", "", "", "", ""), tags=("bold",))
+                for prefijo in sorted(grupos_fecha[fecha].keys()):               
+                    tree.insert("", "end", values=(prefijo, "", "", "", "", "", "", "", "", "", "", "", "", ""), tags=("bold",))
+
+                    for camp in sorted(grupos_fecha[fecha][prefijo], key=lambda x: x[0]):
+                        process_campaign_for_table(camp, show_local_value)
 
-    # Actualizar tabla de gran total si existe
-    if view_manager and hasattr(view_manager, 'grand_total_tabla') and view_manager.grand_total_tabla and all_subtotals:
-        _update_grand_total_table(view_manager, all_subtotals)
+                    subtotal_values, subtotal_data = calculate_subtotals(grupos_fecha[fecha][prefijo], show_local_value)
+                    if subtotal_values:
+                        tree.insert("", "end", values=subtotal_values, tags=("bold",))
+                        all_subtotals.append(subtotal_data)
+                    tree.insert("", "end", values=("",) * 14)
 
-    return all_subtotals
+        # Actualizar tabla de gran total si existe
+        if view_manager and hasattr(view_manager, 'grand_total_tabla') and view_manager.grand_total_tabla and all_subtotals:
+            _update_grand_total_table(view_manager, all_subtotals)
+
+        return all_subtotals
 
 def _update_grand_total_table(view_manager, all_subtotals):
     """
@@ -781,44 +1035,8 @@ def _update_grand_total_table(view_manager, all_subtotals):
 def seleccionar_campanas(campanas, input_str):
     """
     Selecciona campañas basándose en criterios de búsqueda.
-    Soporta búsqueda por índice, código de país o prefijo.
+    Soporta números y rangos de campaña, códigos de país, prefijos, palabras del nombre,
+    fechas y rangos de fechas, combinados con "," (o), "&" (y) y "!" (no).
+    La consulta se resuelve sobre el índice invertido de campaign_index.
     """
-    seleccionados = []
-    vistos = set()
-    
-    tokens = [t.strip().lower() for t in input_str.split(",") if t.strip()]
-    indices = [int(token) - 1 for token in tokens if token.isdigit()]
-    
-    for token in tokens:
-        if len(token) == 2 and token in ALLOWED_CODES:
-            # Búsqueda por código de país
-            for camp in campanas:
-                idx, cid, name, send_time, *_ = camp
-                partes = name.split("_")
-                if len(partes) > 1 and partes[-1].strip().lower() == token:
-                    key = (cid, send_time)
-                    if key not in vistos:
-                        vistos.add(key)
-                        seleccionados.append(camp)
-        elif not token.isdigit():
-            # Búsqueda por prefijo
-            for camp in campanas:
-                idx, cid, name, send_time, *_ = camp
-                partes = name.split("_")
-                if partes and token in partes[0].lower():
-                    key = (cid, send_time)
-                    if key not in vistos:
-                        vistos.add(key)
-                        seleccionados.append(camp)
-    
-    # Búsqueda por índice
-    for idx in indices:
-        if 0 <= idx < len(campanas):
-            camp = campanas[idx]
-            _, cid, _, send_time, *_ = camp
-            key = (cid, send_time)
-            if key not in vistos:
-                vistos.add(key)
-                seleccionados.append(camp)
-    
-    return sorted(seleccionados, key=lambda x: x[0])
\ No newline at end of file
+    return indice_de(campanas).seleccionar(input_str)
\ No newline at end of file
@@ -0,0 +1,95 @@
+# cancellation.py
+import threading
+import time
+
+
+class OperacionCancelada(Exception):
+    """Se lanza cuando una operación se cancela o supera su tiempo límite."""
+
+
+class TokenCancelacion:
+    """
+    Token de cancelación cooperativa con un tiempo límite opcional.
+
+    Las cargas y los análisis lo consultan entre solicitudes; las esperas y las
+    solicitudes HTTP hechas a través del token se interrumpen en cuanto se cancela.
+    """
+
+    def __init__(self, limite_segundos=None):
+        self._evento = threading.Event()
+        self.motivo = None
+        self.deadline = time.monotonic() + limite_segundos if limite_segundos else None
+
+    def cancelar(self, motivo="Cancelado por el usuario"):
+        """Marca el token como cancelado; es seguro llamarlo desde cualquier hilo."""
+        if not self._evento.is_set():
+            self.motivo = motivo
+            self._evento.set()
+
+    @property
+    def cancelado(self):
+        if not self._evento.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancelar("Tiempo límite alcanzado")
+        return self._evento.is_set()
+
+    def restante(self):
+        """Segundos que faltan para el tiempo límite, o None si no hay límite."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def verificar(self):
+        """Lanza OperacionCancelada si el token fue cancelado o expiró."""
+        if self.cancelado:
+            raise OperacionCancelada(self.motivo)
+
+    def esperar(self, segundos):
+        """Duerme hasta `segundos`, despertando en cuanto se cancela o expira el token."""
+        restante = self.restante()
+        if restante is not None:
+            segundos = min(segundos, restante)
+        self._evento.wait(max(0.0, segundos))
+        self.verificar()
+
+
+def dormir(segundos, token=None):
+    """time.sleep interrumpible: si hay token, la espera termina en cuanto se cancela."""
+    if token is None:
+        time.sleep(segundos)
+    else:
+        token.esperar(segundos)
+
+
+def ejecutar_cancelable(funcion, token, intervalo=0.1):
+    """
+    Ejecuta `funcion` en un hilo auxiliar y espera su resultado mientras el token siga activo.
+
+    Si el token se cancela, la espera se abandona de inmediato y se lanza OperacionCancelada;
+    el hilo auxiliar termina por su cuenta y su resultado se descarta.
+
+    Args:
+        funcion (callable): Función sin argumentos a ejecutar (normalmente una solicitud HTTP).
+        token (TokenCancelacion): Token a vigilar.
+        intervalo (float): Cada cuántos segundos se revisa el tiempo límite.
+
+    Returns:
+        El valor devuelto por `funcion`; si `funcion` lanza una excepción, se propaga.
+    """
+    token.verificar()
+    resultado = {}
+    terminado = threading.Event()
+
+    def ejecutar():
+        try:
+            resultado["valor"] = funcion()
+        except BaseException as e:
+            resultado["error"] = e
+        finally:
+            terminado.set()
+
+    threading.Thread(target=ejecutar, daemon=True).start()
+    while not terminado.wait(intervalo):
+        token.verificar()
+    if "error" in resultado:
+        raise resultado["error"]
+    return resultado["valor"]
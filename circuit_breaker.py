@@ -0,0 +1,156 @@
+# circuit_breaker.py
+"""
+Disyuntor por endpoint y presupuesto global de reintentos para las solicitudes a Klaviyo.
+
+Tras CIRCUIT_FAILURE_THRESHOLD fallos seguidos (errores de red o respuestas 5xx) de un
+endpoint, su circuito se abre: durante CIRCUIT_OPEN_SECONDS las solicitudes a ese endpoint
+fallan al instante con CircuitoAbierto, sin esperar timeouts, y los demás endpoints siguen
+funcionando. Después se deja pasar una sola solicitud de prueba; si responde, el circuito
+se cierra, y si falla, vuelve a abrirse.
+
+Los reintentos (tras un 429 o un error) se descuentan de un presupuesto compartido que se
+recarga con las respuestas correctas, así que los reintentos son como máximo una fracción
+del tráfico más una reserva fija: una caída no se convierte en una espera indefinida.
+"""
+import random
+import threading
+import time
+
+import requests
+
+from config import (CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_SECONDS, RETRY_BUDGET, RETRY_BUDGET_RATIO,
+                    RETRY_BACKOFF_MAX_SECONDS)
+from instrumentation import esperar_retry_after, nombre_endpoint
+
+
+class CircuitoAbierto(requests.exceptions.RequestException):
+    """El circuito del endpoint está abierto o se agotó el presupuesto de reintentos."""
+
+    def __init__(self, endpoint, motivo):
+        super().__init__(f"Klaviyo no disponible en {endpoint}: {motivo}")
+        self.endpoint = endpoint
+
+
+class _Circuito:
+    """Estado del circuito de un endpoint."""
+
+    def __init__(self):
+        self.fallos = 0  # Fallos seguidos
+        self.abierto_hasta = 0.0  # Momento (monotonic) hasta el que no se envían solicitudes
+        self.probando = False  # Hay una solicitud de prueba en curso (circuito semiabierto)
+
+
+class Disyuntor:
+    """
+    Circuitos por endpoint y presupuesto de reintentos de una cuenta de Klaviyo.
+
+    klaviyo_request llama a antes_de_solicitud y registrar en cada solicitud; los bucles de
+    reintento esperan con esperar_reintento, que descuenta del presupuesto.
+    """
+
+    def __init__(self, umbral=CIRCUIT_FAILURE_THRESHOLD, segundos_abierto=CIRCUIT_OPEN_SECONDS,
+                 presupuesto=RETRY_BUDGET, proporcion=RETRY_BUDGET_RATIO):
+        self.umbral = max(1, umbral)
+        self.segundos_abierto = segundos_abierto
+        self.presupuesto_maximo = presupuesto
+        self.proporcion = proporcion  # Reintentos que gana cada respuesta correcta
+        self.saldo = presupuesto
+        self._lock = threading.Lock()
+        self._circuitos = {}
+
+    def _circuito(self, endpoint):
+        if endpoint not in self._circuitos:
+            self._circuitos[endpoint] = _Circuito()
+        return self._circuitos[endpoint]
+
+    def _verificar(self, circuito, endpoint, ahora):
+        """Lanza CircuitoAbierto si el circuito no admite solicitudes (con el lock tomado)."""
+        if circuito.abierto_hasta > ahora:
+            raise CircuitoAbierto(endpoint, f"circuito abierto tras {circuito.fallos} fallos seguidos, "
+                                            f"se reintenta en {circuito.abierto_hasta - ahora:.0f}s")
+        if circuito.probando:
+            raise CircuitoAbierto(endpoint, "circuito semiabierto, esperando la solicitud de prueba")
+
+    def antes_de_solicitud(self, url):
+        """
+        Comprueba que el endpoint admita la solicitud; si el circuito acaba de cumplir su
+        tiempo abierto, esta solicitud es la de prueba.
+
+        Returns:
+            bool: True si es la solicitud de prueba (se pasa a registrar).
+
+        Raises:
+            CircuitoAbierto: Si el circuito está abierto o ya hay una solicitud de prueba.
+        """
+        endpoint = nombre_endpoint(url)
+        with self._lock:
+            circuito = self._circuito(endpoint)
+            self._verificar(circuito, endpoint, time.monotonic())
+            circuito.probando = circuito.fallos >= self.umbral
+            return circuito.probando
+
+    def registrar(self, url, exito, prueba=False):
+        """
+        Registra el resultado de una solicitud.
+
+        Args:
+            url (str): URL de la solicitud.
+            exito (bool or None): True si Klaviyo respondió (incluso con 4xx), False si hubo
+                error de red o 5xx, None si no cuenta (429 o solicitud cancelada).
+            prueba (bool): Lo que devolvió antes_de_solicitud.
+        """
+        endpoint = nombre_endpoint(url)
+        with self._lock:
+            circuito = self._circuito(endpoint)
+            if prueba:
+                circuito.probando = False
+            if exito:
+                circuito.fallos = 0
+                circuito.abierto_hasta = 0.0
+                self.saldo = min(self.presupuesto_maximo, self.saldo + self.proporcion)
+            elif exito is False:
+                circuito.fallos += 1
+                if prueba or circuito.fallos == self.umbral:
+                    circuito.abierto_hasta = time.monotonic() + self.segundos_abierto
+                    print(f"Circuito abierto para {endpoint} durante {self.segundos_abierto:.0f}s "
+                          f"tras {circuito.fallos} fallos seguidos")
+
+    def reservar_reintento(self, url):
+        """
+        Descuenta un reintento del presupuesto.
+
+        Raises:
+            CircuitoAbierto: Si el circuito del endpoint está abierto o no queda presupuesto.
+        """
+        endpoint = nombre_endpoint(url)
+        with self._lock:
+            self._verificar(self._circuito(endpoint), endpoint, time.monotonic())
+            if self.saldo < 1:
+                raise CircuitoAbierto(endpoint, "se agotó el presupuesto de reintentos")
+            self.saldo -= 1
+
+
+def backoff(intento, base=1.0, maximo=RETRY_BACKOFF_MAX_SECONDS):
+    """Espera con jitter completo para el reintento número `intento` (0, 1, 2...): entre 0 y base·2^intento."""
+    return random.uniform(0, min(maximo, base * 2 ** intento))
+
+
+def esperar_reintento(url, segundos, token=None):
+    """
+    Espera antes de reintentar una solicitud a la cuenta activa, descontando el reintento del
+    presupuesto. A las esperas indicadas por Klaviyo (Retry-After) se les suma hasta un 10%
+    para que los hilos que recibieron el 429 a la vez no reintenten juntos.
+
+    Raises:
+        CircuitoAbierto: Si el endpoint tiene el circuito abierto o no queda presupuesto.
+        OperacionCancelada: Si el token se cancela durante la espera.
+    """
+    # Importación diferida: accounts importa este módulo
+    from accounts import cuenta_actual
+
+    cuenta_actual().disyuntor.reservar_reintento(url)
+    esperar_retry_after(url, segundos * random.uniform(1.0, 1.1), token)
+
+
+# Instancia de la cuenta principal
+disyuntor = Disyuntor()
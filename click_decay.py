@@ -0,0 +1,79 @@
+# click_decay.py
+"""
+Series diarias de clics por campaña y métricas de decaimiento: curva acumulada,
+días hasta el 50% y el 90% de los clics, y porcentaje de clics en los primeros N días.
+"""
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+from config import CLICK_DECAY_DAYS
+
+
+def serie_diaria(aggregated_data):
+    """
+    Suma, día por día, los clics de todas las URLs de una respuesta de metric-aggregates
+    pedida con interval="day".
+
+    Args:
+        aggregated_data (dict): Respuesta de query_metric_aggregates_post.
+
+    Returns:
+        array: Clics por día desde el día de envío (array('q')), vacío si no hay datos.
+    """
+    attributes = (aggregated_data or {}).get("data", {}).get("attributes", {})
+    serie = array("q", [0]) * len(attributes.get("dates", []))
+    for entry in attributes.get("data", []):
+        counts = entry.get("measurements", {}).get("count", [])
+        if len(counts) > len(serie):
+            serie.extend([0] * (len(counts) - len(serie)))
+        for dia, count in enumerate(counts):
+            if count:
+                serie[dia] += int(count)
+    return serie
+
+
+def curva_acumulada(serie):
+    """Devuelve la curva acumulada de clics (array('q')) de una serie diaria."""
+    return array("q", accumulate(serie))
+
+
+def metricas_decaimiento(serie, dias=CLICK_DECAY_DAYS):
+    """
+    Calcula las métricas de decaimiento de una serie diaria de clics.
+
+    Args:
+        serie (array): Clics por día desde el envío.
+        dias (tuple): Días para los que se calcula el porcentaje acumulado (e.g. 1, 7).
+
+    Returns:
+        dict: {"total", "t50", "t90", "porcentaje_dias": {n: %}, "ultimos_7": %} o None si no hay clics.
+            t50/t90 son los días transcurridos (contando el día de envío) hasta alcanzar
+            el 50% / 90% de los clics. El porcentaje del día n es None si la serie no llega a
+            ese día, y ultimos_7 es None si la serie no tiene más de 7 días (sería siempre 100%).
+    """
+    acumulada = curva_acumulada(serie)
+    total = acumulada[-1] if acumulada else 0
+    if total <= 0:
+        return None
+    ultimos_7 = total - acumulada[-8] if len(acumulada) > 7 else None
+    return {
+        "total": total,
+        "t50": bisect_left(acumulada, total * 0.5) + 1,
+        "t90": bisect_left(acumulada, total * 0.9) + 1,
+        "porcentaje_dias": {n: round(100 * acumulada[n - 1] / total, 1) if n <= len(acumulada) else None for n in dias},
+        "ultimos_7": round(100 * ultimos_7 / total, 1) if ultimos_7 is not None else None,
+    }
+
+
+def resumen_decaimiento(serie):
+    """Texto corto con las métricas de decaimiento, para mostrar junto a los resultados."""
+    metricas = metricas_decaimiento(serie)
+    if not metricas:
+        return ""
+    partes = [f"t50: {metricas['t50']} d", f"t90: {metricas['t90']} d"]
+    partes += [f"día {n}: {porcentaje:.0f}%" for n, porcentaje in metricas["porcentaje_dias"].items()
+               if porcentaje is not None]
+    if metricas["ultimos_7"] is not None:
+        partes.append(f"últimos 7 d: {metricas['ultimos_7']:.0f}%")
+    return "📈 " + " · ".join(partes)
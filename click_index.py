@@ -0,0 +1,123 @@
+# click_index.py
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from url_classifier import clasificar_url
+
+# Dimensiones por las que se puede agrupar el índice
+DIMENSION_URL = "URL"
+
+
+def url_canonica(url):
+    """
+    Normaliza una URL para agrupar clics: esquema y host en minúsculas, sin parámetros,
+    sin fragmento y sin '/' final (e.g. los distintos utm_* de cada campaña cuentan juntos).
+    """
+    partes = urlsplit(url.strip())
+    if not partes.netloc:
+        return url.split("?")[0].split("#")[0].rstrip("/") or url
+    ruta = partes.path.rstrip("/")
+    return f"{partes.scheme.lower()}://{partes.netloc.lower()}{ruta}"
+
+
+class IndiceClics:
+    """
+    Índice en memoria de los clics analizados, con postings por campaña para cada
+    SKU, ID de categoría y URL canónica.
+
+    Permite agregar clics de cualquier selección de campañas en una sola pasada agrupada,
+    sin volver a consultar Klaviyo. Volver a registrar una campaña reemplaza sus postings.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # postings[dimension][clave][campaign_id] = [clics_totales, clics_unicos]
+        self.postings = defaultdict(lambda: defaultdict(dict))
+        # campanas[campaign_id] = (campaign_name, send_date); claves[campaign_id] = [(dimension, clave), ...]
+        self.campanas = {}
+        self.claves = {}
+
+    def __len__(self):
+        return len(self.campanas)
+
+    def agregar(self, campaign_id, campaign_name, send_date, totales):
+        """
+        Registra (o reemplaza) los clics de una campaña.
+
+        Args:
+            campaign_id (str): ID de la campaña en Klaviyo.
+            campaign_name (str): Nombre de la campaña.
+            send_date (str): Fecha de envío (YYYY-MM-DD).
+            totales (dict): {url: {"count": int, "unique": int}}.
+        """
+        with self._lock:
+            self._quitar(campaign_id)
+            self.campanas[campaign_id] = (campaign_name, send_date)
+            claves = []
+            for url, data in totales.items():
+                destinos = [(DIMENSION_URL, url_canonica(url))]
+                destinos.extend((tipo, identificador) for tipo, identificador in clasificar_url(url).items() if identificador)
+                for dimension, clave in destinos:
+                    posting = self.postings[dimension][clave]
+                    if campaign_id not in posting:
+                        posting[campaign_id] = [0, 0]
+                        claves.append((dimension, clave))
+                    posting[campaign_id][0] += data["count"]
+                    posting[campaign_id][1] += data["unique"]
+            self.claves[campaign_id] = claves
+
+    def _quitar(self, campaign_id):
+        for dimension, clave in self.claves.pop(campaign_id, []):
+            posting = self.postings[dimension].get(clave)
+            if posting is not None:
+                posting.pop(campaign_id, None)
+                if not posting:
+                    del self.postings[dimension][clave]
+        self.campanas.pop(campaign_id, None)
+
+    def dimensiones(self):
+        """Dimensiones disponibles en el índice (URL primero)."""
+        with self._lock:
+            return [DIMENSION_URL] + sorted(d for d in self.postings if d != DIMENSION_URL)
+
+    def resumen(self, dimension, campaign_ids=None):
+        """
+        Agrega los clics por clave de la dimensión para la selección de campañas indicada.
+
+        Args:
+            dimension (str): "URL", "Producto" o "Categoría" (según URL_RULES).
+            campaign_ids (iterable, optional): Campañas a incluir; None incluye todas las indexadas.
+
+        Returns:
+            list: Filas (clave, clics_totales, clics_unicos, num_campanas) ordenadas por clics totales.
+                  Los clics únicos se suman por campaña, por lo que pueden contar dos veces a un perfil.
+        """
+        seleccion = None if campaign_ids is None else set(campaign_ids)
+        filas = []
+        with self._lock:
+            for clave, posting in self.postings.get(dimension, {}).items():
+                total = unicos = campanas = 0
+                if seleccion is None:
+                    for count, unique in posting.values():
+                        total += count
+                        unicos += unique
+                    campanas = len(posting)
+                else:
+                    for campaign_id, (count, unique) in posting.items():
+                        if campaign_id in seleccion:
+                            total += count
+                            unicos += unique
+                            campanas += 1
+                if campanas:
+                    filas.append((clave, total, unicos, campanas))
+        filas.sort(key=lambda fila: fila[1], reverse=True)
+        return filas
+
+    def campanas_de(self, dimension, clave):
+        """Devuelve [(campaign_id, nombre, fecha, clics_totales, clics_unicos)] para una clave."""
+        with self._lock:
+            posting = self.postings.get(dimension, {}).get(clave, {})
+            filas = [(cid, *self.campanas.get(cid, ("", "")), count, unique) for cid, (count, unique) in posting.items()]
+        filas.sort(key=lambda fila: fila[3], reverse=True)
+        return filas
@@ -0,0 +1,189 @@
+# comparison_view.py
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+
+from campaign_logic import obtener_campanas
+from cancellation import TokenCancelacion
+from config import LOAD_DEADLINE_SECONDS
+from history_store import historial
+from period_comparison import (COLUMNAS, DIMENSIONES, TOTAL, comparar_periodos,
+                               periodo_anterior, semana_anterior, ano_anterior)
+from utils import format_number, format_percentage
+
+
+def _delta(valor, sufijo):
+    return "" if valor is None else f"{valor:+.2f}{sufijo}"
+
+
+class VentanaComparacion:
+    """
+    Ventana que compara las campañas cargadas (periodo A) con otro rango de fechas
+    (periodo B), por país y/o prefijo.
+
+    El periodo B se toma, en este orden, de las campañas ya cargadas si el rango está
+    dentro del actual, del historial local si una carga anterior lo cubrió completo, o
+    de Klaviyo en segundo plano (y entonces queda guardado en el historial si la carga
+    no tuvo cuentas fallidas ni le faltaron órdenes o tasas de cambio).
+    """
+
+    PRESETS = (("Periodo anterior", periodo_anterior), ("Semana anterior", semana_anterior),
+               ("Año anterior", ano_anterior))
+
+    def __init__(self, root, campanas, desde, hasta):
+        self.root = root
+        self.campanas = campanas
+        self.desde_a, self.hasta_a = desde, hasta
+        self.campanas_b = None
+        self.rango_b = None
+        self.token = None
+        self.resultado = queue.Queue()
+        self.mensajes = queue.Queue()
+
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Comparar periodos: {desde} a {hasta}")
+        self.window.geometry("1400x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.cerrar)
+
+        controles = tk.Frame(self.window)
+        controles.pack(fill=tk.X, padx=10, pady=10)
+        tk.Label(controles, text=f"Periodo A: {desde} a {hasta}    Periodo B:", fg="#23376D",
+                 font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT)
+        self.desde_b = tk.Entry(controles, width=11)
+        self.desde_b.pack(side=tk.LEFT, padx=5)
+        self.hasta_b = tk.Entry(controles, width=11)
+        self.hasta_b.pack(side=tk.LEFT, padx=5)
+        self._fijar_rango_b(*periodo_anterior(desde, hasta))
+
+        for texto, funcion in self.PRESETS:
+            tk.Button(controles, text=texto, command=lambda f=funcion: self._fijar_rango_b(*f(self.desde_a, self.hasta_a)),
+                      font=("TkDefaultFont", 9)).pack(side=tk.LEFT, padx=2)
+
+        tk.Label(controles, text="Alinear por:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=(10, 0))
+        self.dimension_var = tk.StringVar(value="País")
+        combo = ttk.Combobox(controles, textvariable=self.dimension_var, values=list(DIMENSIONES), state="readonly", width=14)
+        combo.pack(side=tk.LEFT, padx=5)
+        combo.bind("<<ComboboxSelected>>", lambda event: self.mostrar())
+
+        self.btn_comparar = tk.Button(controles, text="Comparar", command=self.comparar, bg="#23376D", fg="white",
+                                      activebackground="#3A4F9A", activeforeground="white",
+                                      font=("TkDefaultFont", 10, "bold"))
+        self.btn_comparar.pack(side=tk.LEFT, padx=10)
+
+        tabla_frame = tk.Frame(self.window)
+        tabla_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.tabla = ttk.Treeview(tabla_frame, columns=COLUMNAS, show="headings")
+        for col in COLUMNAS:
+            self.tabla.heading(col, text=col)
+            self.tabla.column(col, width=160 if col == "Grupo" else 90, anchor="w" if col == "Grupo" else "e")
+        self.tabla.tag_configure("bold", font=("TkDefaultFont", 9, "bold"))
+        scrollbar = ttk.Scrollbar(tabla_frame, orient="vertical", command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=scrollbar.set)
+        self.tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.estado = tk.Label(self.window, text="", fg="#23376D", font=("TkDefaultFont", 10))
+        self.estado.pack(pady=5)
+
+    def _fijar_rango_b(self, desde, hasta):
+        for entry, valor in ((self.desde_b, desde), (self.hasta_b, hasta)):
+            entry.delete(0, tk.END)
+            entry.insert(0, valor)
+
+    def comparar(self):
+        """Obtiene las campañas del periodo B (de la fuente más barata disponible) y muestra la comparación."""
+        desde, hasta = self.desde_b.get().strip(), self.hasta_b.get().strip()
+        try:
+            if datetime.strptime(desde, "%Y-%m-%d") > datetime.strptime(hasta, "%Y-%m-%d"):
+                raise ValueError
+        except ValueError:
+            self.estado.config(text="❌ Ingrese un rango válido con el formato YYYY-MM-DD")
+            return
+
+        if (desde, hasta) == self.rango_b and self.campanas_b is not None:
+            self.mostrar()
+            return
+
+        if self.desde_a <= desde and hasta <= self.hasta_a:
+            campanas = [camp for camp in self.campanas if desde <= camp[3][:10] <= hasta]
+            self._periodo_b_listo(desde, hasta, campanas, None, "campañas ya cargadas")
+            return
+
+        cargado_en = historial.carga_que_cubre(desde, hasta)
+        if cargado_en:
+            campanas, error = historial.campanas_guardadas(desde, hasta)
+            self._periodo_b_listo(desde, hasta, campanas, error, f"historial local (carga del {cargado_en})")
+            return
+
+        # Cargar el periodo B desde Klaviyo en segundo plano
+        self.btn_comparar.config(state=tk.DISABLED)
+        self.estado.config(text=f"🔄 Cargando campañas del {desde} al {hasta} desde Klaviyo...")
+        self.token = TokenCancelacion(LOAD_DEADLINE_SECONDS)
+
+        def cargar(token=self.token):
+            try:
+                degradaciones = []
+                campanas, error = obtener_campanas(desde, hasta, self.mensajes.put, token=token, degradaciones=degradaciones)
+                if campanas and not token.cancelado and not degradaciones:
+                    historial.registrar_campanas(campanas, desde=desde, hasta=hasta)
+            except Exception as e:
+                campanas, error = None, f"Error inesperado: {str(e)}"
+            self.resultado.put((campanas, error))
+
+        threading.Thread(target=cargar, daemon=True).start()
+        self._esperar_carga(desde, hasta)
+
+    def _esperar_carga(self, desde, hasta):
+        if not self.window.winfo_exists():
+            return
+        mensaje = None
+        while not self.mensajes.empty():
+            mensaje = self.mensajes.get_nowait()
+        if mensaje:
+            if mensaje.startswith("ACTUALIZAR:"):
+                mensaje = mensaje[len("ACTUALIZAR:"):]
+            self.estado.config(text=f"🔄 Periodo B: {mensaje}")
+        try:
+            campanas, error = self.resultado.get_nowait()
+        except queue.Empty:
+            self.window.after(200, lambda: self._esperar_carga(desde, hasta))
+            return
+        self.token = None
+        self.btn_comparar.config(state=tk.NORMAL)
+        self._periodo_b_listo(desde, hasta, campanas, error, "Klaviyo")
+
+    def _periodo_b_listo(self, desde, hasta, campanas, error, origen):
+        if error and not campanas:
+            self.estado.config(text=f"❌ {error}")
+            return
+        self.rango_b = (desde, hasta)
+        self.campanas_b = campanas or []
+        self.origen_b = origen
+        self.mostrar()
+
+    def mostrar(self):
+        """Recalcula la comparación con la alineación seleccionada."""
+        if self.campanas_b is None:
+            return
+        filas = comparar_periodos(self.campanas, self.campanas_b, self.dimension_var.get())
+        self.tabla.delete(*self.tabla.get_children())
+        for (grupo, n_a, n_b, open_a, open_b, d_open, click_a, click_b, d_click,
+             valor_a, valor_b, d_valor, pr_a, pr_b, d_pr) in filas:
+            self.tabla.insert("", "end", values=(
+                grupo, n_a, n_b,
+                format_percentage(open_a), format_percentage(open_b), _delta(d_open, " pp"),
+                format_percentage(click_a), format_percentage(click_b), _delta(d_click, " pp"),
+                format_number(valor_a, is_currency=True), format_number(valor_b, is_currency=True), _delta(d_valor, "%"),
+                format_number(pr_a, is_currency=True), format_number(pr_b, is_currency=True), _delta(d_pr, "%"),
+            ), tags=("bold",) if grupo == TOTAL else ())
+        desde, hasta = self.rango_b
+        self.estado.config(text=f"{len(self.campanas)} campañas en A y {len(self.campanas_b)} en B "
+                                f"({desde} a {hasta}, desde {self.origen_b})")
+
+    def cerrar(self):
+        """Cancela la carga del periodo B (si está en curso) y cierra la ventana."""
+        if self.token is not None:
+            self.token.cancelar("ventana cerrada")
+        self.window.destroy()
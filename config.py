@@ -6,6 +6,16 @@ from secrets import OPEN_EXCHANGE_API_KEY, KLAVIYO_API_KEY  # Importamos las cla
 API_KEY = OPEN_EXCHANGE_API_KEY
 API_KEY_KLAVIYO = KLAVIYO_API_KEY
 
+# Cuentas de Klaviyo (una por región): nombre -> clave de API. Se definen en secrets.py como
+# KLAVIYO_ACCOUNTS; si no existe, se usa KLAVIYO_API_KEY como única cuenta "Principal".
+# La primera cuenta es la principal (usa la caché y el catálogo de métricas de siempre).
+try:
+    from secrets import KLAVIYO_ACCOUNTS
+except ImportError:
+    KLAVIYO_ACCOUNTS = {"Principal": KLAVIYO_API_KEY}
+# Cuentas a cargar, separadas por coma (e.g. "Centroamérica,Caribe"); vacío = todas
+KLAVIYO_ACTIVE_ACCOUNTS = [c.strip() for c in os.getenv("KLAVIYO_ACCOUNTS", "").split(",") if c.strip()]
+
 # URLs de Klaviyo agrupadas (solo las que se usan)
 KLAVIYO_URLS = {
     "CAMPAIGN_VALUES_REPORT": "https://a.klaviyo.com/api/campaign-values-reports/",
@@ -16,6 +26,7 @@ KLAVIYO_URLS = {
     "EVENTS": "https://a.klaviyo.com/api/events",
     "LISTS": "https://a.klaviyo.com/api/lists/",
     "SEGMENTS": "https://a.klaviyo.com/api/segments/",
+    "TEMPLATE_RENDER": "https://a.klaviyo.com/api/template-render",
 }
 
 # URL para obtener tasas de cambio desde Open Exchange Rates
@@ -47,6 +58,105 @@ HEADERS_KLAVIYO = {
     "Authorization": f"Klaviyo-API-Key {API_KEY_KLAVIYO}"
 }
 
+# Timeout (en segundos) de las solicitudes a Klaviyo; el reporte de campañas puede tardar más
+REQUEST_TIMEOUT_SECONDS = int(os.getenv("KLAVIYO_REQUEST_TIMEOUT", "30"))
+REPORT_TIMEOUT_SECONDS = int(os.getenv("KLAVIYO_REPORT_TIMEOUT", "90"))
+
+# El reporte de campañas se divide en ventanas de REPORT_SHARD_DAYS días que se descargan en paralelo.
+# REPORT_MAX_SHARDS limita el número de ventanas (los rangos muy largos usan ventanas más anchas),
+# ya que el endpoint de reportes tiene un rate limit bajo.
+REPORT_SHARD_DAYS = int(os.getenv("KLAVIYO_REPORT_SHARD_DAYS", "7"))
+REPORT_MAX_SHARDS = int(os.getenv("KLAVIYO_REPORT_MAX_SHARDS", "12"))
+REPORT_MAX_WORKERS = int(os.getenv("KLAVIYO_REPORT_WORKERS", "4"))
+
+# Reglas para clasificar las URLs clicadas: para cada filtro del análisis, los segmentos de ruta
+# que lo identifican (e.g. /producto/descripcion/SKU). El identificador es el último segmento.
+URL_RULES = {
+    "Producto": ["producto", "product"],
+    "Categoría": ["categoria", "category"],
+}
+
+# Archivo opcional donde volcar la instrumentación de cada carga (JSON compatible con chrome://tracing)
+TRACE_FILE = os.getenv("KLAVIYO_TRACE_FILE")
+
+# Directorio opcional donde guardar un perfil (cProfile) de cada fase lenta: carga, tabla,
+# análisis, filtro y exportación. Sin definir, las funciones no se envuelven.
+PROFILE_DIR = os.getenv("KLAVIYO_PROFILE_DIR")
+
+# Reintentos de las solicitudes a Klaviyo: máximo por solicitud, espera máxima entre intentos
+# (backoff exponencial con jitter) y presupuesto compartido por cuenta: se parte con
+# KLAVIYO_RETRY_BUDGET reintentos y cada respuesta correcta suma KLAVIYO_RETRY_BUDGET_RATIO.
+API_MAX_RETRIES = int(os.getenv("KLAVIYO_MAX_RETRIES", "5"))
+RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("KLAVIYO_RETRY_BACKOFF_MAX", "30"))
+RETRY_BUDGET = float(os.getenv("KLAVIYO_RETRY_BUDGET", "20"))
+RETRY_BUDGET_RATIO = float(os.getenv("KLAVIYO_RETRY_BUDGET_RATIO", "0.1"))
+
+# Disyuntor por endpoint: tras CIRCUIT_FAILURE_THRESHOLD fallos seguidos (red o 5xx) las
+# solicitudes a ese endpoint fallan al instante durante CIRCUIT_OPEN_SECONDS
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("KLAVIYO_CIRCUIT_FAILURES", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("KLAVIYO_CIRCUIT_OPEN_SECONDS", "30"))
+
+# Tiempos límite opcionales (en segundos) para la carga de campañas y el análisis de clics.
+# Al alcanzarse, la operación se detiene y se muestran los resultados parciales.
+LOAD_DEADLINE_SECONDS = float(os.getenv("KLAVIYO_LOAD_DEADLINE", "0")) or None
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("KLAVIYO_ANALYSIS_DEADLINE", "0")) or None
+
+# Directorio para los datos locales de la aplicación (checkpoints, cachés)
+CACHE_DIR = os.getenv("KLAVIYO_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".klaviyo_analyzer"))
+ANALYSIS_CHECKPOINT_FILE = os.path.join(CACHE_DIR, "analisis_checkpoint.jsonl")
+# Días que se conserva cada resultado del checkpoint antes de descartarlo al compactar el archivo
+ANALYSIS_CHECKPOINT_MAX_AGE_DAYS = int(os.getenv("KLAVIYO_CHECKPOINT_MAX_AGE_DAYS", "90"))
+# Minutos que sirve el resultado provisional de una ventana de clics abierta (e.g. "Hasta hoy")
+# para reanudar un análisis interrumpido; después se vuelve a consultar
+ANALYSIS_CHECKPOINT_OPEN_TTL_MINUTES = float(os.getenv("KLAVIYO_CHECKPOINT_OPEN_TTL_MINUTES", "60"))
+
+# Líneas visibles en la ventana de carga; el historial completo se guarda en LOAD_LOG_FILE
+LOAD_LOG_MAX_LINES = int(os.getenv("KLAVIYO_LOAD_LOG_LINES", "500"))
+LOAD_LOG_FILE = os.getenv("KLAVIYO_LOAD_LOG", os.path.join(CACHE_DIR, "carga.log"))
+
+# Historial local (SQLite) de las métricas de cada carga y los clics de cada análisis; vacío lo desactiva
+HISTORY_FILE = os.getenv("KLAVIYO_HISTORY_FILE", os.path.join(CACHE_DIR, "historial.sqlite3"))
+
+# Templates renderizados (previsualización e inventario de enlaces) guardados en disco, y
+# cuántos templates se renderizan y analizan en paralelo al armar el inventario de enlaces
+TEMPLATE_RENDER_CACHE_DIR = os.getenv("KLAVIYO_TEMPLATE_CACHE_DIR", os.path.join(CACHE_DIR, "templates"))
+TEMPLATE_LINK_WORKERS = int(os.getenv("KLAVIYO_TEMPLATE_WORKERS", "4"))
+
+# Ventana de atribución de clics del análisis: días después del envío que se consultan
+# (None = hasta hoy). La opción por defecto se puede cambiar con KLAVIYO_CLICK_WINDOW.
+CLICK_WINDOW_OPTIONS = {"7 días": 7, "14 días": 14, "30 días": 30, "Hasta hoy": None}
+CLICK_WINDOW_DEFAULT = os.getenv("KLAVIYO_CLICK_WINDOW", "Hasta hoy")
+
+# Veces por segundo que se actualiza el estado del análisis en curso (progreso, velocidad, ETA)
+ANALYSIS_PROGRESS_FPS = float(os.getenv("KLAVIYO_PROGRESS_FPS", "10"))
+
+# Refresco automático de las campañas recientes, cuyas métricas siguen cambiando: cada
+# AUTO_REFRESH_MINUTES (0 = desactivado) se vuelven a consultar en segundo plano las
+# campañas enviadas hace menos de AUTO_REFRESH_MAX_AGE_DAYS días.
+AUTO_REFRESH_MINUTES = float(os.getenv("KLAVIYO_AUTO_REFRESH_MINUTES", "15"))
+AUTO_REFRESH_MAX_AGE_DAYS = int(os.getenv("KLAVIYO_AUTO_REFRESH_DAYS", "3"))
+
+# Días para los que se muestra el porcentaje acumulado de clics en la serie diaria (decaimiento)
+CLICK_DECAY_DAYS = (1, 3, 7, 14)
+
+# Catálogo de métricas de la cuenta (se descarga de /api/metrics y se guarda en disco)
+METRIC_CATALOG_FILE = os.path.join(CACHE_DIR, "metricas.json")
+METRIC_CATALOG_TTL_HOURS = int(os.getenv("KLAVIYO_METRIC_CATALOG_TTL_HOURS", "24"))
+
+# Métricas que usa la aplicación, resueltas por nombre e integración (None = cualquier integración).
+# Para cada métrica se prueba cada (nombre, integración) en orden.
+METRIC_NAMES = {
+    "clics": [("Clicked Email", "Klaviyo")],
+    "ordenes": [("Order Completed", None), ("Placed Order", None)],
+}
+# IDs de respaldo si una métrica no aparece en el catálogo (se avisa al usarlos)
+METRIC_FALLBACK_IDS = {
+    "clics": "SCJBvM",
+    "ordenes": "QXw4AK",
+}
+
 # Validación de consistencia
 assert set(COUNTRY_TO_CURRENCY.keys()) == ALLOWED_CODES, "Mismatch between COUNTRY_TO_CURRENCY and ALLOWED_CODES"
-assert set(COUNTRY_TO_CURRENCY.values()).issubset(CURRENCIES), "Some currencies in COUNTRY_TO_CURRENCY are not in CURRENCIES"
\ No newline at end of file
+assert set(COUNTRY_TO_CURRENCY.values()).issubset(CURRENCIES), "Some currencies in COUNTRY_TO_CURRENCY are not in CURRENCIES"
+assert KLAVIYO_ACCOUNTS, "KLAVIYO_ACCOUNTS must define at least one account"
+assert CLICK_WINDOW_DEFAULT in CLICK_WINDOW_OPTIONS, "KLAVIYO_CLICK_WINDOW must be one of CLICK_WINDOW_OPTIONS"
\ No newline at end of file
@@ -1,9 +1,10 @@
-import requests
 import webview
-from config import HEADERS_KLAVIYO
+from accounts import cuenta_de, usar_cuenta
+from template_links import pais_de_render, renders
+from selection_model import ModeloSeleccion
 
 class EmailPreview:
-    def __init__(self, webview_window, campanas_tabla, template_ids, is_analysis_mode, resultados_tabla, resultados_label, screen_width, screen_height, root):
+    def __init__(self, webview_window, campanas_tabla, template_ids, is_analysis_mode, resultados_tabla, resultados_label, screen_width, screen_height, root, modelo_seleccion=None):
         self.webview_window = [webview_window]  # Usamos una lista para poder modificar la referencia
         self.campanas_tabla = campanas_tabla
         self.template_ids = template_ids
@@ -14,6 +15,7 @@ class EmailPreview:
         self.screen_height = screen_height
         self.root = root
         self.original_table_content = []  # Para almacenar el contenido original de resultados_tabla
+        self.modelo_seleccion = modelo_seleccion or ModeloSeleccion()  # Campaña de cada fila de campanas_tabla
 
     def preview_template(self, event):
         # Cerrar la ventana de previsualización si ya está abierta
@@ -31,74 +33,44 @@ class EmailPreview:
                 self.resultados_label.config(text="Previsualización del Template: Error")
             return
 
-        # Obtener el item_id de la fila seleccionada
+        # Obtener la campaña de la fila seleccionada (None si no es una fila de campaña)
         item_id = selected_item[0]
-        # Obtener los valores de la fila seleccionada
-        item = self.campanas_tabla.item(item_id)
-        values = item["values"]
-        if not values or len(values) < 13:  # 13 columnas (índices 0-12)
+        camp = self.modelo_seleccion.campana(item_id)
+        if camp is None:
             if self.is_analysis_mode and self.resultados_tabla:
                 self.resultados_label.config(text="Previsualización del Template: Error")
             return
 
         # Obtener el template_id del diccionario interno
         template_id = self.template_ids.get(item_id)
-        campaign_name = values[1]  # Nombre de la campaña está en el índice 1
+        campaign_id, campaign_name = camp[1], camp[2]
         if not template_id:
             if self.is_analysis_mode and self.resultados_tabla:
                 self.resultados_label.config(text="Previsualización del Template: No disponible")
             return
 
         # Determinar el país a partir del nombre de la campaña
-        partes = campaign_name.split("_")
-        country = partes[-1].strip().upper() if len(partes) > 1 else "US"
-
-        # Configurar la solicitud a la API de Klaviyo
-        render_url = "https://a.klaviyo.com/api/template-render"
-        headers = HEADERS_KLAVIYO.copy()
-        headers["revision"] = "2023-12-15"
-
-        data = {
-            "data": {
-                "type": "template",
-                "id": template_id,
-                "attributes": {
-                    "context": {
-                        "person": {
-                            "country": country
-                        }
-                    }
-                }
-            }
-        }
+        country = pais_de_render(campaign_name)
 
-        try:
-            response = requests.post(render_url, json=data, headers=headers, timeout=30)
-            response.raise_for_status()  # Lanza una excepción si hay un error HTTP
-            if response.status_code == 200:
-                html_content = response.json().get("data", {}).get("attributes", {}).get("html", "")
-                if html_content:
-                    webview_width = int(self.screen_width * 0.6)
-                    webview_height = int(self.screen_height * 0.6)
-                    self.webview_window[0] = webview.create_window(
-                        f"Previsualización del Template: {campaign_name} (País: {country})",
-                        html=html_content,
-                        width=webview_width,
-                        height=webview_height
-                    )
-                    webview.start(gui='tk')
-                    if self.is_analysis_mode and self.resultados_label:
-                        self.resultados_label.config(text=f"Previsualización del Template: {campaign_name} (País: {country})")
-                else:
-                    if self.is_analysis_mode and self.resultados_label:
-                        self.resultados_label.config(text="Previsualización del Template: Error")
-            else:
-                if self.is_analysis_mode and self.resultados_label:
-                    self.resultados_label.config(text="Previsualización del Template: Error")
-        except requests.exceptions.RequestException as e:
+        # Renderizar con la clave de la cuenta de la campaña (o leer el render ya guardado)
+        with usar_cuenta(cuenta_de(campaign_id)):
+            html_content, error = renders.html(template_id, country)
+        if html_content:
+            webview_width = int(self.screen_width * 0.6)
+            webview_height = int(self.screen_height * 0.6)
+            self.webview_window[0] = webview.create_window(
+                f"Previsualización del Template: {campaign_name} (País: {country})",
+                html=html_content,
+                width=webview_width,
+                height=webview_height
+            )
+            webview.start(gui='tk')
+            if self.is_analysis_mode and self.resultados_label:
+                self.resultados_label.config(text=f"Previsualización del Template: {campaign_name} (País: {country})")
+        else:
             if self.is_analysis_mode and self.resultados_label:
                 self.resultados_label.config(text="Previsualización del Template: Error")
-            print(f"Error al renderizar el template: {str(e)}")  # Para depuración
+            print(f"Error al renderizar el template: {error}")  # Para depuración
 
         self.root.update()
         if current_state == 'zoomed':
@@ -1,6 +1,7 @@
 # exchange_rates.py
 import requests
 from config import API_KEY, BASE_URL_RATES
+from instrumentation import solicitud_instrumentada
 
 def obtener_tasas_de_cambio(base="USD", symbols=None):
     """
@@ -19,7 +20,7 @@ def obtener_tasas_de_cambio(base="USD", symbols=None):
         if symbols:
             params["symbols"] = ",".join(symbols)
         
-        response = requests.get(BASE_URL_RATES, params=params, timeout=30)
+        response = solicitud_instrumentada("GET", BASE_URL_RATES, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
         
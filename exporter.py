@@ -3,15 +3,19 @@ from tkinter import filedialog, messagebox
 import io
 import csv
 from datetime import datetime
+from selection_model import ModeloSeleccion
+from xlsx_export import escribir_xlsx
+from phase_profiler import perfilar
 
 class Exporter:
-    def __init__(self, campanas, campanas_tabla, grouping_var, last_results, is_analysis_mode, resultados_tabla):
+    def __init__(self, campanas, campanas_tabla, grouping_var, last_results, is_analysis_mode, resultados_tabla, modelo_seleccion=None):
         self.campanas = campanas
         self.campanas_tabla = campanas_tabla
         self.grouping_var = grouping_var
         self.last_results = last_results
         self.is_analysis_mode = is_analysis_mode
         self.resultados_tabla = resultados_tabla
+        self.modelo_seleccion = modelo_seleccion or ModeloSeleccion()  # Campaña de cada fila de campanas_tabla
 
     def exportar(self):
         default_filename = f"results_{datetime.now().strftime('%Y-%m-%d')}.zip"
@@ -32,6 +36,11 @@ class Exporter:
         if self.is_analysis_mode and self.resultados_tabla:
             self.resultados_tabla.delete(*self.resultados_tabla.get_children())
 
+        self.exportar_a_zip(folder)
+
+    @perfilar("exportacion")
+    def exportar_a_zip(self, folder):
+        """Escribe las campañas y los resultados del análisis en el archivo ZIP indicado, sin diálogos de selección."""
         try:
             with zipfile.ZipFile(folder, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 # Exportar campañas si existen
@@ -64,13 +73,12 @@ class Exporter:
                             writer.writerow(row)
                             continue
 
-                        # Línea de campaña (real)
-                        try:
-                            int(values[0])
+                        # Línea de campaña (incluye las que muestran "▶ 12" por tener audiencias)
+                        camp = self.modelo_seleccion.campana(item)
+                        if camp is not None:
                             row = dict(zip(fieldnames, values))
+                            row["#"] = camp[0]
                             writer.writerow(row)
-                        except (ValueError, IndexError):
-                            continue
 
                     zipf.writestr(campaigns_filename, csv_content.getvalue())
                     if self.is_analysis_mode and self.resultados_tabla:
@@ -106,4 +114,45 @@ class Exporter:
             if self.is_analysis_mode and self.resultados_tabla:
                 self.resultados_tabla.insert("", "end", values=("", "", message, "", ""))
             else:
-                messagebox.showerror("Error", message)
\ No newline at end of file
+                messagebox.showerror("Error", message)
+
+    def exportar_excel(self):
+        default_filename = f"results_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
+        ruta = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx")],
+            title="Guardar archivo Excel",
+            initialfile=default_filename
+        )
+        if not ruta:
+            if self.is_analysis_mode and self.resultados_tabla:
+                self.resultados_tabla.delete(*self.resultados_tabla.get_children())
+            self._informar("Exportación cancelada por el usuario.")
+            return
+
+        if self.is_analysis_mode and self.resultados_tabla:
+            self.resultados_tabla.delete(*self.resultados_tabla.get_children())
+
+        self.exportar_a_xlsx(ruta)
+
+    @perfilar("exportacion")
+    def exportar_a_xlsx(self, ruta):
+        """Escribe las campañas (con subtotales y total general) y los clics analizados en un archivo XLSX."""
+        try:
+            filas_campanas, filas_clics = escribir_xlsx(ruta, self.campanas, self.grouping_var.get(), self.last_results)
+        except ImportError:
+            self._informar("Para exportar a Excel instale openpyxl (pip install openpyxl).", error=True)
+            return
+        except Exception as e:
+            self._informar(f"Error al exportar: {e}", error=True)
+            return
+        self._informar(f"Exportación exitosa: {filas_campanas} campañas y {filas_clics} filas de clics en {ruta}")
+
+    def _informar(self, message, error=False):
+        """Muestra un mensaje en resultados_tabla (modo análisis) o en un cuadro de diálogo."""
+        if self.is_analysis_mode and self.resultados_tabla:
+            self.resultados_tabla.insert("", "end", values=("", "", message, "", ""))
+        elif error:
+            messagebox.showerror("Error", message)
+        else:
+            messagebox.showinfo("Información", message)
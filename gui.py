@@ -1,7 +1,10 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext
+from tkinter import ttk, scrolledtext, messagebox
 import ctypes  # Para manejar el escalado de DPI en Windows
 import os  # Para verificar el sistema operativo
+import queue
+import threading
+from datetime import datetime, timedelta
 
 # Importar los componentes modulares
 from date_selector import DateSelector
@@ -9,10 +12,21 @@ from email_preview import EmailPreview
 from exporter import Exporter
 from view_manager import ViewManager
 from analyzer import Analyzer
+from rollup_view import RollupView
+from load_log import RegistroCarga
+from selection_model import ModeloSeleccion
+from history_store import historial
+from trends_view import VentanaTendencias
+from comparison_view import VentanaComparacion
 
 # Importar tus funciones reales
-from campaign_logic import obtener_campanas, mostrar_campanas_en_tabla
+from campaign_index import indice_de
+from campaign_logic import obtener_campanas, mostrar_campanas_en_tabla, refrescar_campanas, add_campaign_row, calculate_subtotals
 from utils import format_number, format_percentage
+from instrumentation import instrumentacion
+from cancellation import TokenCancelacion
+from config import (TRACE_FILE, LOAD_DEADLINE_SECONDS, CLICK_WINDOW_OPTIONS, CLICK_WINDOW_DEFAULT,
+                    AUTO_REFRESH_MINUTES, AUTO_REFRESH_MAX_AGE_DAYS)
 
 # Habilitar el escalado de DPI en Windows
 if os.name == 'nt':  # Solo en Windows
@@ -38,6 +52,9 @@ class ResultadosApp:
         self.resultados_tabla = None  # Inicializar como None
         self.resultados_label = None  # Inicializar como None
         self.campanas_tabla = None  # Inicializar como None
+        self.token_refresco = None  # Token del refresco automático en curso (None si no hay)
+        self.modelo_seleccion = ModeloSeleccion()  # Campaña de cada fila de campanas_tabla (se llena al renderizar)
+        indice_de(self.campanas)  # Construir el índice de búsqueda de campañas una sola vez, al cargar
 
         self.root.title(f"Resultados de Campañas ({list_start_date} a {list_end_date})")
         self.root.after_ids = []
@@ -60,7 +77,8 @@ class ResultadosApp:
             self.resultados_label,
             self.screen_width,
             self.screen_height,
-            self.root
+            self.root,
+            modelo_seleccion=self.modelo_seleccion
         )
 
         # Crear la instancia de Exporter
@@ -70,7 +88,8 @@ class ResultadosApp:
             tk.StringVar(value="País"),  # grouping_var temporal, se actualizará después
             self.last_results,
             self.is_analysis_mode,
-            self.resultados_tabla
+            self.resultados_tabla,
+            modelo_seleccion=self.modelo_seleccion
         )
 
         # Hacer la ventana principal responsive
@@ -89,7 +108,8 @@ class ResultadosApp:
             self.screen_width,
             self.screen_height,
             self.email_preview,
-            self.exporter
+            self.exporter,
+            modelo_seleccion=self.modelo_seleccion
         )
         
         # CONFIGURAR EL CACHE DE AUDIENCIAS SI SE PROPORCIONÓ
@@ -99,7 +119,7 @@ class ResultadosApp:
         # Frame para centrar el campo de entrada y el checkbox
         self.entry_frame = tk.Frame(self.main_frame)
         self.entry_frame.grid(row=2, column=0, pady=5, sticky="ew")
-        tk.Label(self.entry_frame, text="Ingrese códigos de país, palabras clave o números de campaña (separados por coma):", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack()
+        tk.Label(self.entry_frame, text="Ingrese códigos de país, palabras clave, números (1-50) o fechas (2025-06-01..2025-06-07); \",\" = o, \"&\" = y, \"!\" = no:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack()
         self.entry = tk.Entry(self.entry_frame, width=50)
         self.entry.pack(pady=5)
         # Deshabilitar el campo de entrada inicialmente, ya que el checkbox está marcado por defecto
@@ -114,6 +134,27 @@ class ResultadosApp:
             command=self.toggle_entry_state
         )
         self.analyze_all_check.pack(pady=5)
+        # Checkbox para pedir los clics diarios y mostrar el decaimiento por campaña
+        self.serie_diaria = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            self.entry_frame,
+            text="Serie diaria de clics (decaimiento)",
+            variable=self.serie_diaria,
+            fg="#23376D",
+            font=("TkDefaultFont", 10, "bold")
+        ).pack(pady=(0, 5))
+        # Ventana de atribución de clics: días después del envío que se consultan por campaña
+        ventana_frame = tk.Frame(self.entry_frame)
+        ventana_frame.pack(pady=(0, 5))
+        tk.Label(ventana_frame, text="Ventana de clics:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT)
+        self.ventana_clics = tk.StringVar(value=CLICK_WINDOW_DEFAULT)
+        ttk.Combobox(
+            ventana_frame,
+            textvariable=self.ventana_clics,
+            values=list(CLICK_WINDOW_OPTIONS),
+            state="readonly",
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
 
         # Frame para centrar los botones
         self.buttons_frame = tk.Frame(self.main_frame)
@@ -131,10 +172,37 @@ class ResultadosApp:
                                      activeforeground="white", font=("TkDefaultFont", 10, "bold"), 
                                      state=tk.NORMAL if self.campanas else tk.DISABLED)
         self.btn_exportar.pack(side=tk.LEFT, padx=5)
+        self.btn_exportar_excel = tk.Button(self.frame_botones, text="Exportar Excel", command=self.exporter.exportar_excel,
+                                           bg="#23376D" if self.campanas else "#A9A9A9",
+                                           fg="white", activebackground="#3A4F9A",
+                                           activeforeground="white", font=("TkDefaultFont", 10, "bold"),
+                                           state=tk.NORMAL if self.campanas else tk.DISABLED)
+        self.btn_exportar_excel.pack(side=tk.LEFT, padx=5)
         self.btn_nuevo_rango = tk.Button(self.frame_botones, text="Nuevo Rango", command=self.nuevo_rango, 
                                         bg="#23376D", fg="white", activebackground="#3A4F9A", 
                                         activeforeground="white", font=("TkDefaultFont", 10, "bold"))
         self.btn_nuevo_rango.pack(side=tk.LEFT, padx=5)
+        # Detiene el análisis en curso conservando los resultados parciales
+        self.btn_detener = tk.Button(self.frame_botones, text="Detener",
+                                     bg="#A9A9A9", fg="white", activebackground="#3A4F9A",
+                                     activeforeground="white", font=("TkDefaultFont", 10, "bold"),
+                                     state=tk.DISABLED)
+        self.btn_detener.pack(side=tk.LEFT, padx=5)
+        self.btn_resumen_clics = tk.Button(self.frame_botones, text="Resumen SKU/URL", command=self.abrir_resumen_clics,
+                                           bg="#23376D", fg="white", activebackground="#3A4F9A",
+                                           activeforeground="white", font=("TkDefaultFont", 10, "bold"))
+        self.btn_resumen_clics.pack(side=tk.LEFT, padx=5)
+        self.btn_tendencias = tk.Button(self.frame_botones, text="Tendencias", command=self.abrir_tendencias,
+                                        bg="#23376D", fg="white", activebackground="#3A4F9A",
+                                        activeforeground="white", font=("TkDefaultFont", 10, "bold"))
+        self.btn_tendencias.pack(side=tk.LEFT, padx=5)
+        self.btn_comparar = tk.Button(self.frame_botones, text="Comparar periodos", command=self.abrir_comparacion,
+                                      bg="#23376D", fg="white", activebackground="#3A4F9A",
+                                      activeforeground="white", font=("TkDefaultFont", 10, "bold"))
+        self.btn_comparar.pack(side=tk.LEFT, padx=5)
+        # Estado del refresco automático de las campañas recientes
+        self.estado_refresco = tk.Label(self.buttons_frame, text="", fg="#23376D", font=("TkDefaultFont", 9))
+        self.estado_refresco.pack()
 
         # Configurar la vista inicial para inicializar campanas_tabla
         self.grouping_var = tk.StringVar(value="Fecha")
@@ -156,17 +224,111 @@ class ResultadosApp:
             self.setup_analysis_view,
             self.view_manager.filter_var,
             self.analyze_all_campaigns,
-            self.campanas_tabla
+            self.campanas_tabla,
+            btn_detener=self.btn_detener,
+            serie_diaria_var=self.serie_diaria,
+            ventana_var=self.ventana_clics,
+            modelo_seleccion=self.modelo_seleccion,
+            btn_exportar_excel=self.btn_exportar_excel
         )
 
         # Configurar el comando del botón Analizar y el binding del Entry
         self.btn_analizar.config(command=self.analyzer.analizar)
+        self.btn_detener.config(command=self.analyzer.cancelar)
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar_ventana)
         self.entry.bind("<Return>", lambda event: self.analyzer.analizar())
 
         self.root.update()
         self.root.lift()
         self.root.focus_set()
         self.root.after(100, self.entry.focus_set)
+        self.programar_refresco()
+
+    def programar_refresco(self):
+        """Programa el siguiente refresco automático de las campañas recientes (si está activado)."""
+        if AUTO_REFRESH_MINUTES > 0:
+            self.root.after_ids.append(self.root.after(int(AUTO_REFRESH_MINUTES * 60000), self.refrescar_recientes))
+
+    def refrescar_recientes(self):
+        """
+        Vuelve a consultar en segundo plano las métricas y órdenes de las campañas enviadas hace
+        menos de AUTO_REFRESH_MAX_AGE_DAYS días, y actualiza sus filas y los totales en la tabla.
+        """
+        limite = (datetime.now() - timedelta(days=AUTO_REFRESH_MAX_AGE_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        recientes = [camp for camp in self.campanas if camp[3] >= limite]
+        if not recientes or self.token_refresco is not None:
+            self.programar_refresco()
+            return
+
+        self.token_refresco = TokenCancelacion()
+        resultado = queue.Queue()
+        degradaciones = []
+
+        def refrescar(token=self.token_refresco):
+            try:
+                resultado.put(refrescar_campanas(recientes, token=token, degradaciones=degradaciones))
+            except Exception as e:
+                resultado.put(({}, str(e)))
+
+        def esperar_resultado():
+            try:
+                actualizadas, error = resultado.get_nowait()
+            except queue.Empty:
+                self.root.after_ids.append(self.root.after(200, esperar_resultado))
+                return
+            self.token_refresco = None
+            if actualizadas:
+                self.aplicar_refresco(actualizadas)
+                historial.registrar_campanas(list(actualizadas.values()), degradaciones=degradaciones)
+            hora = datetime.now().strftime("%H:%M")
+            if error:
+                self.estado_refresco.config(text=f"⚠️ Refresco de campañas recientes ({hora}): {error}")
+            else:
+                self.estado_refresco.config(text=f"🔄 {len(actualizadas)} campañas recientes actualizadas a las {hora}")
+            self.programar_refresco()
+
+        threading.Thread(target=refrescar, daemon=True).start()
+        esperar_resultado()
+
+    def aplicar_refresco(self, actualizadas):
+        """Actualiza en la tabla las filas de las campañas refrescadas, sus subtotales y el gran total."""
+        for i, camp in enumerate(self.campanas):
+            if camp[1] in actualizadas:
+                self.campanas[i] = actualizadas[camp[1]]
+        show_local_value = self.show_local_value.get()
+        tabla = self.campanas_tabla
+
+        subtotales = set()
+        for camp in actualizadas.values():
+            item = self.modelo_seleccion.actualizar(camp)
+            if item is not None:
+                values, _ = add_campaign_row(camp, show_local_value)
+                values[0] = tabla.item(item, "values")[0]  # Conservar el indicador ▶/▼ de la fila
+                tabla.item(item, values=values)
+                # El subtotal del grupo es la primera fila "Subtotal" después de la campaña
+                siguiente = tabla.next(item)
+                while siguiente and tabla.item(siguiente, "values")[1:2] != ("Subtotal",):
+                    siguiente = tabla.next(siguiente)
+                if siguiente:
+                    subtotales.add(siguiente)
+
+        for subtotal in subtotales:
+            # Las campañas del grupo son las filas de campaña anteriores hasta el encabezado
+            grupo = []
+            anterior = tabla.prev(subtotal)
+            while anterior:
+                camp = self.modelo_seleccion.campana(anterior)
+                if camp is not None:
+                    grupo.append(camp)
+                elif not {"audience_detail", "audience_header"} & set(tabla.item(anterior, "tags")):
+                    break
+                anterior = tabla.prev(anterior)
+            values, _ = calculate_subtotals(grupo, show_local_value)
+            if values:
+                tabla.item(subtotal, values=values)
+
+        _, total = calculate_subtotals(self.campanas, show_local_value)
+        self.mostrar_gran_total([total] if total else [])
 
     def toggle_entry_state(self):
         """Habilita o deshabilita el campo de entrada según el estado del checkbox."""
@@ -222,6 +384,7 @@ class ResultadosApp:
         self.resultados_label = self.view_manager.resultados_label
         self.analyzer.resultados_tabla = self.resultados_tabla
         self.analyzer.resultados_label = self.resultados_label
+        self.analyzer.progreso_label = self.view_manager.progreso_label
         self.analyzer.campanas_tabla = self.campanas_tabla
         self.email_preview.campanas_tabla = self.campanas_tabla
         self.exporter.campanas_tabla = self.campanas_tabla
@@ -240,6 +403,7 @@ class ResultadosApp:
         self.resultados_label = None
         self.email_preview.resultados_label = None
         self.analyzer.resultados_label = None
+        self.analyzer.progreso_label = None
         self.analyze_all_campaigns.set(True)
         self.setup_metrics_view()
         self.toggle_entry_state()
@@ -268,12 +432,17 @@ class ResultadosApp:
                 self.grouping_var.get(), 
                 self.show_local_value.get(),
                 template_ids_dict=self.template_ids,
-                view_manager=self.view_manager  # PASAR VIEW_MANAGER
+                view_manager=self.view_manager,  # PASAR VIEW_MANAGER
+                modelo=self.modelo_seleccion
             )
         except Exception as e:
             print(f"Error al actualizar la tabla de campañas: {str(e)}")
             return
 
+        self.mostrar_gran_total(all_subtotals)
+
+    def mostrar_gran_total(self, all_subtotals):
+        """Muestra en la tabla de gran total la suma de los subtotales de los grupos."""
         self.grand_total_tabla.delete(*self.grand_total_tabla.get_children())
         if all_subtotals:
             grand_total_delivered = 0
@@ -318,11 +487,38 @@ class ResultadosApp:
                 ]
                 self.grand_total_tabla.insert("", "end", values=values, tags=("grand_total",))
 
+    def abrir_resumen_clics(self):
+        """Abre el resumen de clics por SKU, categoría o URL de las campañas ya analizadas."""
+        if not len(self.analyzer.indice_clics):
+            messagebox.showinfo("Información", "Primero analiza algunas campañas para ver el resumen de clics.")
+            return
+        RollupView(self.root, self.analyzer.indice_clics, self.campanas)
+
+    def abrir_tendencias(self):
+        """Abre las tendencias por periodo de todas las cargas guardadas en el historial local."""
+        VentanaTendencias(self.root)
+
+    def abrir_comparacion(self):
+        """Compara las campañas cargadas con otro periodo, alineadas por país y/o prefijo."""
+        VentanaComparacion(self.root, self.campanas, self.list_start_date, self.list_end_date)
+
+    def cerrar_ventana(self):
+        """Cancela el análisis y el refresco en curso (si los hay) y cierra la aplicación."""
+        self.analyzer.cancelar("Ventana cerrada")
+        if self.token_refresco:
+            self.token_refresco.cancelar("Ventana cerrada")
+        for after_id in list(self.root.after_ids):
+            self.root.after_cancel(after_id)
+        self.root.quit()
+        self.root.destroy()
+
     def nuevo_rango(self):
         if self.webview_window:
             self.webview_window.destroy()
             self.webview_window = None
             self.email_preview.webview_window[0] = None
+        if self.token_refresco:
+            self.token_refresco.cancelar("Nuevo rango")
 
         for after_id in list(self.root.after_ids):
             self.root.after_cancel(after_id)
@@ -343,100 +539,131 @@ def abrir_resultados(list_start_date, list_end_date):
 
     root.after_ids = []
 
-    # ScrolledText para mostrar todos los mensajes sin borrar
+    # ScrolledText con las últimas líneas de la carga; el historial completo va a LOAD_LOG_FILE
     texto_resultados = scrolledtext.ScrolledText(root, wrap=tk.WORD, height=35)
     texto_resultados.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
-    texto_resultados.insert(tk.END, "Cargando...\n")
-
-    def format_timestamp():
-        """Retorna timestamp formateado"""
-        from datetime import datetime
-        return datetime.now().strftime("%H:%M:%S")
-
-    def update_text(message):
-        # Verificar si es una actualización incremental
-        if message.startswith("ACTUALIZAR:"):
-            # Extraer el mensaje real
-            actual_message = message[11:]  # Quitar "ACTUALIZAR:"
-            timestamp = format_timestamp()
-            
-            # Obtener el contenido actual
-            current_content = texto_resultados.get("1.0", tk.END)
-            lines = current_content.strip().split('\n')
-            
-            if lines and len(lines) > 1:
-                # Buscar la última línea que NO sea un mensaje de completado (✅) 
-                # y que NO esté vacía
-                line_to_update = -1
-                for i in range(len(lines) - 1, -1, -1):
-                    line = lines[i].strip()
-                    if line and not line.endswith("✅ Completado:") and not "✅ Completado:" in line:
-                        line_to_update = i
-                        break
-                
-                if line_to_update >= 0:
-                    # Eliminar la línea encontrada y reemplazarla
-                    texto_resultados.delete(f"{line_to_update + 1}.0", f"{line_to_update + 2}.0")
-                    texto_resultados.insert(f"{line_to_update + 1}.0", f"[{timestamp}] {actual_message}\n")
-                else:
-                    # Si no se encontró línea válida, agregar normalmente
-                    texto_resultados.insert(tk.END, f"[{timestamp}] {actual_message}\n")
-            else:
-                # Si no hay líneas, agregar normalmente
-                texto_resultados.insert(tk.END, f"[{timestamp}] {actual_message}\n")
-        else:
-            # Mensaje normal - agregar nueva línea
-            timestamp = format_timestamp()
-            texto_resultados.insert(tk.END, f"[{timestamp}] {message}\n")
-        
-        # Auto-scroll hacia abajo
-        texto_resultados.see(tk.END)
-        root.update()
+    registro = RegistroCarga(texto_resultados)
+    registro.agregar("Cargando...")
+
+    # La carga corre en un hilo aparte; sus mensajes llegan por una cola que se vacía desde Tk
+    token = TokenCancelacion(LOAD_DEADLINE_SECONDS)
+    mensajes = queue.Queue()
+
+    frame_carga = tk.Frame(root)
+    frame_carga.pack(pady=(0, 10))
+    btn_cancelar = tk.Button(frame_carga, text="Cancelar carga",
+                             command=lambda: [token.cancelar(), btn_cancelar.config(state="disabled", text="Cancelando...")],
+                             bg="#23376D", fg="white",
+                             activebackground="#3A4F9A",
+                             activeforeground="white",
+                             font=("TkDefaultFont", 10, "bold"))
+    btn_cancelar.pack()
+
+    def cerrar_durante_carga():
+        token.cancelar("Ventana cerrada")
+        registro.cerrar()
+        root.quit()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", cerrar_durante_carga)
 
-    root.update()
-    app = None
-    
     # CREAR UN VIEW_MANAGER TEMPORAL PARA PASAR A obtener_campanas
     temp_view_manager = ViewManager(None, 0, 0, None, None)
 
-    # PASAR EL VIEW_MANAGER A obtener_campanas
-    campanas, error = obtener_campanas(list_start_date, list_end_date, update_text, temp_view_manager)
-    
-    if error:
-        # Agregar el error al historial con timestamp
-        timestamp = format_timestamp()
-        texto_resultados.insert(tk.END, f"[{timestamp}] Error al cargar campañas: {error}\n")
-        texto_resultados.see(tk.END)
-        
-        # Frame para centrar los botones de error
-        buttons_frame = tk.Frame(root)
-        buttons_frame.pack(pady=10)
-        
-        tk.Button(buttons_frame, text="Cerrar", 
-                 command=lambda: [root.quit(), root.destroy()], 
-                 bg="#23376D", fg="white", 
-                 activebackground="#3A4F9A", 
-                 activeforeground="white", 
-                 font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
-        
-        tk.Button(buttons_frame, text="Nuevo rango de fecha", 
-                 command=lambda: [root.quit(), root.destroy(), main()], 
-                 bg="#23376D", fg="white", 
-                 activebackground="#3A4F9A", 
-                 activeforeground="white", 
-                 font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
-    else:
-        # Agregar mensaje final al historial
-        timestamp = format_timestamp()
-        texto_resultados.insert(tk.END, f"[{timestamp}] ✅ Carga completada exitosamente\n")
-        texto_resultados.see(tk.END)
-        root.update()
-        
-        # Esperar un momento para que el usuario vea el mensaje final
-        root.after(1000, lambda: [
-            texto_resultados.pack_forget(),  # Ocultar la ventana de carga
-            ResultadosApp(root, campanas, list_start_date, list_end_date, temp_view_manager.audience_names_cache)
-        ])
+    def volcar_instrumentacion():
+        """Escribe la instrumentación en TRACE_FILE si está configurado."""
+        if not TRACE_FILE:
+            return
+        try:
+            instrumentacion.exportar(TRACE_FILE)
+        except OSError as e:
+            print(f"No se pudo escribir la instrumentación en {TRACE_FILE}: {e}")
+
+    def cargar():
+        try:
+            degradaciones = []
+            resultado = obtener_campanas(list_start_date, list_end_date, mensajes.put, temp_view_manager, token=token,
+                                         degradaciones=degradaciones)
+            if resultado[0]:
+                # Solo una carga completa deja su rango disponible para reutilizarlo (e.g. al comparar periodos):
+                # sin cancelar, sin cuentas fallidas y con órdenes y tasas de cambio
+                completa = not token.cancelado and not degradaciones
+                if degradaciones:
+                    mensajes.put("⚠️ Carga incompleta (" + ", ".join(f"{cuenta}: {motivo}" for cuenta, motivo in degradaciones)
+                                 + "); su rango no se reutilizará desde el historial")
+                guardadas = historial.registrar_campanas(resultado[0], desde=list_start_date if completa else None,
+                                                         hasta=list_end_date if completa else None,
+                                                         degradaciones=degradaciones)
+                if guardadas:
+                    mensajes.put(f"🗄️ {guardadas} campañas agregadas al historial local")
+        except Exception as e:
+            resultado = (None, f"Error inesperado: {str(e)}")
+        mensajes.put(("FIN", resultado))
+
+    def procesar_mensajes():
+        try:
+            while True:
+                mensaje = mensajes.get_nowait()
+                if isinstance(mensaje, tuple) and mensaje[0] == "FIN":
+                    terminar_carga(*mensaje[1])
+                    return
+                registro.agregar(mensaje)
+        except queue.Empty:
+            pass
+        root.after(50, procesar_mensajes)
+
+    def terminar_carga(campanas, error):
+        frame_carga.pack_forget()
+        root.protocol("WM_DELETE_WINDOW", lambda: [root.quit(), root.destroy()])
+
+        # Mostrar el resumen de solicitudes y fases de la carga
+        resumen_carga = instrumentacion.resumen()
+        print(resumen_carga)
+        for linea in resumen_carga.split("\n"):
+            registro.agregar(linea)
+
+        if error:
+            # Agregar el error al historial con timestamp
+            registro.agregar(f"Error al cargar campañas: {error}")
+            registro.cerrar()
+            
+            # Frame para centrar los botones de error
+            buttons_frame = tk.Frame(root)
+            buttons_frame.pack(pady=10)
+            
+            tk.Button(buttons_frame, text="Cerrar", 
+                     command=lambda: [root.quit(), root.destroy()], 
+                     bg="#23376D", fg="white", 
+                     activebackground="#3A4F9A", 
+                     activeforeground="white", 
+                     font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
+            
+            tk.Button(buttons_frame, text="Nuevo rango de fecha", 
+                     command=lambda: [root.quit(), root.destroy(), main()], 
+                     bg="#23376D", fg="white", 
+                     activebackground="#3A4F9A", 
+                     activeforeground="white", 
+                     font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
+            volcar_instrumentacion()
+        else:
+            # Agregar mensaje final al historial
+            if token.cancelado:
+                registro.agregar(f"⚠️ Carga parcial ({token.motivo}): se muestran {len(campanas)} campañas")
+            else:
+                registro.agregar("✅ Carga completada exitosamente")
+            registro.cerrar()
+            
+            # Esperar un momento para que el usuario vea el mensaje final
+            # Se vuelca la instrumentación después de crear la app para incluir el renderizado de la tabla
+            root.after(1000, lambda: [
+                texto_resultados.pack_forget(),  # Ocultar la ventana de carga
+                ResultadosApp(root, campanas, list_start_date, list_end_date, temp_view_manager.audience_names_cache),
+                volcar_instrumentacion()
+            ])
+
+    instrumentacion.reiniciar()
+    threading.Thread(target=cargar, daemon=True).start()
+    procesar_mensajes()
 
     root.mainloop()
 
@@ -0,0 +1,308 @@
+# history_store.py
+"""
+Historial local de campañas en SQLite.
+
+Cada carga agrega una instantánea de las métricas de sus campañas (aperturas, clics,
+entregas, órdenes y valor) con la hora de carga, y cada análisis agrega los clics totales
+de las campañas analizadas. No se actualiza ni se borra nada: las tendencias usan la
+última instantánea de cada campaña, así que se pueden consultar meses sin volver a
+pedirlos a Klaviyo.
+
+Las instantáneas de una carga sin métricas de órdenes o sin tasas de cambio quedan marcadas
+(ordenes_ok, tasas_ok) y solo se usan si la campaña no tiene ninguna instantánea completa, para
+que una carga degradada no reemplace el valor bueno de una anterior.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from campaign_logic import SIN_ORDENES, SIN_TASAS
+from config import HISTORY_FILE
+
+# Agrupaciones de tendencias: etiqueta -> expresión SQL sobre fecha_envio (YYYY-MM-DD)
+PERIODOS = {
+    "Mes": "substr(fecha_envio, 1, 7)",
+    "Semana": "strftime('%Y-S%W', fecha_envio)",
+    "Día": "fecha_envio",
+}
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS campanas (
+    id INTEGER PRIMARY KEY,
+    cargado_en TEXT NOT NULL,
+    campaign_id TEXT NOT NULL,
+    cuenta TEXT,
+    nombre TEXT,
+    fecha_envio TEXT,
+    hora_envio TEXT,
+    pais TEXT,
+    prefijo TEXT,
+    open_rate REAL,
+    click_rate REAL,
+    recibidos INTEGER,
+    opens_unicos INTEGER,
+    ordenes_unicas INTEGER,
+    valor_usd REAL,
+    valor_local REAL,
+    ordenes INTEGER,
+    per_recipient REAL,
+    ordenes_ok INTEGER NOT NULL DEFAULT 1,
+    tasas_ok INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS campanas_fecha ON campanas (fecha_envio);
+CREATE INDEX IF NOT EXISTS campanas_pais ON campanas (pais, fecha_envio);
+CREATE INDEX IF NOT EXISTS campanas_prefijo ON campanas (prefijo, fecha_envio);
+CREATE INDEX IF NOT EXISTS campanas_campaign ON campanas (campaign_id, id);
+
+CREATE TABLE IF NOT EXISTS clics (
+    id INTEGER PRIMARY KEY,
+    cargado_en TEXT NOT NULL,
+    campaign_id TEXT NOT NULL,
+    fecha_envio TEXT,
+    ventana_dias INTEGER,
+    total_clics INTEGER,
+    urls INTEGER
+);
+CREATE INDEX IF NOT EXISTS clics_fecha ON clics (fecha_envio);
+CREATE INDEX IF NOT EXISTS clics_campaign ON clics (campaign_id, id);
+
+CREATE TABLE IF NOT EXISTS cargas (
+    id INTEGER PRIMARY KEY,
+    cargado_en TEXT NOT NULL,
+    desde TEXT NOT NULL,
+    hasta TEXT NOT NULL,
+    campanas INTEGER
+);
+CREATE INDEX IF NOT EXISTS cargas_rango ON cargas (desde, hasta);
+"""
+
+# Columnas agregadas después de la primera versión del esquema: (tabla, columna, definición)
+_COLUMNAS_NUEVAS = (
+    ("campanas", "ordenes_ok", "INTEGER NOT NULL DEFAULT 1"),
+    ("campanas", "tasas_ok", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+# Instantánea a usar por campaña: la última completa o, si no hay ninguna, la última
+_ULTIMA_INSTANTANEA = "COALESCE(MAX(CASE WHEN ordenes_ok AND tasas_ok THEN id END), MAX(id))"
+
+
+def pais_de(name):
+    """País de una campaña (sufijo del nombre), como en la agrupación por país de la tabla."""
+    partes = name.split("_")
+    return partes[-1].strip().lower() if len(partes) > 1 else "desconocido"
+
+
+def prefijo_de(name):
+    """Prefijo de una campaña (antes del primer "_"), como en la agrupación por fecha de la tabla."""
+    return name.split("_")[0].lower() if "_" in name else "otro"
+
+
+class HistorialCampanas:
+    """
+    Almacén de solo anexado con las instantáneas de campañas y clics.
+
+    Usa una sola conexión compartida entre hilos (la carga y el análisis escriben desde sus
+    hilos de trabajo) protegida por un lock; se abre la primera vez que se usa.
+    """
+
+    def __init__(self, ruta=HISTORY_FILE):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = None
+
+    def _conectar(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexion.executescript(_ESQUEMA)
+            for tabla, columna, definicion in _COLUMNAS_NUEVAS:
+                existentes = {fila[1] for fila in self._conexion.execute(f"PRAGMA table_info({tabla})")}
+                if columna not in existentes:
+                    self._conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+        return self._conexion
+
+    def registrar_campanas(self, campanas, cargado_en=None, desde=None, hasta=None, degradaciones=()):
+        """
+        Agrega una instantánea de las campañas cargadas.
+
+        Args:
+            campanas (list): Tuplas de obtener_campanas.
+            cargado_en (str, optional): Hora de la carga (por defecto, ahora).
+            desde, hasta (str, optional): Rango completo de la carga (YYYY-MM-DD); si se indica,
+                el rango queda registrado y puede reutilizarse sin volver a cargarlo.
+            degradaciones (list, optional): Tuplas (cuenta, motivo) de obtener_campanas; las
+                campañas de las cuentas sin órdenes o sin tasas se guardan marcadas.
+
+        Returns:
+            int: Campañas guardadas (0 si el historial está desactivado o falló la escritura).
+        """
+        if not self.ruta or not campanas:
+            return 0
+        cargado_en = cargado_en or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        sin_ordenes = {cuenta for cuenta, motivo in degradaciones if motivo == SIN_ORDENES}
+        sin_tasas = {cuenta for cuenta, motivo in degradaciones if motivo == SIN_TASAS}
+        filas = []
+        for camp in campanas:
+            (idx, campaign_id, name, send_time, open_rate, click_rate, delivered, opens_unicos, subject, preview,
+             template_id, audiences, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient) = camp[:17]
+            cuenta = camp[17] if len(camp) > 17 else None
+            filas.append((cargado_en, campaign_id, cuenta, name, send_time[:10], send_time, pais_de(name), prefijo_de(name),
+                          open_rate, click_rate, delivered, opens_unicos, order_unique, order_sum_value,
+                          order_sum_value_local, order_count, per_recipient,
+                          cuenta not in sin_ordenes, cuenta not in sin_tasas))
+        operaciones = [(
+            "INSERT INTO campanas (cargado_en, campaign_id, cuenta, nombre, fecha_envio, hora_envio, pais, prefijo, "
+            "open_rate, click_rate, recibidos, opens_unicos, ordenes_unicas, valor_usd, valor_local, ordenes, per_recipient, "
+            "ordenes_ok, tasas_ok) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", filas)]
+        if desde and hasta:
+            operaciones.append(("INSERT INTO cargas (cargado_en, desde, hasta, campanas) VALUES (?, ?, ?, ?)",
+                                [(cargado_en, desde, hasta, len(filas))]))
+        return self._insertar(operaciones)
+
+    def registrar_clics(self, registros, ventana_dias=None, cargado_en=None):
+        """
+        Agrega los clics totales de las campañas de un análisis.
+
+        Args:
+            registros (list): Tuplas (campaign_id, send_date, total_clicks, urls).
+            ventana_dias (int, optional): Ventana de atribución del análisis (None = hasta hoy).
+            cargado_en (str, optional): Hora del análisis (por defecto, ahora).
+
+        Returns:
+            int: Registros guardados.
+        """
+        if not self.ruta or not registros:
+            return 0
+        cargado_en = cargado_en or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        filas = [(cargado_en, campaign_id, send_date, ventana_dias, total_clicks, urls)
+                 for campaign_id, send_date, total_clicks, urls in registros]
+        return self._insertar([(
+            "INSERT INTO clics (cargado_en, campaign_id, fecha_envio, ventana_dias, total_clics, urls) "
+            "VALUES (?, ?, ?, ?, ?, ?)", filas)])
+
+    def _insertar(self, operaciones):
+        """Ejecuta [(sql, filas), ...] en una sola transacción; devuelve las filas de la primera."""
+        with self._lock:
+            try:
+                conexion = self._conectar()
+                with conexion:
+                    for sql, filas in operaciones:
+                        conexion.executemany(sql, filas)
+                return len(operaciones[0][1])
+            except (OSError, sqlite3.Error) as e:
+                print(f"No se pudo guardar en el historial {self.ruta}: {e}")
+                return 0
+
+    def tendencias(self, desde, hasta, periodo="Mes", pais=None, prefijo=None):
+        """
+        Resume la última instantánea completa de cada campaña enviada entre dos fechas, por periodo.
+
+        Args:
+            desde (str): Primera fecha de envío incluida (YYYY-MM-DD).
+            hasta (str): Última fecha de envío incluida (YYYY-MM-DD).
+            periodo (str): Clave de PERIODOS ("Mes", "Semana" o "Día").
+            pais (str, optional): Código de país para filtrar.
+            prefijo (str, optional): Prefijo del nombre para filtrar.
+
+        Returns:
+            tuple: (filas, error); cada fila es (periodo, campañas, recibidos, open_rate, click_rate,
+                clics, órdenes, valor_usd, per_recipient), con las tasas en porcentaje ponderado por recibidos.
+        """
+        if not self.ruta:
+            return [], "El historial está desactivado (KLAVIYO_HISTORY_FILE vacío)."
+        filtros, parametros = ["fecha_envio BETWEEN ? AND ?"], [desde, hasta]
+        if pais:
+            filtros.append("pais = ?")
+            parametros.append(pais.lower())
+        if prefijo:
+            filtros.append("prefijo = ?")
+            parametros.append(prefijo.lower())
+        sql = f"""
+            WITH ultimas AS (
+                SELECT c.* FROM campanas c
+                JOIN (SELECT {_ULTIMA_INSTANTANEA} AS id FROM campanas WHERE {" AND ".join(filtros)} GROUP BY campaign_id) u
+                  ON c.id = u.id
+            ),
+            clics_ultimos AS (
+                SELECT k.campaign_id, k.total_clics FROM clics k
+                JOIN (SELECT MAX(id) AS id FROM clics WHERE fecha_envio BETWEEN ? AND ? GROUP BY campaign_id) u
+                  ON k.id = u.id
+            )
+            SELECT {PERIODOS[periodo]} AS periodo,
+                   COUNT(*),
+                   SUM(recibidos),
+                   SUM(open_rate * recibidos) / NULLIF(SUM(recibidos), 0),
+                   SUM(click_rate * recibidos) / NULLIF(SUM(recibidos), 0),
+                   SUM(clics_ultimos.total_clics),
+                   SUM(ordenes),
+                   SUM(valor_usd),
+                   SUM(per_recipient * recibidos) / NULLIF(SUM(recibidos), 0)
+            FROM ultimas LEFT JOIN clics_ultimos USING (campaign_id)
+            GROUP BY periodo
+            ORDER BY periodo
+        """
+        with self._lock:
+            try:
+                return self._conectar().execute(sql, parametros + [desde, hasta]).fetchall(), None
+            except (OSError, sqlite3.Error) as e:
+                return [], f"Error al consultar el historial: {e}"
+
+    def carga_que_cubre(self, desde, hasta):
+        """
+        Devuelve la hora de la última carga completa que incluyó todo el rango y se hizo después
+        de que terminara (sus métricas no quedaron a medias), o None si no la hay.
+        """
+        if not self.ruta:
+            return None
+        with self._lock:
+            try:
+                fila = self._conectar().execute(
+                    "SELECT cargado_en FROM cargas WHERE desde <= ? AND hasta >= ? AND cargado_en > ? "
+                    "ORDER BY id DESC LIMIT 1", (desde, hasta, f"{hasta} 23:59:59")).fetchone()
+            except (OSError, sqlite3.Error) as e:
+                print(f"No se pudo consultar el historial {self.ruta}: {e}")
+                return None
+        return fila[0] if fila else None
+
+    def campanas_guardadas(self, desde, hasta):
+        """
+        Reconstruye las campañas enviadas entre dos fechas a partir de su última instantánea completa.
+
+        Returns:
+            tuple: (campanas, error), con tuplas de 18 elementos como las de obtener_campanas;
+                asunto, preview, template y audiencias no se guardan en el historial.
+        """
+        if not self.ruta:
+            return None, "El historial está desactivado (KLAVIYO_HISTORY_FILE vacío)."
+        sql = f"""
+            SELECT c.campaign_id, c.nombre, c.hora_envio, c.open_rate, c.click_rate, c.recibidos, c.opens_unicos,
+                   c.ordenes_unicas, c.valor_usd, c.valor_local, c.ordenes, c.per_recipient, c.cuenta
+            FROM campanas c
+            JOIN (SELECT {_ULTIMA_INSTANTANEA} AS id FROM campanas WHERE fecha_envio BETWEEN ? AND ? GROUP BY campaign_id) u
+              ON c.id = u.id
+            ORDER BY c.hora_envio
+        """
+        with self._lock:
+            try:
+                filas = self._conectar().execute(sql, (desde, hasta)).fetchall()
+            except (OSError, sqlite3.Error) as e:
+                return None, f"Error al consultar el historial: {e}"
+        campanas = [
+            (idx, campaign_id, nombre, hora_envio, open_rate, click_rate, recibidos, opens_unicos, "", "", None, "N/A",
+             ordenes_unicas, valor_usd, valor_local, ordenes, per_recipient, cuenta)
+            for idx, (campaign_id, nombre, hora_envio, open_rate, click_rate, recibidos, opens_unicos,
+                      ordenes_unicas, valor_usd, valor_local, ordenes, per_recipient, cuenta) in enumerate(filas, 1)
+        ]
+        return campanas, None
+
+    def cerrar(self):
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
+
+
+# Instancia compartida por toda la aplicación
+historial = HistorialCampanas()
@@ -0,0 +1,80 @@
+# ingest.py
+"""
+Capa de ingesta de las respuestas de Klaviyo: decodifica el JSON (con orjson si está
+instalado) y extrae de inmediato solo los campos que usa la aplicación en registros
+livianos, para que las respuestas completas puedan descartarse en cuanto llegan.
+"""
+import json
+from collections import namedtuple
+
+try:
+    import orjson  # Opcional: decodificación más rápida
+except ImportError:
+    orjson = None
+
+
+# Fila del reporte campaign-values-report
+MetricaCampana = namedtuple("MetricaCampana", ["campaign_id", "message_id", "open_rate", "click_rate", "delivered"])
+
+# Datos de una campaña necesarios para la tabla (audiencias como IDs; message_id para el subject)
+DetalleCampana = namedtuple("DetalleCampana", ["campaign_id", "name", "send_time", "included", "excluded", "message_id"])
+
+
+def decodificar_json(response):
+    """Decodifica el cuerpo JSON de una respuesta, usando orjson si está disponible."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
+
+
+def extraer_metricas(pagina):
+    """
+    Convierte una página del reporte campaign-values-report en registros MetricaCampana.
+
+    Args:
+        pagina (dict): Respuesta decodificada de una página del reporte.
+
+    Returns:
+        list: Registros MetricaCampana de la página.
+    """
+    metricas = []
+    for resultado in pagina['data']['attributes']['results']:
+        groupings = resultado.get('groupings', {})
+        statistics = resultado.get('statistics', {})
+        metricas.append(MetricaCampana(
+            groupings.get('campaign_id'),
+            groupings.get('campaign_message_id'),
+            statistics.get('open_rate', 0),
+            statistics.get('click_rate', 0),
+            statistics.get('delivered', 0),
+        ))
+    return metricas
+
+
+def extraer_detalle(campaign_id, campaign_data):
+    """
+    Extrae de la respuesta de /api/campaigns/{id}/ los campos que usa la aplicación.
+
+    Args:
+        campaign_id (str): ID de la campaña.
+        campaign_data (dict): Respuesta decodificada.
+
+    Returns:
+        DetalleCampana: Registro con nombre, send_time (ISO, sin formatear), IDs de audiencias
+            incluidas/excluidas y el ID del primer mensaje (o None).
+    """
+    data = campaign_data['data']
+    attributes = data.get('attributes', {})
+    audiences = attributes.get('audiences') or {}
+    try:
+        message_id = data['relationships']['campaign-messages']['data'][0]['id']
+    except (KeyError, IndexError, TypeError):
+        message_id = None
+    return DetalleCampana(
+        campaign_id,
+        attributes.get('name', f"Campaign {campaign_id}"),
+        attributes.get('send_time') or 'N/A',
+        tuple(audiences.get('included', [])),
+        tuple(audiences.get('excluded', [])),
+        message_id,
+    )
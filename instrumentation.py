@@ -0,0 +1,204 @@
+# instrumentation.py
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+from cancellation import dormir
+
+
+def nombre_endpoint(url):
+    """
+    Obtiene un nombre corto de endpoint a partir de una URL.
+
+    Para la API de Klaviyo usa el primer segmento después de /api/ (e.g. "campaigns",
+    "metric-aggregates"); para otros servicios usa el host.
+    """
+    parsed = urlparse(url)
+    partes = [p for p in parsed.path.split("/") if p]
+    if parsed.netloc.endswith("klaviyo.com") and "api" in partes:
+        resto = partes[partes.index("api") + 1:]
+        if resto:
+            return resto[0]
+    return parsed.netloc or url
+
+
+def _percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return 0.0
+    k = max(0, min(len(valores_ordenados) - 1, math.ceil(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[k]
+
+
+class Instrumentacion:
+    """
+    Registra estadísticas por endpoint (solicitudes, latencias, bytes, respuestas 429 y
+    tiempo de espera por rate limit) y la duración de cada fase de una carga.
+    Es seguro usarla desde varios hilos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta todo lo registrado y reinicia el reloj de la carga."""
+        with self._lock:
+            self.inicio = time.perf_counter()
+            self.endpoints = {}
+            self.fases = []
+            self.eventos = []
+
+    def _endpoint(self, endpoint):
+        if endpoint not in self.endpoints:
+            self.endpoints[endpoint] = {"solicitudes": 0, "latencias": [], "bytes": 0, "errores": 0, "429": 0, "espera": 0.0}
+        return self.endpoints[endpoint]
+
+    def _evento(self, nombre, categoria, inicio, duracion, args=None):
+        self.eventos.append({
+            "name": nombre,
+            "cat": categoria,
+            "ph": "X",
+            "ts": int((inicio - self.inicio) * 1_000_000),
+            "dur": int(duracion * 1_000_000),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args or {},
+        })
+
+    def registrar_solicitud(self, endpoint, inicio, duracion, bytes_recibidos, status_code):
+        """Registra una solicitud HTTP terminada (status_code es None si falló la conexión)."""
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats["solicitudes"] += 1
+            stats["latencias"].append(duracion)
+            stats["bytes"] += bytes_recibidos
+            if status_code == 429:
+                stats["429"] += 1
+            elif status_code is None or status_code >= 400:
+                stats["errores"] += 1
+            self._evento(endpoint, "http", inicio, duracion, {"status": status_code, "bytes": bytes_recibidos})
+
+    def registrar_espera(self, endpoint, inicio, duracion):
+        """Registra el tiempo dormido por rate limit (Retry-After o el limitador adaptativo)."""
+        with self._lock:
+            self._endpoint(endpoint)["espera"] += duracion
+            self._evento(f"espera {endpoint}", "espera", inicio, duracion)
+
+    @contextmanager
+    def fase(self, nombre):
+        """Mide la duración de reloj de una fase de la carga."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                self.fases.append((nombre, inicio - self.inicio, duracion))
+                self._evento(nombre, "fase", inicio, duracion)
+
+    def resumen_endpoints(self):
+        """Devuelve un diccionario con las estadísticas agregadas por endpoint."""
+        with self._lock:
+            endpoints = {nombre: dict(stats, latencias=sorted(stats["latencias"])) for nombre, stats in self.endpoints.items()}
+        resumen = {}
+        for nombre, stats in endpoints.items():
+            resumen[nombre] = {
+                "solicitudes": stats["solicitudes"],
+                "p50_ms": round(_percentil(stats["latencias"], 50) * 1000, 1),
+                "p95_ms": round(_percentil(stats["latencias"], 95) * 1000, 1),
+                "bytes": stats["bytes"],
+                "errores": stats["errores"],
+                "429": stats["429"],
+                "espera_s": round(stats["espera"], 2),
+            }
+        return resumen
+
+    def total_solicitudes(self):
+        """Devuelve el número de solicitudes registradas en todos los endpoints."""
+        with self._lock:
+            return sum(stats["solicitudes"] for stats in self.endpoints.values())
+
+    def resumen_fases(self):
+        """Devuelve la duración total por fase, en el orden en que aparecieron."""
+        with self._lock:
+            fases = list(self.fases)
+        totales = {}
+        for nombre, _, duracion in fases:
+            totales[nombre] = totales.get(nombre, 0.0) + duracion
+        return totales
+
+    def resumen(self):
+        """Devuelve un resumen legible de la carga, una línea por fase y por endpoint."""
+        total = time.perf_counter() - self.inicio
+        lineas = [f"📊 Resumen de la carga ({total:.1f} s)"]
+        fases = self.resumen_fases()
+        if fases:
+            lineas.append("Fases:")
+            for nombre, duracion in fases.items():
+                lineas.append(f"  {nombre}: {duracion:.2f} s")
+        endpoints = self.resumen_endpoints()
+        if endpoints:
+            lineas.append("Endpoints:")
+            for nombre, stats in sorted(endpoints.items(), key=lambda e: e[1]["solicitudes"], reverse=True):
+                lineas.append(
+                    f"  {nombre}: {stats['solicitudes']} solicitudes, p50 {stats['p50_ms']:.0f} ms, "
+                    f"p95 {stats['p95_ms']:.0f} ms, {stats['bytes'] / 1024:,.0f} KB, "
+                    f"429: {stats['429']}, espera: {stats['espera_s']:.1f} s"
+                )
+            espera_total = sum(stats["espera_s"] for stats in endpoints.values())
+            lineas.append(f"Tiempo total esperando por rate limit: {espera_total:.1f} s")
+        return "\n".join(lineas)
+
+    def exportar(self, ruta):
+        """
+        Escribe la instrumentación en un archivo JSON.
+
+        El archivo incluye la clave "traceEvents", por lo que también puede abrirse
+        directamente en chrome://tracing o Perfetto.
+        """
+        with self._lock:
+            eventos = list(self.eventos)
+        contenido = {
+            "traceEvents": eventos,
+            "displayTimeUnit": "ms",
+            "fases": self.resumen_fases(),
+            "endpoints": self.resumen_endpoints(),
+        }
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(contenido, f, ensure_ascii=False, indent=1)
+
+
+# Instancia compartida por toda la aplicación
+instrumentacion = Instrumentacion()
+
+
+def solicitud_instrumentada(method, url, **kwargs):
+    """Ejecuta requests.request registrando latencia, bytes y código de estado."""
+    endpoint = nombre_endpoint(url)
+    inicio = time.perf_counter()
+    try:
+        response = requests.request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        instrumentacion.registrar_solicitud(endpoint, inicio, time.perf_counter() - inicio, 0, None)
+        raise
+    instrumentacion.registrar_solicitud(endpoint, inicio, time.perf_counter() - inicio, len(response.content), response.status_code)
+    return response
+
+
+def esperar_retry_after(url, segundos, token=None):
+    """
+    Duerme los segundos indicados por Retry-After y los contabiliza para el endpoint.
+    Con un token de cancelación la espera se interrumpe en cuanto se cancela.
+    """
+    inicio = time.perf_counter()
+    try:
+        dormir(segundos, token)
+    finally:
+        instrumentacion.registrar_espera(nombre_endpoint(url), inicio, time.perf_counter() - inicio)
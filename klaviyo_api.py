@@ -1,19 +1,69 @@
 # klaviyo_api.py
 import requests
 import json
-import time
+import math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from config import HEADERS_KLAVIYO, KLAVIYO_URLS  # Importar solo lo necesario
+from config import (KLAVIYO_URLS, REQUEST_TIMEOUT_SECONDS, REPORT_TIMEOUT_SECONDS,
+                    REPORT_SHARD_DAYS, REPORT_MAX_SHARDS, REPORT_MAX_WORKERS, API_MAX_RETRIES)  # Importar solo lo necesario
+from instrumentation import solicitud_instrumentada
+from circuit_breaker import CircuitoAbierto, backoff, esperar_reintento
+from cancellation import OperacionCancelada, ejecutar_cancelable
+from ingest import decodificar_json, extraer_metricas
+from accounts import cuenta_actual, usar_cuenta
+
+def klaviyo_request(method, url, token=None, **kwargs):
+    """
+    Envía una solicitud a la API de Klaviyo con los encabezados y timeout por defecto,
+    registrándola en la instrumentación (latencia, bytes, código de estado).
+    Usa la clave y el limitador de la cuenta activa (accounts.usar_cuenta): antes de enviarla
+    espera el turno que asigna el limitador del endpoint, y después le pasa los encabezados
+    RateLimit-* de la respuesta. Los errores de red y las respuestas 5xx cuentan para el
+    disyuntor del endpoint (circuit_breaker).
+
+    Args:
+        method (str): Método HTTP ("GET", "POST").
+        url (str): URL completa del endpoint.
+        token (TokenCancelacion, optional): Si se cancela, la solicitud en curso se abandona
+            y se lanza OperacionCancelada.
+        **kwargs: Argumentos adicionales para requests (json, data, headers, timeout).
+
+    Returns:
+        requests.Response: Respuesta de la API.
+
+    Raises:
+        CircuitoAbierto: Si el circuito del endpoint está abierto (sin enviar la solicitud).
+    """
+    cuenta = cuenta_actual()
+    kwargs.setdefault("headers", cuenta.headers)
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT_SECONDS)
+    prueba = cuenta.disyuntor.antes_de_solicitud(url)
+    exito = None
+    try:
+        cuenta.limitador.esperar_turno(url, token)
+        if token is None:
+            response = solicitud_instrumentada(method, url, **kwargs)
+        else:
+            response = ejecutar_cancelable(lambda: solicitud_instrumentada(method, url, **kwargs), token)
+        exito = None if response.status_code == 429 else response.status_code < 500
+    except requests.exceptions.RequestException:
+        exito = False
+        raise
+    finally:
+        cuenta.disyuntor.registrar(url, exito, prueba)
+    cuenta.limitador.registrar(url, response)
+    return response
 
 # Modificaciones necesarias en klaviyo_api.py
 
-def get_campaign_audiences(campaign_data, update_callback=None):
+def get_campaign_audiences(campaign_data, update_callback=None, token=None):
     """
     Extrae información de audiencias (listas y segmentos) de los datos de campaña.
 
     Args:
         campaign_data (dict): Datos de la campaña obtenidos de la API.
         update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
 
     Returns:
         str: Información formateada de las audiencias incluidas y excluidas con nombres.
@@ -33,7 +83,7 @@ def get_campaign_audiences(campaign_data, update_callback=None):
         
         if included:
             # Obtener nombres de audiencias incluidas
-            included_names = get_audience_names(included, update_callback)
+            included_names = get_audience_names(included, update_callback, token)
             if included_names:
                 # Mostrar solo los primeros 2 nombres completos para evitar texto muy largo
                 included_display = included_names[:2]
@@ -43,7 +93,7 @@ def get_campaign_audiences(campaign_data, update_callback=None):
         
         if excluded:
             # Obtener nombres de audiencias excluidas
-            excluded_names = get_audience_names(excluded, update_callback)
+            excluded_names = get_audience_names(excluded, update_callback, token)
             if excluded_names:
                 # Mostrar solo los primeros 2 nombres completos
                 excluded_display = excluded_names[:2]
@@ -58,13 +108,14 @@ def get_campaign_audiences(campaign_data, update_callback=None):
             update_callback(f"Error al obtener audiencias: {str(e)}")
         return "N/A"
 
-def get_audience_names(audience_ids, update_callback=None):
+def get_audience_names(audience_ids, update_callback=None, token=None):
     """
     Obtiene los nombres de las audiencias basándose en sus IDs.
     
     Args:
         audience_ids (list): Lista de IDs de audiencias.
         update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
     
     Returns:
         list: Lista de nombres de audiencias.
@@ -76,7 +127,7 @@ def get_audience_names(audience_ids, update_callback=None):
         try:
             # Primero intentar obtener como lista
             url = f"{KLAVIYO_URLS['LISTS']}{audience_id}/"
-            response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+            response = klaviyo_request("GET", url, token=token)
             
             if response.status_code == 200:
                 data = response.json()
@@ -85,12 +136,12 @@ def get_audience_names(audience_ids, update_callback=None):
                 continue
             elif response.status_code == 429:
                 # Manejar rate limiting
-                retry_after = int(response.headers.get('Retry-After', 10))
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
                 if update_callback:
                     update_callback(f"Rate limit alcanzado. Esperando {retry_after} segundos...")
-                time.sleep(retry_after)
+                esperar_reintento(url, retry_after, token)
                 # Reintentar la misma solicitud
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+                response = klaviyo_request("GET", url, token=token)
                 if response.status_code == 200:
                     data = response.json()
                     name = data['data']['attributes'].get('name', f"List-{audience_id[:8]}")
@@ -99,7 +150,7 @@ def get_audience_names(audience_ids, update_callback=None):
             
             # Si no es una lista, intentar como segmento
             url = f"{KLAVIYO_URLS['SEGMENTS']}{audience_id}/"
-            response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+            response = klaviyo_request("GET", url, token=token)
             
             if response.status_code == 200:
                 data = response.json()
@@ -107,12 +158,12 @@ def get_audience_names(audience_ids, update_callback=None):
                 names.append(name)
             elif response.status_code == 429:
                 # Manejar rate limiting para segmentos
-                retry_after = int(response.headers.get('Retry-After', 10))
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
                 if update_callback:
                     update_callback(f"Rate limit alcanzado. Esperando {retry_after} segundos...")
-                time.sleep(retry_after)
+                esperar_reintento(url, retry_after, token)
                 # Reintentar la misma solicitud
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+                response = klaviyo_request("GET", url, token=token)
                 if response.status_code == 200:
                     data = response.json()
                     name = data['data']['attributes'].get('name', f"Segment-{audience_id[:8]}")
@@ -122,13 +173,12 @@ def get_audience_names(audience_ids, update_callback=None):
             else:
                 names.append(f"ID-{audience_id[:8]}")
                 
+        except OperacionCancelada:
+            raise
         except Exception as e:
             if update_callback:
                 update_callback(f"Error al obtener nombre de audiencia {audience_id}: {str(e)}")
             names.append(f"ID-{audience_id[:8]}")
-            
-        # Pequeña pausa entre solicitudes para evitar rate limiting
-        time.sleep(0.1)
     
     # Si hay más de 3 audiencias, añadir indicador
     if len(audience_ids) > 3:
@@ -137,7 +187,7 @@ def get_audience_names(audience_ids, update_callback=None):
     return names
 
 # Modificación en get_campaign_details para usar cache de audiencias
-def get_campaign_details(campaign_id, cache, update_callback=None, audience_cache=None):
+def get_campaign_details(campaign_id, cache, update_callback=None, audience_cache=None, token=None):
     """
     Obtiene detalles de una campaña específica desde la API de Klaviyo.
 
@@ -145,18 +195,26 @@ def get_campaign_details(campaign_id, cache, update_callback=None, audience_cach
         campaign_id (str): ID de la campaña en Klaviyo.
         cache (dict): Diccionario para almacenar los detalles en caché.
         update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
         audience_cache (dict, optional): Cache de nombres de audiencias.
 
     Returns:
-        tuple: (campaign_name, send_time, subject_line, preview_text, template_id, audiences_info)
+        tuple: (campaign_name, send_time, subject_line, preview_text, template_id, audiences_info);
+            con valores por defecto si la campaña no se pudo obtener en API_MAX_RETRIES intentos.
     """
     if campaign_id in cache:
         return cache[campaign_id]
     
     url = f"{KLAVIYO_URLS['CAMPAIGN_DETAILS']}{campaign_id}/"
+    sin_detalles = (f"Campaign {campaign_id}", 'N/A', "No Subject Line", "No Preview Text", None, "N/A")
     
-    while True:
-        response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+    for attempt in range(API_MAX_RETRIES):
+        try:
+            response = klaviyo_request("GET", url, token=token)
+        except CircuitoAbierto as e:
+            if update_callback:
+                update_callback(f"Error al obtener la campaña {campaign_id}: {str(e)}")
+            return sin_detalles
         if response.status_code == 200:
             campaign_data = response.json()
             campaign_name = campaign_data['data']['attributes'].get('name', f"Campaign {campaign_id}")
@@ -166,13 +224,13 @@ def get_campaign_details(campaign_id, cache, update_callback=None, audience_cach
                 send_time = datetime.fromisoformat(send_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
 
             # Obtener el subject line, preview text y template_id desde los mensajes de la campaña
-            subject_line, preview_text, template_id = get_campaign_message_subject(campaign_data, update_callback)
+            subject_line, preview_text, template_id = get_campaign_message_subject(campaign_data, update_callback, token)
 
             # Obtener información de audiencias con nombres si hay cache disponible
             if audience_cache:
                 audiences_info = get_campaign_audiences_with_cache(campaign_data, audience_cache, update_callback)
             else:
-                audiences_info = get_campaign_audiences(campaign_data, update_callback)
+                audiences_info = get_campaign_audiences(campaign_data, update_callback, token)
 
             if update_callback:
                 update_callback(f"Obteniendo detalles de la campaña {campaign_name}")
@@ -182,14 +240,25 @@ def get_campaign_details(campaign_id, cache, update_callback=None, audience_cach
             return result
             
         elif response.status_code == 429:
-            retry_after = int(response.headers.get('Retry-After', 17))
+            if attempt == API_MAX_RETRIES - 1:
+                break
+            retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
             if update_callback:
                 update_callback(f"Solicitud limitada para ID {campaign_id}. Esperando {retry_after} segundos antes de reintentar")
-            time.sleep(retry_after)
+            try:
+                esperar_reintento(url, retry_after, token)
+            except CircuitoAbierto as e:
+                if update_callback:
+                    update_callback(f"Error al obtener la campaña {campaign_id}: {str(e)}")
+                return sin_detalles
         else:
             if update_callback:
                 update_callback(f"Error al obtener la campaña {campaign_id}: {response.status_code} - {response.text}")
-            return f"Campaign {campaign_id}", 'N/A', "No Subject Line", "No Preview Text", None, "N/A"
+            return sin_detalles
+
+    if update_callback:
+        update_callback(f"Error al obtener la campaña {campaign_id}: límite de solicitudes (429) tras {API_MAX_RETRIES} intentos")
+    return sin_detalles
 
 def get_campaign_audiences_with_cache(campaign_data, audience_cache, update_callback=None):
     """
@@ -251,13 +320,14 @@ def get_campaign_audiences_with_cache(campaign_data, audience_cache, update_call
         return "N/A"
 
 # También necesitas agregar esta función auxiliar para optimizar las llamadas
-def batch_get_audience_names(audience_ids_list, update_callback=None):
+def batch_get_audience_names(audience_ids_list, update_callback=None, token=None):
     """
     Obtiene nombres de audiencias en lotes para optimizar las llamadas a la API.
     
     Args:
         audience_ids_list (list): Lista de listas de IDs de audiencias.
         update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
     
     Returns:
         dict: Diccionario con audience_id como clave y nombre como valor.
@@ -280,7 +350,7 @@ def batch_get_audience_names(audience_ids_list, update_callback=None):
             
             # Primero intentar como lista
             url = f"{KLAVIYO_URLS['LISTS']}{audience_id}/"
-            response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+            response = klaviyo_request("GET", url, token=token)
             
             if response.status_code == 200:
                 data = response.json()
@@ -288,10 +358,10 @@ def batch_get_audience_names(audience_ids_list, update_callback=None):
                 audience_names_cache[audience_id] = name
                 continue
             elif response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 10))
-                time.sleep(retry_after)
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+                esperar_reintento(url, retry_after, token)
                 # Reintentar
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+                response = klaviyo_request("GET", url, token=token)
                 if response.status_code == 200:
                     data = response.json()
                     name = data['data']['attributes'].get('name', f"List-{audience_id[:8]}")
@@ -300,16 +370,16 @@ def batch_get_audience_names(audience_ids_list, update_callback=None):
             
             # Intentar como segmento
             url = f"{KLAVIYO_URLS['SEGMENTS']}{audience_id}/"
-            response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+            response = klaviyo_request("GET", url, token=token)
             
             if response.status_code == 200:
                 data = response.json()
                 name = data['data']['attributes'].get('name', f"Segment-{audience_id[:8]}")
                 audience_names_cache[audience_id] = name
             elif response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 10))
-                time.sleep(retry_after)
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+                esperar_reintento(url, retry_after, token)
+                response = klaviyo_request("GET", url, token=token)
                 if response.status_code == 200:
                     data = response.json()
                     name = data['data']['attributes'].get('name', f"Segment-{audience_id[:8]}")
@@ -319,28 +389,49 @@ def batch_get_audience_names(audience_ids_list, update_callback=None):
             else:
                 audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
                 
+        except OperacionCancelada:
+            raise
         except Exception as e:
             if update_callback:
                 update_callback(f"Error al obtener audiencia {audience_id}: {str(e)}")
             audience_names_cache[audience_id] = f"ID-{audience_id[:8]}"
-        
-        # Pausa pequeña entre solicitudes
-        time.sleep(0.1)
     
     return audience_names_cache
 
-def get_campaign_metrics(start_date, end_date, conversion_metric_id, update_callback=None):
+def dividir_rango_fechas(start_date, end_date, dias=REPORT_SHARD_DAYS, max_ventanas=REPORT_MAX_SHARDS):
     """
-    Obtiene métricas de campañas (open rate, click rate, delivered) desde la API de Klaviyo.
+    Divide un rango de fechas en ventanas consecutivas y sin solapamiento.
 
     Args:
         start_date (str): Fecha de inicio en formato "YYYY-MM-DD".
-        end_date (str): Fecha de fin en formato "YYYY-MM-DD".
-        conversion_metric_id (str): ID de la métrica de conversión en Klaviyo.
-        update_callback (callable, optional): Función para actualizar el estado en la UI.
+        end_date (str): Fecha de fin (inclusive) en formato "YYYY-MM-DD".
+        dias (int): Días por ventana.
+        max_ventanas (int): Máximo de ventanas; si el rango es más largo, las ventanas se ensanchan.
+
+    Returns:
+        list: Lista de tuplas (inicio, fin) en formato "YYYY-MM-DD", ambas inclusive.
+    """
+    inicio = datetime.strptime(start_date, "%Y-%m-%d")
+    fin = datetime.strptime(end_date, "%Y-%m-%d")
+    total_dias = (fin - inicio).days + 1
+    if total_dias <= 0:
+        return [(start_date, end_date)]
+    dias = max(1, dias, math.ceil(total_dias / max(1, max_ventanas)))
+
+    ventanas = []
+    actual = inicio
+    while actual <= fin:
+        fin_ventana = min(actual + timedelta(days=dias - 1), fin)
+        ventanas.append((actual.strftime("%Y-%m-%d"), fin_ventana.strftime("%Y-%m-%d")))
+        actual = fin_ventana + timedelta(days=1)
+    return ventanas
+
+def _obtener_reporte_ventana(start_date, end_date, conversion_metric_id, etiqueta, update_callback=None, token=None):
+    """
+    Descarga todas las páginas del reporte de campañas para una ventana de fechas.
 
     Returns:
-        list: Lista de resultados de métricas de campañas.
+        tuple: (metricas, paginas) con los registros MetricaCampana y el número de páginas descargadas.
     """
     fecha_inicio = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
     fecha_fin = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc, hour=23, minute=59, second=59).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -358,31 +449,127 @@ def get_campaign_metrics(start_date, end_date, conversion_metric_id, update_call
     all_data = []
     url = KLAVIYO_URLS["CAMPAIGN_VALUES_REPORT"]
     page_count = 0
+    attempt = 0
     while url:
-        response = requests.post(url, headers=HEADERS_KLAVIYO, json=data, timeout=30)
+        try:
+            response = klaviyo_request("POST", url, token=token, json=data, timeout=REPORT_TIMEOUT_SECONDS)
+        except OperacionCancelada:
+            # Conservar las páginas ya obtenidas
+            if update_callback:
+                update_callback(f"Carga cancelada tras {page_count} páginas del reporte ({etiqueta})")
+            break
+        except CircuitoAbierto as e:
+            if update_callback:
+                update_callback(f"Error en el reporte ({etiqueta}): {str(e)}")
+            break
+        except requests.exceptions.RequestException as e:
+            attempt += 1
+            if attempt >= API_MAX_RETRIES:
+                if update_callback:
+                    update_callback(f"Error en el reporte ({etiqueta}) tras {API_MAX_RETRIES} intentos: {str(e)}")
+                break
+            try:
+                esperar_reintento(url, backoff(attempt), token)
+            except OperacionCancelada:
+                break
+            except CircuitoAbierto as e:
+                if update_callback:
+                    update_callback(f"Error en el reporte ({etiqueta}): {str(e)}")
+                break
+            continue
         if response.status_code == 200:
-            data = response.json()
-            all_data.extend(data['data']['attributes']['results'])
+            attempt = 0
+            # Extraer solo los campos usados y descartar la página completa
+            pagina = decodificar_json(response)
+            all_data.extend(extraer_metricas(pagina))
             page_count += 1
             if update_callback:
-                update_callback(f"Página {page_count} obtenida")
-            url = data.get('links', {}).get('next')
+                update_callback(f"ACTUALIZAR:Reporte {etiqueta}: página {page_count} obtenida")
+            url = pagina.get('links', {}).get('next')
+            pagina = None
             data = None  # No enviar parámetros adicionales en las siguientes solicitudes
+        elif response.status_code == 429:
+            attempt += 1
+            if attempt >= API_MAX_RETRIES:
+                if update_callback:
+                    update_callback(f"Error en el reporte ({etiqueta}): límite de solicitudes (429) tras {API_MAX_RETRIES} intentos")
+                break
+            retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+            if update_callback:
+                update_callback(f"ACTUALIZAR:Reporte {etiqueta}: rate limit - esperando {retry_after}s")
+            try:
+                esperar_reintento(url, retry_after, token)
+            except OperacionCancelada:
+                break
+            except CircuitoAbierto as e:
+                if update_callback:
+                    update_callback(f"Error en el reporte ({etiqueta}): {str(e)}")
+                break
         else:
             if update_callback:
-                update_callback(f"Error: {response.status_code} - {response.text}")
+                update_callback(f"Error en el reporte ({etiqueta}): {response.status_code} - {response.text}")
             break
+    return all_data, page_count
+
+def get_campaign_metrics(start_date, end_date, conversion_metric_id, update_callback=None, token=None):
+    """
+    Obtiene métricas de campañas (open rate, click rate, delivered) desde la API de Klaviyo.
+
+    Los rangos largos se dividen en ventanas de fechas que se descargan en paralelo
+    (REPORT_SHARD_DAYS, REPORT_MAX_WORKERS); los resultados se combinan por campaña.
+
+    Args:
+        start_date (str): Fecha de inicio en formato "YYYY-MM-DD".
+        end_date (str): Fecha de fin en formato "YYYY-MM-DD".
+        conversion_metric_id (str): ID de la métrica de conversión en Klaviyo.
+        update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se devuelven las páginas ya obtenidas.
+
+    Returns:
+        list: Registros MetricaCampana (campaign_id, message_id, open_rate, click_rate, delivered).
+    """
+    ventanas = dividir_rango_fechas(start_date, end_date)
+    if update_callback and len(ventanas) > 1:
+        update_callback(f"Descargando el reporte en {len(ventanas)} ventanas de fechas...")
+
+    cuenta = cuenta_actual()
+
+    def descargar(ventana):
+        etiqueta = f"{ventana[0]} a {ventana[1]}" if len(ventanas) > 1 else start_date
+        # Los hilos del pool no heredan la cuenta activa: se activa en cada uno
+        with usar_cuenta(cuenta):
+            return _obtener_reporte_ventana(ventana[0], ventana[1], conversion_metric_id, etiqueta, update_callback, token)
+
+    if len(ventanas) == 1:
+        resultados_ventanas = [descargar(ventanas[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(REPORT_MAX_WORKERS, len(ventanas))) as executor:
+            resultados_ventanas = list(executor.map(descargar, ventanas))
+
+    # Combinar por campaña (y mensaje); si una campaña aparece en varias ventanas, se conserva
+    # la fila con más entregas
+    combinados = {}
+    page_count = 0
+    for metricas, paginas in resultados_ventanas:
+        page_count += paginas
+        for metrica in metricas:
+            clave = (metrica.campaign_id, metrica.message_id)
+            previo = combinados.get(clave)
+            if previo is None or metrica.delivered > previo.delivered:
+                combinados[clave] = metrica
+
     if update_callback:
         update_callback(f"Total de páginas obtenidas: {page_count}")
-    return all_data
+    return list(combinados.values())
 
-def get_campaign_message_subject(campaign_data, update_callback=None):
+def get_campaign_message_subject(campaign_data, update_callback=None, token=None):
     """
     Obtiene el subject line, preview text y template ID de una campaña desde los datos de la API.
 
     Args:
         campaign_data (dict): Datos de la campaña obtenidos de la API.
         update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
 
     Returns:
         tuple: (subject_line, preview_text, template_id)
@@ -392,48 +579,69 @@ def get_campaign_message_subject(campaign_data, update_callback=None):
     """
     if 'relationships' in campaign_data['data'] and 'campaign-messages' in campaign_data['data']['relationships']:
         message_id = campaign_data['data']['relationships']['campaign-messages']['data'][0]['id']
-        url = f"{KLAVIYO_URLS['CAMPAIGN_MESSAGES']}{message_id}/"
-        
-        max_retries = 5
-        delay = 1
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=30)
-                if response.status_code == 200:
-                    message_data = response.json()
-                    subject = message_data['data']['attributes']['definition']['content'].get('subject', "No Subject Line")
-                    preview = message_data['data']['attributes']['definition']['content'].get('preview_text', "No Preview Text")
-                    # Obtener el template_id
-                    try:
-                        template_id = message_data['data']['relationships']['template']['data']['id']
-                    except (KeyError, TypeError):
-                        template_id = None  # Si no hay template asociado
-                    if update_callback:
-                        update_callback(f"Obteniendo subject, preview y template para mensaje {message_id}")
-                    return subject, preview, template_id
-                elif response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', 17))
-                    if update_callback:
-                        update_callback(f"Solicitud limitada para mensaje {message_id}. Esperando {retry_after} segundos antes de reintentar")
-                    time.sleep(retry_after)
-                else:
-                    if update_callback:
-                        update_callback(f"Error al obtener el mensaje {message_id}: {response.status_code} - {response.text}")
-                    return "No Subject Line", "No Preview Text", None
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(delay)
-                    delay *= 2  # Backoff exponencial
-                    continue
-                if update_callback:
-                    update_callback(f"Error inesperado al obtener el mensaje {message_id} tras {max_retries} intentos: {str(e)}")
-                return "No Subject Line", "No Preview Text", None
+        return get_message_details(message_id, update_callback, token)
     
     if update_callback:
         update_callback(f"Error: No se encontraron mensajes para la campaña")
     return "No Subject Line", "No Preview Text", None
 
-def preload_campaign_details(campaign_ids, cache, update_callback=None):
+def get_message_details(message_id, update_callback=None, token=None):
+    """
+    Obtiene el subject line, preview text y template ID de un mensaje de campaña.
+
+    Args:
+        message_id (str): ID del mensaje de la campaña.
+        update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
+
+    Returns:
+        tuple: (subject_line, preview_text, template_id), con valores por defecto si falla.
+    """
+    url = f"{KLAVIYO_URLS['CAMPAIGN_MESSAGES']}{message_id}/"
+    
+    for attempt in range(API_MAX_RETRIES):
+        try:
+            response = klaviyo_request("GET", url, token=token)
+            if response.status_code == 200:
+                message_data = decodificar_json(response)
+                subject = message_data['data']['attributes']['definition']['content'].get('subject', "No Subject Line")
+                preview = message_data['data']['attributes']['definition']['content'].get('preview_text', "No Preview Text")
+                # Obtener el template_id
+                try:
+                    template_id = message_data['data']['relationships']['template']['data']['id']
+                except (KeyError, TypeError):
+                    template_id = None  # Si no hay template asociado
+                if update_callback:
+                    update_callback(f"Obteniendo subject, preview y template para mensaje {message_id}")
+                return subject, preview, template_id
+            elif response.status_code == 429:
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+                if update_callback:
+                    update_callback(f"Solicitud limitada para mensaje {message_id}. Esperando {retry_after} segundos antes de reintentar")
+                esperar_reintento(url, retry_after, token)
+            else:
+                if update_callback:
+                    update_callback(f"Error al obtener el mensaje {message_id}: {response.status_code} - {response.text}")
+                return "No Subject Line", "No Preview Text", None
+        except OperacionCancelada:
+            raise
+        except CircuitoAbierto as e:
+            if update_callback:
+                update_callback(f"Error al obtener el mensaje {message_id}: {str(e)}")
+            return "No Subject Line", "No Preview Text", None
+        except Exception as e:
+            if attempt < API_MAX_RETRIES - 1:
+                try:
+                    esperar_reintento(url, backoff(attempt), token)  # Backoff exponencial con jitter
+                except CircuitoAbierto:
+                    return "No Subject Line", "No Preview Text", None
+                continue
+            if update_callback:
+                update_callback(f"Error inesperado al obtener el mensaje {message_id} tras {API_MAX_RETRIES} intentos: {str(e)}")
+            return "No Subject Line", "No Preview Text", None
+    return "No Subject Line", "No Preview Text", None
+
+def preload_campaign_details(campaign_ids, cache, update_callback=None, token=None):
     """
     Precarga los detalles de múltiples campañas en un caché.
 
@@ -441,6 +649,7 @@ def preload_campaign_details(campaign_ids, cache, update_callback=None):
         campaign_ids (list): Lista de IDs de campañas.
         cache (dict): Diccionario para almacenar los detalles en caché.
         update_callback (callable, optional): Función para actualizar el estado en la UI.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
     """
     count = 0
     total_campaigns = len(campaign_ids)
@@ -451,11 +660,30 @@ def preload_campaign_details(campaign_ids, cache, update_callback=None):
             count += 1
             if update_callback:
                 update_callback(f"Precargando detalles de las campañas ({count}/{total_campaigns})")
-            get_campaign_details(campaign_id, cache, update_callback)
+            get_campaign_details(campaign_id, cache, update_callback, token=token)
     if update_callback:
         update_callback("Precarga de detalles de campañas completada")
 
-def query_metric_aggregates_post(campaign_id, start_date_val, end_date_val):
+def elegir_intervalo(diario=False, unicos=True):
+    """
+    Elige el intervalo de las consultas de metric-aggregates.
+
+    Los valores "unique" de cada bucket se suman, así que su significado depende del intervalo:
+    las consultas que miden únicos usan siempre "day", para que "Clics Únicos" y "Unique Orders"
+    sean sumas de únicos diarios con o sin serie diaria. Solo una consulta de conteos sin únicos
+    ni serie diaria usa el intervalo más grueso ("month"), con los mismos totales y muchos menos
+    buckets.
+
+    Args:
+        diario (bool): True si se necesitan los buckets diarios.
+        unicos (bool): True si la consulta mide "unique".
+
+    Returns:
+        str: "day" o "month".
+    """
+    return "day" if diario or unicos else "month"
+
+def query_metric_aggregates_post(campaign_id, start_date_val, end_date_val, token=None, metric_id=None, interval=None):
     """
     Consulta la API de Klaviyo para obtener métricas agregadas (clics totales y únicos por URL)
     para una campaña específica en un rango de fechas.
@@ -463,7 +691,13 @@ def query_metric_aggregates_post(campaign_id, start_date_val, end_date_val):
     Args:
         campaign_id (str): ID de la campaña en Klaviyo.
         start_date_val (str): Fecha de inicio en formato "YYYY-MM-DD" o "YYYY-MM-DD HH:MM:SS".
-        end_date_val (str): Fecha de fin en formato "YYYY-MM-DD" o "YYYY-MM-DD HH:MM:SS".
+        end_date_val (str): Último día incluido, en formato "YYYY-MM-DD" o "YYYY-MM-DD HH:MM:SS";
+            None para consultar hasta el momento actual.
+        token (TokenCancelacion, optional): Token de cancelación; al cancelarse se lanza OperacionCancelada.
+        metric_id (str, optional): ID de la métrica de clics; por defecto se resuelve "Clicked Email"
+            desde el catálogo de métricas.
+        interval (str, optional): Intervalo de los buckets; por defecto el de elegir_intervalo()
+            ("day", porque se miden únicos).
 
     Returns:
         tuple: (aggregated_data, error)
@@ -472,6 +706,11 @@ def query_metric_aggregates_post(campaign_id, start_date_val, end_date_val):
     """
     url = KLAVIYO_URLS["METRIC_AGGREGATES"]
 
+    if metric_id is None:
+        metric_id, error = cuenta_actual().catalogo.resolver("clics", token=token)
+        if error:
+            return None, error
+
     # Simplificar start_date_val a solo la fecha (YYYY-MM-DD) si incluye hora
     try:
         dt_start = datetime.strptime(start_date_val, "%Y-%m-%d %H:%M:%S")
@@ -480,15 +719,18 @@ def query_metric_aggregates_post(campaign_id, start_date_val, end_date_val):
         # Si ya está en formato YYYY-MM-DD, no hacer nada
         pass
 
-    # Usar la fecha y hora actual en UTC como fecha final
-    dt_end = datetime.now(timezone.utc)  # Usar la fecha y hora actual en UTC
+    # La consulta termina al final del día end_date_val; sin fecha de fin, al final del día actual en UTC
+    if end_date_val:
+        dt_end = datetime.strptime(end_date_val[:10], "%Y-%m-%d")
+    else:
+        dt_end = datetime.now(timezone.utc)
     next_day = (dt_end + timedelta(days=1)).strftime("%Y-%m-%d")
 
     payload = {
         "data": {
             "type": "metric-aggregate",
             "attributes": {
-                "interval": "day",
+                "interval": interval or elegir_intervalo(),
                 "page_size": 500,
                 "timezone": "UTC",
                 "measurements": ["count", "unique"],
@@ -498,19 +740,17 @@ def query_metric_aggregates_post(campaign_id, start_date_val, end_date_val):
                     f"less-than(datetime,{next_day}T00:00:00Z)",
                     f"equals($message,'{campaign_id}')"
                 ],
-                "metric_id": "SCJBvM"
+                "metric_id": metric_id
             }
         }
     }
 
-    max_retries = 5
-    delay = 1
-    for attempt in range(max_retries):
+    for attempt in range(API_MAX_RETRIES):
         try:
-            response = requests.post(url, headers=HEADERS_KLAVIYO, data=json.dumps(payload), timeout=30)
+            response = klaviyo_request("POST", url, token=token, data=json.dumps(payload))
             if response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 17))
-                time.sleep(retry_after)
+                retry_after = cuenta_actual().limitador.espera_tras_429(url, response)
+                esperar_reintento(url, retry_after, token)
                 continue
             elif response.status_code == 400:
                 error_detail = response.json().get('errors', [{'id': 'unknown_error'}])
@@ -519,13 +759,19 @@ def query_metric_aggregates_post(campaign_id, start_date_val, end_date_val):
             elif response.status_code != 200:
                 return None, f"Error en aggregates (POST): {response.status_code} - {response.text}"
             else:
-                aggregated_data = response.json()
+                aggregated_data = decodificar_json(response)
                 return aggregated_data, None
+        except OperacionCancelada:
+            raise
+        except CircuitoAbierto as e:
+            return None, str(e)
         except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(delay)
-                delay *= 2  # Backoff exponencial
+            if attempt < API_MAX_RETRIES - 1:
+                try:
+                    esperar_reintento(url, backoff(attempt), token)  # Backoff exponencial con jitter
+                except CircuitoAbierto as abierto:
+                    return None, str(abierto)
                 continue
-            return None, f"Error inesperado en aggregates (POST) tras {max_retries} intentos: {str(e)}"
+            return None, f"Error inesperado en aggregates (POST) tras {API_MAX_RETRIES} intentos: {str(e)}"
 
     return None, "Se alcanzó el número máximo de reintentos debido a límites de tasa (429)."
\ No newline at end of file
@@ -0,0 +1,88 @@
+# load_log.py
+import os
+import tkinter as tk
+from collections import deque
+from datetime import datetime
+
+from config import LOAD_LOG_MAX_LINES, LOAD_LOG_FILE
+
+
+class RegistroCarga:
+    """
+    Registro de mensajes de la ventana de carga con un número fijo de líneas visibles.
+
+    Las líneas se guardan en un buffer circular (deque con maxlen): al llenarse se borra la
+    primera línea del widget, así que cada mensaje cuesta lo mismo sin importar cuántos
+    haya habido. Los mensajes "ACTUALIZAR:" reemplazan la línea de progreso en curso (la
+    "línea viva"), ubicada con una marca de Tk, sin releer el contenido del widget.
+
+    El historial completo se escribe en un archivo: cada mensaje normal y el último valor
+    de cada línea de progreso.
+    """
+
+    def __init__(self, widget, max_lineas=LOAD_LOG_MAX_LINES, archivo=LOAD_LOG_FILE):
+        self.widget = widget
+        self.lineas = deque(maxlen=max_lineas)
+        self.linea_viva = False  # True si la última línea es un progreso que ACTUALIZAR reemplaza
+        self.archivo = None
+        if archivo:
+            try:
+                os.makedirs(os.path.dirname(archivo) or ".", exist_ok=True)
+                self.archivo = open(archivo, "a", encoding="utf-8")
+                self.archivo.write(f"\n=== Carga iniciada el {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+            except OSError as e:
+                print(f"No se pudo abrir el registro de carga {archivo}: {e}")
+
+    def agregar(self, mensaje):
+        """Agrega un mensaje con hora; si empieza con "ACTUALIZAR:" reemplaza la línea de progreso."""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        if mensaje.startswith("ACTUALIZAR:"):
+            linea = f"[{timestamp}] {mensaje[len('ACTUALIZAR:'):]}"
+            if self.linea_viva:
+                self._reemplazar_linea_viva(linea)
+            else:
+                self._anexar(linea)
+                self.widget.mark_set("linea_viva", "end-2l linestart")
+                self.widget.mark_gravity("linea_viva", tk.LEFT)
+            # Un mensaje de completado cierra la línea de progreso
+            self.linea_viva = "✅ Completado:" not in linea
+            if not self.linea_viva:
+                self._escribir(linea)
+        else:
+            self._cerrar_linea_viva()
+            linea = f"[{timestamp}] {mensaje}"
+            self._anexar(linea)
+            self._escribir(linea)
+        self.widget.see(tk.END)
+
+    def cerrar(self):
+        """Escribe la línea de progreso pendiente y cierra el archivo del historial."""
+        self._cerrar_linea_viva()
+        if self.archivo:
+            self.archivo.close()
+            self.archivo = None
+
+    def _anexar(self, linea):
+        if len(self.lineas) == self.lineas.maxlen:
+            self.widget.delete("1.0", "2.0")
+        self.lineas.append(linea)
+        self.widget.insert(tk.END, linea + "\n")
+
+    def _reemplazar_linea_viva(self, linea):
+        self.lineas[-1] = linea
+        self.widget.delete("linea_viva", "linea_viva lineend +1c")
+        self.widget.insert("linea_viva", linea + "\n")
+
+    def _cerrar_linea_viva(self):
+        if self.linea_viva:
+            self.linea_viva = False
+            self._escribir(self.lineas[-1])
+
+    def _escribir(self, linea):
+        if not self.archivo:
+            return
+        try:
+            self.archivo.write(linea + "\n")
+        except OSError as e:
+            print(f"No se pudo escribir en el registro de carga: {e}")
+            self.archivo = None
@@ -0,0 +1,166 @@
+# metric_catalog.py
+import json
+import os
+import threading
+import time
+
+from config import KLAVIYO_URLS, METRIC_CATALOG_FILE, METRIC_CATALOG_TTL_HOURS, METRIC_NAMES, METRIC_FALLBACK_IDS
+from cancellation import OperacionCancelada
+from ingest import decodificar_json
+from circuit_breaker import esperar_reintento
+
+
+class CatalogoMetricas:
+    """
+    Catálogo de las métricas de la cuenta de Klaviyo (id, nombre, integración).
+
+    Se descarga paginando /api/metrics una sola vez y se guarda en disco; mientras el
+    archivo no supere el TTL, las cargas resuelven las métricas sin consultar la API.
+    Las métricas se resuelven por nombre e integración (METRIC_NAMES), no por posición.
+    """
+
+    def __init__(self, ruta=METRIC_CATALOG_FILE, ttl_horas=METRIC_CATALOG_TTL_HOURS):
+        self.ruta = ruta
+        self.ttl_segundos = ttl_horas * 3600
+        self._lock = threading.Lock()
+        self._metricas = None
+        self._resueltas = {}
+
+    def _leer_cache(self, ignorar_ttl=False):
+        """Devuelve las métricas guardadas en disco, o None si no hay archivo o expiró."""
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                contenido = json.load(f)
+            if not ignorar_ttl and time.time() - contenido.get("actualizado", 0) > self.ttl_segundos:
+                return None
+            return contenido["metricas"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _guardar_cache(self, metricas):
+        try:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            with open(self.ruta, "w", encoding="utf-8") as f:
+                json.dump({"actualizado": time.time(), "metricas": metricas}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"No se pudo guardar el catálogo de métricas en {self.ruta}: {e}")
+
+    def _descargar(self, token=None):
+        """
+        Descarga todas las páginas de /api/metrics.
+
+        Returns:
+            tuple: (metricas, error), con metricas como lista de {"id", "name", "integration"}.
+        """
+        # Importación diferida: klaviyo_api y accounts dependen de este módulo
+        from klaviyo_api import klaviyo_request
+        from accounts import cuenta_actual
+
+        metricas = []
+        url = f"{KLAVIYO_URLS['METRICS']}/"
+        while url:
+            response = klaviyo_request("GET", url, token=token)
+            if response.status_code == 429:
+                esperar_reintento(url, cuenta_actual().limitador.espera_tras_429(url, response), token)
+                continue
+            if response.status_code != 200:
+                return None, f"Error al obtener el catálogo de métricas: {response.status_code} - {response.text}"
+            pagina = decodificar_json(response)
+            for metrica in pagina.get("data", []):
+                attributes = metrica.get("attributes", {})
+                metricas.append({
+                    "id": metrica["id"],
+                    "name": attributes.get("name", ""),
+                    "integration": (attributes.get("integration") or {}).get("name", ""),
+                })
+            url = pagina.get("links", {}).get("next")
+        return metricas, None
+
+    def metricas(self, token=None, forzar=False):
+        """
+        Devuelve el catálogo: de memoria, del archivo si no expiró, o descargándolo.
+        Si la descarga falla y hay un archivo expirado, se usa ese.
+
+        Returns:
+            tuple: (metricas, error)
+        """
+        with self._lock:
+            if self._metricas is not None and not forzar:
+                return self._metricas, None
+            if not forzar:
+                guardadas = self._leer_cache()
+                if guardadas is not None:
+                    self._metricas = guardadas
+                    return self._metricas, None
+            try:
+                metricas, error = self._descargar(token)
+            except OperacionCancelada:
+                raise
+            except Exception as e:
+                metricas, error = None, f"Error al obtener el catálogo de métricas: {str(e)}"
+            if metricas is None:
+                guardadas = self._leer_cache(ignorar_ttl=True)
+                if guardadas is not None:
+                    self._metricas = guardadas
+                    return self._metricas, None
+                return None, error
+            self._metricas = metricas
+            self._resueltas.clear()
+            self._guardar_cache(metricas)
+            return self._metricas, None
+
+    @staticmethod
+    def buscar(metricas, nombre, integracion=None):
+        """Busca el ID de una métrica por nombre (sin distinguir mayúsculas) e integración opcional."""
+        nombre = nombre.lower()
+        candidatas = [m for m in metricas if m["name"].lower() == nombre]
+        if integracion:
+            candidatas = [m for m in candidatas if m["integration"].lower() == integracion.lower()]
+        return candidatas[0]["id"] if candidatas else None
+
+    def resolver(self, clave, update_callback=None, token=None):
+        """
+        Resuelve el ID de una métrica lógica ("clics", "ordenes") según METRIC_NAMES.
+
+        Si no aparece en el catálogo guardado se vuelve a descargar una vez; si sigue sin
+        aparecer se usa METRIC_FALLBACK_IDS avisando por update_callback.
+
+        Args:
+            clave (str): Clave de METRIC_NAMES.
+            update_callback (callable, optional): Función para actualizar el estado en la UI.
+            token (TokenCancelacion, optional): Token de cancelación.
+
+        Returns:
+            tuple: (metric_id, error)
+        """
+        if clave in self._resueltas:
+            return self._resueltas[clave], None
+
+        candidatos = METRIC_NAMES.get(clave, [])
+        metric_id, error = None, None
+        for forzar in (False, True):
+            metricas, error = self.metricas(token, forzar=forzar)
+            if metricas is None:
+                break
+            for nombre, integracion in candidatos:
+                metric_id = self.buscar(metricas, nombre, integracion)
+                if metric_id:
+                    break
+            if metric_id:
+                break
+
+        if not metric_id:
+            nombres = " / ".join(nombre for nombre, _ in candidatos) or clave
+            fallback = METRIC_FALLBACK_IDS.get(clave)
+            if not fallback:
+                return None, error or f"No se encontró la métrica '{nombres}' en la cuenta de Klaviyo."
+            if update_callback:
+                update_callback(f"⚠️ No se encontró la métrica '{nombres}'; usando el ID configurado {fallback}")
+            metric_id = fallback
+
+        self._resueltas[clave] = metric_id
+        return metric_id, None
+
+
+# Instancia compartida por toda la aplicación
+catalogo_metricas = CatalogoMetricas()
@@ -0,0 +1,112 @@
+# period_comparison.py
+"""
+Comparación de dos periodos de campañas (e.g. esta semana contra la anterior, o un mes
+contra el mismo mes del año anterior), alineados por grupo de país y/o prefijo.
+
+Ambas tablas de campañas se recorren una sola vez: cada campaña suma sus métricas en
+columnas (array) indexadas por grupo, y los deltas se calculan después columna a columna.
+"""
+from array import array
+from datetime import datetime, timedelta
+
+from history_store import pais_de, prefijo_de
+
+# Cómo se alinean las campañas de ambos periodos
+DIMENSIONES = {
+    "País": lambda name: pais_de(name).upper(),
+    "Prefijo": prefijo_de,
+    "País y prefijo": lambda name: f"{pais_de(name).upper()} · {prefijo_de(name)}",
+}
+
+COLUMNAS = ("Grupo", "Campañas A", "Campañas B",
+            "Open Rate A", "Open Rate B", "Δ Open Rate (pp)",
+            "Click Rate A", "Click Rate B", "Δ Click Rate (pp)",
+            "Total Value A", "Total Value B", "Δ Total Value (%)",
+            "Per Recipient A", "Per Recipient B", "Δ Per Recipient (%)")
+
+TOTAL = "Total"
+
+
+def periodo_anterior(desde, hasta):
+    """Rango de la misma duración que termina el día antes de desde."""
+    inicio = datetime.strptime(desde, "%Y-%m-%d")
+    fin = datetime.strptime(hasta, "%Y-%m-%d")
+    nuevo_fin = inicio - timedelta(days=1)
+    return (nuevo_fin - (fin - inicio)).strftime("%Y-%m-%d"), nuevo_fin.strftime("%Y-%m-%d")
+
+
+def semana_anterior(desde, hasta):
+    """El mismo rango desplazado 7 días hacia atrás."""
+    return tuple((datetime.strptime(fecha, "%Y-%m-%d") - timedelta(days=7)).strftime("%Y-%m-%d") for fecha in (desde, hasta))
+
+
+def ano_anterior(desde, hasta):
+    """El mismo rango un año antes (el 29 de febrero pasa al 28)."""
+    def mover(fecha):
+        fecha = datetime.strptime(fecha, "%Y-%m-%d")
+        try:
+            return fecha.replace(year=fecha.year - 1).strftime("%Y-%m-%d")
+        except ValueError:
+            return fecha.replace(year=fecha.year - 1, day=28).strftime("%Y-%m-%d")
+    return mover(desde), mover(hasta)
+
+
+def _delta_porcentual(actual, anterior):
+    return (actual - anterior) / anterior * 100 if anterior else None
+
+
+def comparar_periodos(campanas_a, campanas_b, dimension="País"):
+    """
+    Alinea dos tablas de campañas por grupo y calcula las diferencias entre periodos.
+
+    Las tasas y el per recipient se ponderan por recibidos, como en los subtotales de la tabla.
+
+    Args:
+        campanas_a (list): Campañas del periodo A (el que se evalúa).
+        campanas_b (list): Campañas del periodo B (la referencia).
+        dimension (str): Clave de DIMENSIONES.
+
+    Returns:
+        list: Filas en el orden de COLUMNAS, una por grupo (ordenadas) más la fila TOTAL al final.
+            Los deltas de tasas están en puntos porcentuales y los de valores en porcentaje
+            (None si el periodo B no tiene valor con qué comparar).
+    """
+    clave_de = DIMENSIONES[dimension]
+    grupos = {}
+    # Columnas por periodo: campañas, recibidos, aperturas y clics ponderados, valor, per recipient ponderado
+    columnas = [[array("d") for _ in range(6)] for _ in range(2)]
+
+    for periodo, campanas in enumerate((campanas_a, campanas_b)):
+        n, recibidos, aperturas, clics, valor, per_recipient = columnas[periodo]
+        for camp in campanas:
+            name, open_rate, click_rate, delivered = camp[2], camp[4], camp[5], camp[6]
+            clave = clave_de(name)
+            g = grupos.get(clave)
+            if g is None:
+                g = grupos[clave] = len(grupos)
+                for columna in columnas[0] + columnas[1]:
+                    columna.append(0.0)
+            n[g] += 1
+            recibidos[g] += delivered
+            aperturas[g] += open_rate * delivered
+            clics[g] += click_rate * delivered
+            valor[g] += camp[13]
+            per_recipient[g] += camp[16] * delivered
+
+    def fila(grupo, a, b):
+        # a y b: (campañas, recibidos, aperturas, clics, valor, per recipient) ya sumados
+        def tasa(total, peso):
+            return total / peso if peso else 0.0
+        open_a, open_b = tasa(a[2], a[1]), tasa(b[2], b[1])
+        click_a, click_b = tasa(a[3], a[1]), tasa(b[3], b[1])
+        pr_a, pr_b = tasa(a[5], a[1]), tasa(b[5], b[1])
+        return (grupo, int(a[0]), int(b[0]),
+                open_a, open_b, open_a - open_b if b[1] else None,
+                click_a, click_b, click_a - click_b if b[1] else None,
+                a[4], b[4], _delta_porcentual(a[4], b[4]),
+                pr_a, pr_b, _delta_porcentual(pr_a, pr_b))
+
+    filas = [fila(clave, [c[g] for c in columnas[0]], [c[g] for c in columnas[1]])
+             for clave, g in sorted(grupos.items())]
+    filas.append(fila(TOTAL, [sum(c) for c in columnas[0]], [sum(c) for c in columnas[1]]))
+    return filas
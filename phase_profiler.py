@@ -0,0 +1,101 @@
+# phase_profiler.py
+"""
+Perfilado opcional (cProfile) de las fases lentas de la aplicación.
+
+Se activa con KLAVIYO_PROFILE_DIR o lanzando la aplicación con `python phase_profiler.py`.
+Desactivado, @perfilar devuelve la función original: no se agrega ninguna llamada.
+Activado, cada llamada de una fase escribe en el directorio un .prof (para pstats o
+snakeviz) y un .txt con las funciones de mayor tiempo acumulado.
+"""
+import argparse
+import cProfile
+import functools
+import io
+import itertools
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+
+from config import PROFILE_DIR
+
+_directorio = PROFILE_DIR or None
+# cProfile no admite dos perfiles activos a la vez (en Python 3.12+ ni en hilos distintos):
+# mientras se perfila una fase, las demás se ejecutan sin perfilar
+_perfilando = threading.Lock()
+_contador = itertools.count(1)
+
+# Funciones que se listan en el resumen .txt de cada perfil
+FUNCIONES_RESUMEN = 40
+
+
+def activar(directorio):
+    """Activa el perfilado; debe llamarse antes de importar los módulos con @perfilar."""
+    global _directorio
+    _directorio = directorio
+
+
+def _guardar(perfil, fase, duracion):
+    nombre = f"{fase}_{time.strftime('%Y%m%d_%H%M%S')}_{next(_contador)}"
+    ruta = os.path.join(_directorio, nombre)
+    try:
+        os.makedirs(_directorio, exist_ok=True)
+        perfil.dump_stats(ruta + ".prof")
+        resumen = io.StringIO()
+        pstats.Stats(perfil, stream=resumen).sort_stats("cumulative").print_stats(FUNCIONES_RESUMEN)
+        with open(ruta + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"{fase}: {duracion:.3f} s\n")
+            f.write(resumen.getvalue())
+    except OSError as e:
+        print(f"No se pudo guardar el perfil de {fase} en {_directorio}: {e}")
+
+
+def perfilar(fase):
+    """
+    Decorador que perfila cada llamada de la función como la fase indicada.
+
+    Solo se perfila el hilo que hace la llamada; el trabajo que la función reparte en otros
+    hilos (e.g. la carga en paralelo de varias cuentas) aparece como espera.
+
+    Args:
+        fase (str): Nombre de la fase; prefijo de los archivos del perfil.
+    """
+    def decorador(funcion):
+        if not _directorio:
+            return funcion
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _perfilando.acquire(blocking=False):
+                # Fase anidada u otra fase en curso: se incluye en el perfil activo o se omite
+                return funcion(*args, **kwargs)
+            perfil = cProfile.Profile()
+            inicio = time.perf_counter()
+            try:
+                return perfil.runcall(funcion, *args, **kwargs)
+            finally:
+                duracion = time.perf_counter() - inicio
+                _perfilando.release()
+                _guardar(perfil, fase, duracion)
+        return envoltura
+    return decorador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta Klaviyo Analyzer perfilando las fases lentas")
+    parser.add_argument("--dir", default=PROFILE_DIR or "perfiles", help="Directorio de los perfiles")
+    args = parser.parse_args()
+
+    activar(args.dir)
+    print(f"Perfiles en {os.path.abspath(args.dir)}")
+    sys.argv = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "gui.py")]
+    runpy.run_path(sys.argv[0], run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    # Activar el módulo importable (no este __main__), que es el que usan los decoradores
+    import phase_profiler
+    sys.exit(phase_profiler.main())
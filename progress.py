@@ -0,0 +1,55 @@
+# progress.py
+import threading
+import time
+
+from instrumentation import instrumentacion
+
+
+def formatear_duracion(segundos):
+    """Formatea una duración en segundos como m:ss (o h:mm:ss)."""
+    segundos = int(round(segundos))
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f"{horas}:{minutos:02d}:{segundos:02d}" if horas else f"{minutos}:{segundos:02d}"
+
+
+class ProgresoAnalisis:
+    """
+    Progreso de un análisis, compartido entre el hilo de trabajo y la interfaz.
+
+    El hilo de trabajo solo actualiza contadores (sin tocar Tk); la interfaz lee una
+    instantánea a una frecuencia fija, así que el costo en la UI no depende de cuántas
+    campañas se analicen ni de lo rápido que avancen.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.procesadas = 0
+        self.actual = ""
+        self.inicio = time.monotonic()
+        self._solicitudes_inicio = instrumentacion.total_solicitudes()
+        self._lock = threading.Lock()
+
+    def avanzar(self, nombre):
+        """Indica la campaña que se empieza a procesar."""
+        with self._lock:
+            self.actual = nombre
+
+    def completar(self):
+        """Cuenta una campaña procesada (consultada o recuperada del checkpoint)."""
+        with self._lock:
+            self.procesadas += 1
+
+    def transcurrido(self):
+        return time.monotonic() - self.inicio
+
+    def texto(self):
+        """Texto de estado: campaña actual, campañas/s, solicitudes/s y tiempo restante estimado."""
+        with self._lock:
+            procesadas, actual = self.procesadas, self.actual
+        transcurrido = max(self.transcurrido(), 1e-6)
+        solicitudes = max(0, instrumentacion.total_solicitudes() - self._solicitudes_inicio)
+        por_segundo = procesadas / transcurrido
+        eta = formatear_duracion((self.total - procesadas) / por_segundo) if por_segundo > 0 else "--:--"
+        return (f"Procesando {procesadas}/{self.total}: {actual} · {por_segundo:.1f} camp/s · "
+                f"{solicitudes / transcurrido:.1f} req/s · ETA {eta}")
@@ -0,0 +1,139 @@
+# rate_limit.py
+import threading
+import time
+
+from cancellation import dormir
+from instrumentation import instrumentacion, nombre_endpoint
+
+
+def _primer_entero(valor):
+    """Extrae el primer número de un encabezado como "10, 10;w=1, 150;w=60"; None si no hay."""
+    if not valor:
+        return None
+    primero = valor.split(",")[0].split(";")[0].strip()
+    try:
+        return int(float(primero))
+    except ValueError:
+        return None
+
+
+class _Cubeta:
+    """Estado del rate limit de un endpoint, según los últimos encabezados recibidos."""
+
+    def __init__(self):
+        self.limite = None  # RateLimit-Limit
+        self.restantes = None  # RateLimit-Remaining, descontando las solicitudes ya reservadas
+        self.reinicio = None  # Momento (monotonic) en que se reinicia la ventana (RateLimit-Reset)
+        self.siguiente = 0.0  # Momento más temprano para enviar la siguiente solicitud
+        self.bloqueado_hasta = 0.0  # Tras un 429, ninguna solicitud sale antes de este momento
+        self.fallos_429 = 0
+
+
+class LimitadorAdaptativo:
+    """
+    Limitador por endpoint que se ajusta con los encabezados RateLimit-Limit,
+    RateLimit-Remaining y RateLimit-Reset de cada respuesta.
+
+    Mientras queda margen en la ventana las solicitudes salen sin pausa; cuando las
+    restantes bajan del margen, se reparten uniformemente hasta el reinicio, de modo que
+    la espera ocurre antes de recibir un 429 y no después.
+    """
+
+    def __init__(self, margen=0.2):
+        self.margen = margen  # Fracción del límite a partir de la cual se espacian las solicitudes
+        self._lock = threading.Lock()
+        self._cubetas = {}
+
+    def _cubeta(self, endpoint):
+        if endpoint not in self._cubetas:
+            self._cubetas[endpoint] = _Cubeta()
+        return self._cubetas[endpoint]
+
+    def reservar(self, url):
+        """
+        Reserva un turno para enviar una solicitud al endpoint de la URL.
+
+        Returns:
+            float: Segundos que hay que esperar antes de enviarla.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            cubeta = self._cubeta(nombre_endpoint(url))
+            inicio = max(ahora, cubeta.siguiente, cubeta.bloqueado_hasta)
+
+            if cubeta.reinicio is not None and inicio >= cubeta.reinicio:
+                # La ventana ya se reinició: se vuelve a contar desde el límite conocido
+                cubeta.restantes = cubeta.limite
+                cubeta.reinicio = None
+
+            intervalo = 0.0
+            if cubeta.restantes is not None and cubeta.reinicio is not None:
+                hasta_reinicio = max(0.0, cubeta.reinicio - inicio)
+                reserva = max(1, int((cubeta.limite or 0) * self.margen))
+                if cubeta.restantes <= 0:
+                    # Sin solicitudes disponibles: esperar al reinicio de la ventana
+                    inicio = cubeta.reinicio
+                    cubeta.restantes = cubeta.limite
+                    cubeta.reinicio = None
+                elif cubeta.restantes <= reserva:
+                    # Poco margen: repartir las restantes hasta el reinicio
+                    intervalo = hasta_reinicio / cubeta.restantes
+                if cubeta.restantes is not None:
+                    cubeta.restantes -= 1
+
+            cubeta.siguiente = inicio + intervalo
+        return max(0.0, inicio - ahora)
+
+    def esperar_turno(self, url, token=None):
+        """Espera (interrumpible con el token) hasta que el endpoint admita otra solicitud."""
+        espera = self.reservar(url)
+        if espera > 0:
+            inicio = time.perf_counter()
+            try:
+                dormir(espera, token)
+            finally:
+                instrumentacion.registrar_espera(nombre_endpoint(url), inicio, time.perf_counter() - inicio)
+
+    def registrar(self, url, response):
+        """Actualiza el estado del endpoint con los encabezados RateLimit-* de la respuesta."""
+        headers = response.headers
+        limite = _primer_entero(headers.get("RateLimit-Limit"))
+        restantes = _primer_entero(headers.get("RateLimit-Remaining"))
+        reinicio = _primer_entero(headers.get("RateLimit-Reset"))
+        ahora = time.monotonic()
+        with self._lock:
+            cubeta = self._cubeta(nombre_endpoint(url))
+            if limite is not None:
+                cubeta.limite = limite
+            if restantes is not None:
+                cubeta.restantes = restantes
+            if reinicio is not None:
+                cubeta.reinicio = ahora + reinicio
+            if response.status_code == 429:
+                cubeta.fallos_429 += 1
+                cubeta.restantes = 0
+            else:
+                cubeta.fallos_429 = 0
+
+    def espera_tras_429(self, url, response):
+        """
+        Calcula cuánto esperar tras un 429: Retry-After si viene, si no RateLimit-Reset y,
+        sin ninguno de los dos, un backoff exponencial por endpoint (1, 2, 4... hasta 60 s).
+        También bloquea el endpoint para las demás solicitudes durante ese tiempo.
+
+        Returns:
+            float: Segundos a esperar.
+        """
+        espera = _primer_entero(response.headers.get("Retry-After"))
+        if espera is None:
+            espera = _primer_entero(response.headers.get("RateLimit-Reset"))
+        with self._lock:
+            cubeta = self._cubeta(nombre_endpoint(url))
+            if espera is None:
+                espera = min(60, 2 ** max(0, cubeta.fallos_429 - 1))
+            cubeta.bloqueado_hasta = max(cubeta.bloqueado_hasta, time.monotonic() + espera)
+        return espera
+
+
+# Instancia compartida por todas las solicitudes a Klaviyo
+limitador = LimitadorAdaptativo()
@@ -0,0 +1,112 @@
+# rollup_view.py
+import csv
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from datetime import datetime
+
+from campaign_logic import seleccionar_campanas
+from utils import format_number
+
+
+class RollupView:
+    """
+    Ventana con el resumen de clics por SKU, categoría o URL canónica, agregados sobre
+    una selección de las campañas ya analizadas. Usa el índice de clics del Analyzer,
+    por lo que no vuelve a consultar Klaviyo.
+    """
+
+    def __init__(self, root, indice, campanas):
+        self.root = root
+        self.indice = indice
+        self.campanas = campanas
+        self.filas = []
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Resumen de clics entre campañas")
+        self.window.geometry("900x600")
+
+        controles = tk.Frame(self.window)
+        controles.pack(fill=tk.X, padx=10, pady=10)
+        tk.Label(controles, text="Campañas (vacío = todas las analizadas):", fg="#23376D",
+                 font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT)
+        self.entry = tk.Entry(controles, width=30)
+        self.entry.pack(side=tk.LEFT, padx=5)
+        self.entry.bind("<Return>", lambda event: self.actualizar())
+
+        tk.Label(controles, text="Agrupar por:", fg="#23376D",
+                 font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=(10, 0))
+        self.dimension_var = tk.StringVar(value="Producto")
+        dimensiones = self.indice.dimensiones()
+        if self.dimension_var.get() not in dimensiones:
+            self.dimension_var.set(dimensiones[0])
+        combo = ttk.Combobox(controles, textvariable=self.dimension_var, values=dimensiones, state="readonly", width=12)
+        combo.pack(side=tk.LEFT, padx=5)
+        combo.bind("<<ComboboxSelected>>", lambda event: self.actualizar())
+
+        for texto, comando in (("Actualizar", self.actualizar), ("Exportar CSV", self.exportar_csv)):
+            tk.Button(controles, text=texto, command=comando, bg="#23376D", fg="white",
+                      activebackground="#3A4F9A", activeforeground="white",
+                      font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
+
+        tabla_frame = tk.Frame(self.window)
+        tabla_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.tabla = ttk.Treeview(tabla_frame, columns=("Clave", "Clics", "Unicos", "Campanas"), show="headings")
+        self.tabla.heading("Clave", text="Clave")
+        self.tabla.heading("Clics", text="Clics Totales")
+        self.tabla.heading("Unicos", text="Clics Únicos (suma)")
+        self.tabla.heading("Campanas", text="Campañas")
+        self.tabla.column("Clave", width=500, anchor="w")
+        for col in ("Clics", "Unicos", "Campanas"):
+            self.tabla.column(col, width=120, anchor="e")
+        scrollbar = ttk.Scrollbar(tabla_frame, orient="vertical", command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=scrollbar.set)
+        self.tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.estado = tk.Label(self.window, text="", fg="#23376D", font=("TkDefaultFont", 10))
+        self.estado.pack(pady=5)
+
+        self.actualizar()
+
+    def _seleccion(self):
+        """Devuelve los campaign_id seleccionados, o None para usar todas las indexadas."""
+        criterio = self.entry.get().strip()
+        if not criterio:
+            return None
+        return {camp[1] for camp in seleccionar_campanas(self.campanas, criterio)}
+
+    def actualizar(self):
+        """Recalcula el resumen con la selección y dimensión actuales."""
+        seleccion = self._seleccion()
+        self.filas = self.indice.resumen(self.dimension_var.get(), seleccion)
+
+        self.tabla.delete(*self.tabla.get_children())
+        for clave, total, unicos, campanas in self.filas:
+            self.tabla.insert("", "end", values=(clave, format_number(total), format_number(unicos), campanas))
+
+        analizadas = len(self.indice) if seleccion is None else len(seleccion & set(self.indice.campanas))
+        self.estado.config(text=f"{len(self.filas)} claves en {analizadas} campañas analizadas")
+
+    def exportar_csv(self):
+        """Exporta el resumen mostrado a un archivo CSV."""
+        if not self.filas:
+            messagebox.showinfo("Información", "No hay datos para exportar.", parent=self.window)
+            return
+        dimension = self.dimension_var.get()
+        ruta = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")],
+            title="Guardar resumen de clics",
+            initialfile=f"clicks_rollup_{dimension.lower()}_{datetime.now().strftime('%Y-%m-%d')}.csv"
+        )
+        if not ruta:
+            return
+        try:
+            with open(ruta, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow([dimension, "Clics Totales", "Clics Únicos (suma)", "Campañas"])
+                writer.writerows(self.filas)
+            messagebox.showinfo("Información", f"Resumen exportado en: {ruta}", parent=self.window)
+        except OSError as e:
+            messagebox.showerror("Error", f"Error al exportar: {e}", parent=self.window)
@@ -0,0 +1,50 @@
+# selection_model.py
+
+
+class ModeloSeleccion:
+    """
+    Relación entre las filas de la tabla de campañas y las campañas que muestran.
+
+    Se llena al renderizar la tabla (item_id -> tupla de la campaña y campaign_id -> item_id),
+    así que quien necesite la campaña de una fila (análisis, previsualización, exportación,
+    menú contextual) la obtiene en O(1), sin leer etiquetas ni textos como "▶ 12".
+    """
+
+    def __init__(self):
+        self.por_fila = {}
+        self.por_campana = {}
+
+    def __len__(self):
+        return len(self.por_fila)
+
+    def __contains__(self, item_id):
+        return item_id in self.por_fila
+
+    def limpiar(self):
+        """Olvida todas las filas (antes de volver a renderizar la tabla)."""
+        self.por_fila.clear()
+        self.por_campana.clear()
+
+    def registrar(self, item_id, camp):
+        """Asocia una fila de la tabla con la campaña que muestra."""
+        self.por_fila[item_id] = camp
+        self.por_campana[camp[1]] = item_id
+
+    def actualizar(self, camp):
+        """Reemplaza la tupla de una campaña ya mostrada (e.g. tras un refresco); devuelve su fila."""
+        item_id = self.por_campana.get(camp[1])
+        if item_id is not None:
+            self.por_fila[item_id] = camp
+        return item_id
+
+    def campana(self, item_id):
+        """Devuelve la campaña de una fila, o None si la fila no es de campaña."""
+        return self.por_fila.get(item_id)
+
+    def fila(self, campaign_id):
+        """Devuelve la fila en la que se muestra una campaña, o None."""
+        return self.por_campana.get(campaign_id)
+
+    def visibles(self, tabla):
+        """Devuelve las campañas de la tabla en el orden en que se muestran."""
+        return [self.por_fila[item] for item in tabla.get_children() if item in self.por_fila]
@@ -0,0 +1,252 @@
+# template_links.py
+"""
+Inventario de los enlaces de cada template, unido a los clics del análisis.
+
+El análisis de clics solo conoce las URLs que recibieron algún clic; aquí se extraen todos
+los href del HTML renderizado del template, así que los enlaces sin clics también aparecen.
+Los renders se guardan en disco (los comparte la previsualización) y los enlaces de cada
+template se extraen una sola vez: unir los enlaces con los clics no hace consultas por enlace.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from accounts import cuenta_actual, obtener_cuenta, usar_cuenta
+from cancellation import OperacionCancelada
+from config import KLAVIYO_URLS, TEMPLATE_RENDER_CACHE_DIR, TEMPLATE_LINK_WORKERS, API_MAX_RETRIES
+from ingest import decodificar_json
+from circuit_breaker import esperar_reintento
+from klaviyo_api import klaviyo_request
+
+# Orígenes de cada fila del inventario
+EN_TEMPLATE = "Template"
+FUERA_DEL_TEMPLATE = "Fuera del template"
+
+# Parámetros que Klaviyo o las campañas agregan a los enlaces al enviarse; no identifican el enlace
+PARAMETROS_SEGUIMIENTO = ("utm_", "_kx")
+
+
+class ExtractorEnlaces(HTMLParser):
+    """Junta los href de las etiquetas <a> y <area>, en orden de aparición."""
+
+    ETIQUETAS = ("a", "area")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.enlaces = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.ETIQUETAS:
+            for nombre, valor in attrs:
+                if nombre == "href" and valor:
+                    self.enlaces.append(valor.strip())
+
+
+def extraer_enlaces(html):
+    """
+    Extrae los enlaces http(s) de un HTML, sin repetidos y en orden de aparición.
+
+    Args:
+        html (str): HTML renderizado del template.
+
+    Returns:
+        list: URLs (se omiten mailto:, tel:, anclas y variables sin resolver).
+    """
+    extractor = ExtractorEnlaces()
+    extractor.feed(html)
+    extractor.close()
+    return list(dict.fromkeys(url for url in extractor.enlaces if url.lower().startswith(("http://", "https://"))))
+
+
+def normalizar_url(url):
+    """
+    Clave para comparar un enlace del template con una URL clicada: sin parámetros de
+    seguimiento, sin fragmento, sin "/" final y con el dominio en minúsculas.
+    """
+    partes = urlsplit(url.strip())
+    parametros = sorted((clave, valor) for clave, valor in parse_qsl(partes.query, keep_blank_values=True)
+                        if not clave.lower().startswith(PARAMETROS_SEGUIMIENTO))
+    return urlunsplit((partes.scheme.lower(), partes.netloc.lower(), partes.path.rstrip("/") or "/",
+                       urlencode(parametros), ""))
+
+
+def pais_de_render(campaign_name):
+    """País con el que se renderiza el template: el sufijo del nombre de la campaña, o US."""
+    partes = campaign_name.split("_")
+    return partes[-1].strip().upper() if len(partes) > 1 else "US"
+
+
+def unir_enlaces(enlaces, total_clicks, totales):
+    """
+    Une los enlaces del template con los clics de la campaña.
+
+    Args:
+        enlaces (list): URLs del template (extraer_enlaces).
+        total_clicks (int): Total de clics de la campaña.
+        totales (dict): {url: {"count": int, "unique": int}} del análisis.
+
+    Returns:
+        list: Filas (url, clics totales, clics únicos, % de los clics de la campaña, origen),
+            ordenadas por clics; los enlaces del template sin clics quedan al final con 0, y las
+            URLs clicadas que no están en el template se marcan con FUERA_DEL_TEMPLATE.
+    """
+    clics = {}
+    for url, data in totales.items():
+        clave = normalizar_url(url)
+        if clave in clics:
+            anterior = clics[clave]
+            clics[clave] = (anterior[0], anterior[1] + data["count"], anterior[2] + data["unique"])
+        else:
+            clics[clave] = (url, data["count"], data["unique"])
+
+    def fila(url, count, unique, origen):
+        return (url, count, unique, count / total_clicks * 100 if total_clicks else 0.0, origen)
+
+    filas = []
+    vistas = set()
+    for url in enlaces:
+        clave = normalizar_url(url)
+        if clave in vistas:
+            continue
+        vistas.add(clave)
+        _, count, unique = clics.pop(clave, (url, 0, 0))
+        filas.append(fila(url, count, unique, EN_TEMPLATE))
+    for url, count, unique in clics.values():
+        filas.append(fila(url, count, unique, FUERA_DEL_TEMPLATE))
+    filas.sort(key=lambda x: x[1], reverse=True)
+    return filas
+
+
+class CacheRenders:
+    """
+    Renders de templates guardados en disco (uno por cuenta, template y país) y los enlaces
+    ya extraídos de cada uno, en memoria. Un template de campaña enviada no cambia, así que
+    los archivos no expiran.
+    """
+
+    def __init__(self, directorio=TEMPLATE_RENDER_CACHE_DIR):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self._enlaces = {}
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, hashlib.sha1("|".join(clave).encode("utf-8")).hexdigest() + ".html")
+
+    def _leer(self, clave):
+        try:
+            with open(self._ruta(clave), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _guardar(self, clave, html):
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(self._ruta(clave), "w", encoding="utf-8") as f:
+                f.write(html)
+        except OSError as e:
+            print(f"No se pudo guardar el template renderizado en {self.directorio}: {e}")
+
+    def _renderizar(self, template_id, pais, token=None):
+        """Pide el render a Klaviyo con la cuenta activa. Devuelve (html, error)."""
+        url = KLAVIYO_URLS["TEMPLATE_RENDER"]
+        data = {"data": {"type": "template", "id": template_id,
+                         "attributes": {"context": {"person": {"country": pais}}}}}
+        headers = {**cuenta_actual().headers, "revision": "2023-12-15"}
+        for _ in range(API_MAX_RETRIES):
+            response = klaviyo_request("POST", url, token=token, json=data, headers=headers)
+            if response.status_code == 429:
+                esperar_reintento(url, cuenta_actual().limitador.espera_tras_429(url, response), token)
+                continue
+            if response.status_code != 200:
+                return None, f"Error al renderizar el template {template_id}: {response.status_code}"
+            html = decodificar_json(response).get("data", {}).get("attributes", {}).get("html", "")
+            return (html, None) if html else (None, f"El template {template_id} no tiene HTML")
+        return None, f"Límite de solicitudes al renderizar el template {template_id}"
+
+    def html(self, template_id, pais, token=None):
+        """
+        HTML renderizado de un template para un país, con la cuenta activa (accounts.usar_cuenta).
+
+        Returns:
+            tuple: (html, error); el render se lee del disco si ya se pidió antes.
+        """
+        clave = (cuenta_actual().nombre, template_id, pais)
+        html = self._leer(clave)
+        if html:
+            return html, None
+        try:
+            html, error = self._renderizar(template_id, pais, token)
+        except requests.exceptions.RequestException as e:
+            return None, f"Error al renderizar el template {template_id}: {str(e)}"
+        if html:
+            self._guardar(clave, html)
+        return html, error
+
+    def enlaces(self, template_id, pais, token=None):
+        """
+        Enlaces del template para un país (extraer_enlaces), extraídos una sola vez por sesión.
+
+        Returns:
+            tuple: (enlaces, error).
+        """
+        clave = (cuenta_actual().nombre, template_id, pais)
+        with self._lock:
+            if clave in self._enlaces:
+                return self._enlaces[clave], None
+        html, error = self.html(template_id, pais, token)
+        if error:
+            return None, error
+        enlaces = extraer_enlaces(html)
+        with self._lock:
+            self._enlaces[clave] = enlaces
+        return enlaces, None
+
+
+renders = CacheRenders()
+
+
+def inventario_enlaces(campanas, token=None, max_workers=TEMPLATE_LINK_WORKERS, cache=renders):
+    """
+    Obtiene los enlaces del template de cada campaña. Cada template distinto se renderiza
+    (o se lee del disco) y se analiza una sola vez, en paralelo con la cuenta de su campaña.
+
+    Args:
+        campanas (list): Tuplas de obtener_campanas.
+        token (TokenCancelacion, optional): Si se cancela, los templates pendientes se omiten.
+        max_workers (int): Templates que se procesan a la vez.
+        cache (CacheRenders): Renders y enlaces ya obtenidos.
+
+    Returns:
+        dict: {campaign_id: (enlaces, error)}.
+    """
+    trabajos = {}
+    resultado = {}
+    for camp in campanas:
+        campaign_id, name, template_id = camp[1], camp[2], camp[10]
+        if not template_id:
+            resultado[campaign_id] = (None, "La campaña no tiene template")
+            continue
+        cuenta = camp[17] if len(camp) > 17 else None
+        trabajos.setdefault((cuenta, template_id, pais_de_render(name)), []).append(campaign_id)
+
+    def procesar(clave):
+        cuenta, template_id, pais = clave
+        if token is not None and token.cancelado:
+            return None, f"Cancelado ({token.motivo})"
+        try:
+            with usar_cuenta(obtener_cuenta(cuenta)):
+                return cache.enlaces(template_id, pais, token)
+        except OperacionCancelada:
+            return None, f"Cancelado ({token.motivo})"
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for clave, enlaces in zip(trabajos, executor.map(procesar, trabajos)):
+            for campaign_id in trabajos[clave]:
+                resultado[campaign_id] = enlaces
+    return resultado
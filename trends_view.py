@@ -0,0 +1,103 @@
+# trends_view.py
+import time
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime, timedelta
+
+from config import ALLOWED_CODES
+from history_store import historial, PERIODOS
+from utils import format_number, format_percentage
+
+
+class VentanaTendencias:
+    """
+    Ventana con la evolución de las campañas por mes, semana o día, leída del historial
+    local (history_store). Incluye todas las cargas anteriores, así que comparar varios
+    meses no requiere volver a consultar Klaviyo.
+    """
+
+    COLUMNAS = (("Periodo", "Periodo", 100), ("Campanas", "Campañas", 80), ("Recibidos", "Recibidos", 110),
+                ("OpenRate", "Open Rate", 90), ("ClickRate", "Click Rate", 90), ("Clics", "Clics", 90),
+                ("Ordenes", "Order Count", 90), ("Valor", "Total Value (USD)", 130), ("PerRecipient", "Per Recipient", 110))
+
+    def __init__(self, root, historial_campanas=historial):
+        self.root = root
+        self.historial = historial_campanas
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Tendencias del historial local")
+        self.window.geometry("1000x550")
+
+        controles = tk.Frame(self.window)
+        controles.pack(fill=tk.X, padx=10, pady=10)
+        hoy = datetime.now()
+        self.desde = self._campo(controles, "Desde:", (hoy - timedelta(days=365)).strftime("%Y-%m-%d"))
+        self.hasta = self._campo(controles, "Hasta:", hoy.strftime("%Y-%m-%d"))
+
+        tk.Label(controles, text="Por:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=(10, 0))
+        self.periodo_var = tk.StringVar(value="Mes")
+        ttk.Combobox(controles, textvariable=self.periodo_var, values=list(PERIODOS), state="readonly", width=8).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(controles, text="País:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=(10, 0))
+        self.pais_var = tk.StringVar(value="Todos")
+        ttk.Combobox(controles, textvariable=self.pais_var, values=["Todos"] + sorted(c.upper() for c in ALLOWED_CODES),
+                     state="readonly", width=7).pack(side=tk.LEFT, padx=5)
+
+        self.prefijo = self._campo(controles, "Prefijo:", "")
+
+        tk.Button(controles, text="Actualizar", command=self.actualizar, bg="#23376D", fg="white",
+                  activebackground="#3A4F9A", activeforeground="white",
+                  font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=10)
+
+        tabla_frame = tk.Frame(self.window)
+        tabla_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.tabla = ttk.Treeview(tabla_frame, columns=[col for col, _, _ in self.COLUMNAS], show="headings")
+        for col, texto, ancho in self.COLUMNAS:
+            self.tabla.heading(col, text=texto)
+            self.tabla.column(col, width=ancho, anchor="w" if col == "Periodo" else "e")
+        scrollbar = ttk.Scrollbar(tabla_frame, orient="vertical", command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=scrollbar.set)
+        self.tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.estado = tk.Label(self.window, text="", fg="#23376D", font=("TkDefaultFont", 10))
+        self.estado.pack(pady=5)
+
+        self.actualizar()
+
+    def _campo(self, padre, etiqueta, valor):
+        tk.Label(padre, text=etiqueta, fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=(10, 0))
+        entry = tk.Entry(padre, width=11)
+        entry.insert(0, valor)
+        entry.pack(side=tk.LEFT, padx=5)
+        entry.bind("<Return>", lambda event: self.actualizar())
+        return entry
+
+    def actualizar(self):
+        """Vuelve a consultar el historial con los filtros actuales."""
+        desde, hasta = self.desde.get().strip(), self.hasta.get().strip()
+        try:
+            datetime.strptime(desde, "%Y-%m-%d")
+            datetime.strptime(hasta, "%Y-%m-%d")
+        except ValueError:
+            self.estado.config(text="❌ Las fechas deben tener el formato YYYY-MM-DD")
+            return
+        pais = self.pais_var.get()
+        inicio = time.perf_counter()
+        filas, error = self.historial.tendencias(desde, hasta, self.periodo_var.get(),
+                                                 pais=None if pais == "Todos" else pais,
+                                                 prefijo=self.prefijo.get().strip() or None)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+
+        self.tabla.delete(*self.tabla.get_children())
+        if error:
+            self.estado.config(text=f"❌ {error}")
+            return
+        for periodo, campanas, recibidos, open_rate, click_rate, clics, ordenes, valor, per_recipient in filas:
+            self.tabla.insert("", "end", values=(
+                periodo, campanas, format_number(recibidos), format_percentage(open_rate),
+                format_percentage(click_rate), format_number(clics),
+                format_number(ordenes), format_number(valor, is_currency=True),
+                format_number(per_recipient, is_currency=True)))
+        total = sum(fila[1] for fila in filas)
+        self.estado.config(text=f"{len(filas)} periodos con {total} campañas del historial ({duracion_ms:.1f} ms)")
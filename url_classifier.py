@@ -0,0 +1,67 @@
+# url_classifier.py
+import re
+
+from config import URL_RULES
+
+
+class ClasificadorUrls:
+    """
+    Clasifica URLs clicadas según las reglas de URL_RULES y extrae su identificador
+    (SKU, ID de categoría, ...). Cada URL se procesa una sola vez; las siguientes
+    consultas se responden desde la caché.
+    """
+
+    def __init__(self, reglas=None):
+        reglas = URL_RULES if reglas is None else reglas
+        # Para cada tipo, los segmentos se prueban en el orden configurado
+        self.reglas = {
+            tipo: [re.compile(f"/{re.escape(segmento)}/", re.IGNORECASE) for segmento in segmentos]
+            for tipo, segmentos in reglas.items()
+        }
+        self.tipos = list(self.reglas)
+        self._cache = {}
+
+    def clasificar(self, url):
+        """
+        Devuelve los tipos a los que pertenece la URL y el identificador extraído para cada uno.
+
+        La pertenencia se evalúa sobre la URL completa; el identificador es el último segmento
+        de la ruta (antes del '?') cuando después del marcador hay al menos descripción e ID,
+        preservando mayúsculas.
+
+        Args:
+            url (str): URL clicada.
+
+        Returns:
+            dict: {tipo: identificador} para cada tipo que coincide ("" si no hay identificador).
+        """
+        resultado = self._cache.get(url)
+        if resultado is not None:
+            return resultado
+
+        resultado = {}
+        ruta = url.split("?")[0]
+        for tipo, patrones in self.reglas.items():
+            if not any(patron.search(url) for patron in patrones):
+                continue
+            identificador = ""
+            for patron in patrones:
+                coincidencia = patron.search(ruta)
+                if coincidencia:
+                    partes = ruta[coincidencia.end():].split("/")
+                    if len(partes) >= 2:  # Al menos descripción e identificador
+                        identificador = partes[-1]
+                    break
+            resultado[tipo] = identificador
+
+        self._cache[url] = resultado
+        return resultado
+
+
+# Instancia compartida por toda la aplicación
+clasificador = ClasificadorUrls()
+
+
+def clasificar_url(url):
+    """Atajo para clasificar una URL con las reglas configuradas."""
+    return clasificador.clasificar(url)
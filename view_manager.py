@@ -103,9 +103,10 @@ class ViewManager:
         self.campanas_tabla.bind("<Button-3>", self.show_context_menu)  # Clic derechoimport tkinter as tk
 from tkinter import ttk
 import tkinter.messagebox
+from selection_model import ModeloSeleccion
 
 class ViewManager:
-    def __init__(self, main_frame, screen_width, screen_height, email_preview, exporter):
+    def __init__(self, main_frame, screen_width, screen_height, email_preview, exporter, modelo_seleccion=None):
         self.main_frame = main_frame
         self.screen_width = screen_width
         self.screen_height = screen_height
@@ -122,6 +123,7 @@ class ViewManager:
         self.expanded_rows = {}  # Almacena el estado de expansión de cada fila
         self.audience_data = {}  # Almacena los datos completos de audiencias
         self.audience_names_cache = {}  # AGREGAR CACHE DE NOMBRES
+        self.modelo_seleccion = modelo_seleccion or ModeloSeleccion()  # Campaña de cada fila de campanas_tabla
 
     def create_campanas_tabla(self, treeview_frame, total_table_width):
         # Crear la tabla CON la nueva columna "OpenUnique"
@@ -308,7 +310,8 @@ class ViewManager:
         """Carga el tamaño de una audiencia específica."""
         import threading
         import requests
-        from config import KLAVIYO_URLS, HEADERS_KLAVIYO
+        from config import KLAVIYO_URLS
+        from accounts import cuenta_de
         
         # Extraer el nombre de la audiencia (quitar símbolos y botón)
         audience_name = audience_text.replace("  • ", "").replace("  🔃", "").strip()
@@ -335,10 +338,11 @@ class ViewManager:
                     ))
                     return
                 
-                # Intentar obtener como lista primero
+                # Intentar obtener como lista primero, con la clave de la cuenta de la audiencia
+                headers = cuenta_de(audience_id).headers
                 profile_count = None
                 url = f"{KLAVIYO_URLS['LISTS']}{audience_id}/?additional-fields[list]=profile_count"
-                response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=10)
+                response = requests.get(url, headers=headers, timeout=10)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -346,7 +350,7 @@ class ViewManager:
                 else:
                     # Intentar como segmento
                     url = f"{KLAVIYO_URLS['SEGMENTS']}{audience_id}/?additional-fields[segment]=profile_count"
-                    response = requests.get(url, headers=HEADERS_KLAVIYO, timeout=10)
+                    response = requests.get(url, headers=headers, timeout=10)
                     if response.status_code == 200:
                         data = response.json()
                         profile_count = data['data']['attributes'].get('profile_count', 0)
@@ -491,6 +495,10 @@ class ViewManager:
         """Establece el cache de nombres de audiencias."""
         self.audience_names_cache = cache
 
+    def agregar_nombres_audiencias(self, cache):
+        """Agrega nombres al cache de audiencias (las cargas de varias cuentas se combinan)."""
+        self.audience_names_cache.update(cache)
+
     def show_context_menu(self, event):
         """Muestra el menú contextual si el clic derecho ocurre en la columna 'Order Count'."""
         try:
@@ -513,19 +521,11 @@ class ViewManager:
             if not selected_item:
                 return
 
-            values = self.campanas_tabla.item(selected_item[0], "values")
-            campaign_name = values[1]  # Nombre de la campaña
-
-            # Intentar obtener el campaign_id (puede estar en los tags o datos asociados)
-            campaign_id = None
-            tags = self.campanas_tabla.item(selected_item[0], "tags")
-            if tags and len(tags) > 0:
-                campaign_id = tags[0] if tags[0].startswith("campaign_") else None
-                if campaign_id:
-                    campaign_id = campaign_id.replace("campaign_", "")
-
-            if not campaign_id:
-                campaign_id = "No disponible"
+            # Solo las filas de campaña tienen menú (no encabezados, subtotales ni audiencias)
+            camp = self.modelo_seleccion.campana(selected_item[0])
+            if camp is None:
+                return
+            campaign_id, campaign_name = camp[1], camp[2]
 
             # Crear el menú contextual dinámicamente
             self.context_menu = tk.Menu(self.campanas_tabla, tearoff=0)
@@ -604,7 +604,7 @@ class ViewManager:
         control_frame.grid(row=0, column=0, sticky="ew", pady=5)
 
         tk.Label(control_frame, text="Agrupar por:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
-        grouping_options = ttk.Combobox(control_frame, textvariable=grouping_var, values=["País", "Fecha"], state="readonly")
+        grouping_options = ttk.Combobox(control_frame, textvariable=grouping_var, values=["País", "Fecha", "Cuenta"], state="readonly")
         grouping_options.pack(side=tk.LEFT, padx=5)
         grouping_options.bind("<<ComboboxSelected>>", update_grouping_callback)
 
@@ -648,6 +648,10 @@ class ViewManager:
         elif filter_type == "Categoría":
             columns = ("Campaign", "Clics Totales", "URL", "Clics Totales URL", "Clics Únicos", "ID Categoria")
             headings["ID Categoria"] = "ID Categoría"
+        elif filter_type == "Enlaces":
+            columns = ("Campaign", "Clics Totales", "URL", "Clics Totales URL", "Clics Únicos", "% Clics", "Origen")
+            headings["% Clics"] = "% de Clics"
+            headings["Origen"] = "Origen"
 
         # Actualizar las columnas de la tabla
         self.resultados_tabla.configure(columns=columns)
@@ -668,6 +672,9 @@ class ViewManager:
         if filter_type in ["Producto", "Categoría"]:
             dynamic_col = "SKU" if filter_type == "Producto" else "ID Categoria"
             self.resultados_tabla.column(dynamic_col, width=int(total_resultados_width * 0.15), anchor="center")
+        elif filter_type == "Enlaces":
+            self.resultados_tabla.column("% Clics", width=int(total_resultados_width * 0.10), anchor="center")
+            self.resultados_tabla.column("Origen", width=int(total_resultados_width * 0.12), anchor="center")
 
     def on_resultados_double_click(self, event):
         """Maneja el evento de doble clic en resultados_tabla para abrir el visualizador con la URL seleccionada."""
@@ -758,7 +765,7 @@ class ViewManager:
         control_frame.grid(row=0, column=0, sticky="ew", pady=5)
 
         tk.Label(control_frame, text="Agrupar por:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
-        grouping_options = ttk.Combobox(control_frame, textvariable=grouping_var, values=["País", "Fecha"], state="readonly")
+        grouping_options = ttk.Combobox(control_frame, textvariable=grouping_var, values=["País", "Fecha", "Cuenta"], state="readonly")
         grouping_options.pack(side=tk.LEFT, padx=5)
         grouping_options.bind("<<ComboboxSelected>>", update_grouping_callback)
 
@@ -799,7 +806,7 @@ class ViewManager:
 
         # Añadir el Combobox para el filtro
         tk.Label(self.results_header_frame, text="Filtrar por:", fg="#23376D", font=("TkDefaultFont", 10, "bold")).pack(side=tk.LEFT, padx=5)
-        filter_options = ttk.Combobox(self.results_header_frame, textvariable=self.filter_var, values=["Todos", "Producto", "Categoría"], state="readonly")
+        filter_options = ttk.Combobox(self.results_header_frame, textvariable=self.filter_var, values=["Todos", "Producto", "Categoría", "Enlaces"], state="readonly")
         filter_options.pack(side=tk.LEFT, padx=5)
         if filter_callback:
             # Actualizar las columnas cuando cambie el filtro
@@ -831,6 +838,10 @@ class ViewManager:
         resultados_scrollbar.grid(row=0, column=1, sticky="ns")
         self.resultados_tabla.configure(yscrollcommand=resultados_scrollbar.set)
 
+        # Estado del análisis en curso (progreso, velocidad y tiempo restante)
+        self.progreso_label = tk.Label(self.right_frame, text="", anchor="w", fg="#23376D", font=("TkDefaultFont", 10))
+        self.progreso_label.grid(row=2, column=0, sticky="ew", padx=10, pady=(0, 5))
+
         # Configurar encabezados y anchos iniciales
         self.update_resultados_tabla_columns()
 
@@ -845,4 +856,6 @@ class ViewManager:
         self.resultados_context_menu.add_command(label="Copiar enlace", command=self.copy_url_context)
         self.resultados_tabla.bind("<Button-3>", self.show_context_menu_results)
 
-        self.resultados_tabla.tag_configure("bold", font=("Arial", 11, "bold"), foreground="#23376D")
\ No newline at end of file
+        self.resultados_tabla.tag_configure("bold", font=("Arial", 11, "bold"), foreground="#23376D")
+        self.resultados_tabla.tag_configure("sin_clics", foreground="#B22222")  # Enlaces del template sin clics
+        self.resultados_tabla.tag_configure("fuera_template", foreground="#808080")
\ No newline at end of file
@@ -0,0 +1,173 @@
+# xlsx_export.py
+"""
+Exportación a Excel (XLSX) de las campañas y los clics analizados, con una hoja de campañas
+por cada agrupación de la tabla (fecha, país y cuenta).
+
+Se escribe con openpyxl en modo write-only: cada fila se envía al archivo al agregarse,
+así que la memoria no crece con la cantidad de campañas ni de filas de clics. openpyxl es
+opcional y se importa solo al exportar.
+"""
+from datetime import datetime
+
+from campaign_logic import (agrupar_por_pais, agrupar_por_cuenta, agrupar_por_fecha_y_prefijo,
+                            calculate_subtotals, _codigo_pais)
+from config import COUNTRY_TO_CURRENCY
+
+COLUMNAS_CAMPANAS = [
+    "#", "Nombre", "Fecha de Envío", "Open Rate", "Click Rate", "Recibidos", "Opens Únicos",
+    "Unique Orders", "Total Value (USD)", "Total Value (Local)", "Moneda Local", "Per Recipient",
+    "Order Count", "Subject Line", "Preview Text", "Cuenta", "Campaign ID"
+]
+COLUMNAS_CLICS = ["Fecha de Envío", "Campaña", "URL", "Clics Totales", "Clics Únicos"]
+ANCHOS_CAMPANAS = [8, 40, 19, 10, 10, 12, 12, 12, 16, 16, 10, 14, 12, 40, 40, 14, 14]
+ANCHOS_CLICS = [14, 40, 80, 14, 14]
+
+# Agrupaciones con hoja propia en el libro: agrupación de la tabla -> nombre de la hoja
+HOJAS_AGRUPACION = {"Fecha": "Por Fecha", "País": "Por País", "Cuenta": "Por Cuenta"}
+
+# Formatos de número de Excel por columna de la hoja de campañas
+FORMATO_PORCENTAJE = "0.00%"
+FORMATO_ENTERO = "#,##0"
+FORMATO_MONEDA = "#,##0.00"
+FORMATO_FECHA = "yyyy-mm-dd hh:mm:ss"
+
+
+def grupos_de_campanas(campanas, grouping):
+    """
+    Recorre las campañas con la misma agrupación que la tabla de campañas.
+
+    Args:
+        campanas (list): Tuplas de obtener_campanas.
+        grouping (str): "País", "Cuenta" o "Fecha".
+
+    Yields:
+        tuple: (encabezados, campañas del grupo ordenadas por índice); encabezados son las
+            filas de título del grupo (e.g. ["HN"] o ["2025-06-01", "promo"]).
+    """
+    if grouping in ("País", "Cuenta"):
+        grupos = agrupar_por_pais(campanas) if grouping == "País" else agrupar_por_cuenta(campanas)
+        for clave in sorted(grupos):
+            yield [clave.upper() if grouping == "País" else clave], sorted(grupos[clave], key=lambda x: x[0])
+    else:
+        grupos = agrupar_por_fecha_y_prefijo(campanas)
+        for fecha in sorted(grupos):
+            for i, prefijo in enumerate(sorted(grupos[fecha])):
+                encabezados = [fecha, prefijo] if i == 0 else [prefijo]
+                yield encabezados, sorted(grupos[fecha][prefijo], key=lambda x: x[0])
+
+
+def _fecha(send_time):
+    try:
+        return datetime.strptime(send_time, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return send_time
+
+
+def _valores_campana(camp):
+    """Valores tipados de una campaña, en el orden de COLUMNAS_CAMPANAS."""
+    (idx, campaign_id, name, send_time, open_rate, click_rate, delivered, opens_unicos, subject, preview,
+     template_id, audiences, order_unique, order_sum_value, order_sum_value_local, order_count, per_recipient) = camp[:17]
+    moneda = COUNTRY_TO_CURRENCY.get(_codigo_pais(name), "USD")
+    cuenta = camp[17] if len(camp) > 17 else ""
+    return [idx, name, _fecha(send_time), open_rate / 100, click_rate / 100, delivered, opens_unicos,
+            int(order_unique), order_sum_value, order_sum_value_local, moneda, per_recipient,
+            int(order_count), subject, preview, cuenta, campaign_id]
+
+
+def _valores_total(etiqueta, datos):
+    """Valores tipados de una fila de subtotal o total a partir de los datos de calculate_subtotals."""
+    peso = datos["total_weight"]
+    per_recipient = datos["per_recipient_weighted"] / datos["delivered_for_weight"] if datos["delivered_for_weight"] else 0.0
+    return [None, etiqueta, None, datos["weighted_open"] / peso if peso else 0.0,
+            datos["weighted_click"] / peso if peso else 0.0, datos["delivered"], datos["opens_unicos"],
+            int(datos["unique"]), datos["sum_value"], None, None, per_recipient, int(datos["count"]),
+            None, None, None, None]
+
+
+def escribir_xlsx(ruta, campanas, grouping="Fecha", last_results=None):
+    """
+    Escribe el libro de Excel con una hoja de campañas por agrupación (HOJAS_AGRUPACION, cada
+    una con sus subtotales y el total general) y, si hay resultados del análisis, la hoja
+    "Clics" en formato largo.
+
+    Args:
+        ruta (str): Ruta del archivo .xlsx.
+        campanas (list): Tuplas de obtener_campanas.
+        grouping (str): Agrupación de la tabla ("País", "Cuenta" o "Fecha"); su hoja va primero.
+        last_results (dict, optional): {(campaign_name, send_date): {url: {"count", "unique"}}}.
+
+    Returns:
+        tuple: (campañas, filas de clics) escritas; cada campaña aparece una vez en cada hoja.
+
+    Raises:
+        ImportError: Si openpyxl no está instalado.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    negrita = Font(bold=True)
+    formatos = [FORMATO_ENTERO, None, FORMATO_FECHA, FORMATO_PORCENTAJE, FORMATO_PORCENTAJE, FORMATO_ENTERO,
+                FORMATO_ENTERO, FORMATO_ENTERO, FORMATO_MONEDA, FORMATO_MONEDA, None, FORMATO_MONEDA,
+                FORMATO_ENTERO, None, None, None, None]
+
+    libro = Workbook(write_only=True)
+
+    def fila(hoja, valores, bold=False):
+        celdas = []
+        for valor, formato in zip(valores, formatos):
+            celda = WriteOnlyCell(hoja, value=valor)
+            if formato and isinstance(valor, (int, float, datetime)):
+                celda.number_format = formato
+            if bold:
+                celda.font = negrita
+            celdas.append(celda)
+        hoja.append(celdas)
+
+    def titulos(destino, valores):
+        celdas = [WriteOnlyCell(destino, value=valor) for valor in valores]
+        for celda in celdas:
+            celda.font = negrita
+        destino.append(celdas)
+
+    # Los valores de cada campaña y el total general se calculan una vez para todas las hojas
+    valores = {camp[0]: _valores_campana(camp) for camp in campanas}
+    _, datos_total = calculate_subtotals(campanas)
+    agrupaciones = sorted(HOJAS_AGRUPACION, key=lambda agrupacion: agrupacion != grouping)
+    for agrupacion in agrupaciones:
+        hoja = libro.create_sheet(HOJAS_AGRUPACION[agrupacion])
+        _configurar_hoja(hoja, ANCHOS_CAMPANAS)
+        titulos(hoja, COLUMNAS_CAMPANAS)
+        for encabezados, grupo in grupos_de_campanas(campanas, agrupacion):
+            for encabezado in encabezados:
+                titulos(hoja, [encabezado])
+            for camp in grupo:
+                fila(hoja, valores[camp[0]])
+            _, datos = calculate_subtotals(grupo)
+            if datos:
+                fila(hoja, _valores_total("Subtotal", datos), bold=True)
+            hoja.append([])
+        if datos_total:
+            fila(hoja, _valores_total("Total General", datos_total), bold=True)
+
+    filas_clics = 0
+    if last_results:
+        hoja_clics = libro.create_sheet("Clics")
+        _configurar_hoja(hoja_clics, ANCHOS_CLICS)
+        titulos(hoja_clics, COLUMNAS_CLICS)
+        for (campaign_name, send_date), totales in last_results.items():
+            for url, data in totales.items():
+                hoja_clics.append([send_date, campaign_name, url, data["count"], data["unique"]])
+                filas_clics += 1
+
+    libro.save(ruta)
+    return len(campanas), filas_clics
+
+
+def _configurar_hoja(hoja, anchos):
+    """Anchos de columna y encabezado fijo (debe hacerse antes de agregar filas en modo write-only)."""
+    from openpyxl.utils import get_column_letter
+
+    for i, ancho in enumerate(anchos, 1):
+        hoja.column_dimensions[get_column_letter(i)].width = ancho
+    hoja.freeze_panes = "A2"